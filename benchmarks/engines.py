@@ -0,0 +1,77 @@
+import importlib.util
+import json
+import os
+import sys
+from contextlib import redirect_stdout
+from collections import OrderedDict
+
+from generators import generate_course_catalog, generate_customers, generate_events
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# samples import their modules by name, from their own directory. Module names are
+# distinct across samples (every sample has its own <sample>_instrumentation.py)
+for sample_dir in ('class_scheduler', 'party_invite'):
+    if os.path.join(ROOT_DIR, sample_dir) not in sys.path:
+        sys.path.insert(0, os.path.join(ROOT_DIR, sample_dir))
+
+''' Return the calendar sample module. It is loaded from its file under another name
+    as calendar.py has the name of the standard library calendar module.
+'''
+def load_calendar_module():
+    if 'calendar_sample' not in sys.modules:
+        # after the standard library, so calendar still imports the standard library module
+        calendar_dir = os.path.join(ROOT_DIR, 'calendar')
+        if calendar_dir not in sys.path:
+            sys.path.append(calendar_dir)
+        spec = importlib.util.spec_from_file_location('calendar_sample', os.path.join(calendar_dir, 'calendar.py'))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules['calendar_sample'] = module
+    return sys.modules['calendar_sample']
+
+''' Write data as json to file_name in work_dir and return the file path
+'''
+def _write_json(work_dir, file_name, data):
+    file_path = os.path.join(work_dir, file_name)
+    with open(file_path, 'w') as json_file:
+        json.dump(data, json_file)
+    return file_path
+
+''' Benchmark of Scheduler.get_ordered_courses on a catalog of size courses
+'''
+def setup_scheduler(size, seed, work_dir, depth=10, fan_in=2):
+    from scheduler import Scheduler
+    courses_json_file_path = _write_json(work_dir, 'courses.json', generate_course_catalog(size, depth, fan_in, seed))
+    course_list = Scheduler(courses_json_file_path).read_course_graph().courses()
+
+    def run():
+        Scheduler(courses_json_file_path).get_ordered_courses(course_list)
+    return run
+
+''' Benchmark of filter_customer_by_distance on size customers
+'''
+def setup_party_invite(size, seed, work_dir, max_allowed_distance=100):
+    from party_invitee_list import get_customer_list, filter_customer_by_distance
+    customers = get_customer_list(generate_customers(size, seed=seed))
+
+    def run():
+        filter_customer_by_distance(customers, max_allowed_distance)
+    return run
+
+''' Benchmark of Calendar.display_events on an events json file of size events,
+    output is discarded
+'''
+def setup_calendar(size, seed, work_dir):
+    Calendar = load_calendar_module().Calendar
+    events_json_file_path = _write_json(work_dir, 'events.json', generate_events(size, seed=seed))
+
+    def run():
+        with open(os.devnull, 'w') as null_file, redirect_stdout(null_file):
+            Calendar(events_json_file_path).display_events()
+    return run
+
+# benchmark name: function(size, seed, work_dir) returning the function to measure
+BENCHMARKS = OrderedDict([('scheduler', setup_scheduler),
+                          ('party_invite', setup_party_invite),
+                          ('calendar', setup_calendar)])
@@ -0,0 +1,60 @@
+import datetime
+import random
+
+REF_LAT = 53.3381985
+REF_LONG = -6.2592576
+
+''' Returns a course catalog of course_count courses in the scheduler json format.
+
+    Courses are spread over depth levels, every course of a level above the first has
+    up to fan_in prerequisites from lower levels, one of them from the level just below,
+    so the longest prerequisite chain has depth courses. Courses are listed in random
+    order. The same seed gives the same catalog.
+'''
+def generate_course_catalog(course_count, depth=10, fan_in=2, seed=0):
+    rng = random.Random(seed)
+    depth = max(1, min(depth, course_count))
+    levels = [[] for _ in range(depth)]
+    for course_id in range(course_count):
+        levels[course_id * depth // course_count].append('Course {}'.format(course_id))
+
+    courses = []
+    for level, names in enumerate(levels):
+        lower_names = [name for lower_level in levels[:level] for name in lower_level]
+        for name in names:
+            prerequisites = []
+            if level > 0:
+                prerequisites.append(rng.choice(levels[level - 1]))
+                extra_count = min(fan_in - 1, len(lower_names) - 1)
+                while len(prerequisites) < extra_count + 1:
+                    prerequisite = rng.choice(lower_names)
+                    if prerequisite not in prerequisites:
+                        prerequisites.append(prerequisite)
+            courses.append({'name': name, 'prerequisites': prerequisites})
+
+    rng.shuffle(courses)
+    return courses
+
+''' Returns customer_count customers in the party invite json format, scattered
+    uniformly within spread degrees of latitude and longitude around ref_lat & ref_long.
+    The same seed gives the same customers.
+'''
+def generate_customers(customer_count, spread=3.0, seed=0, ref_lat=REF_LAT, ref_long=REF_LONG):
+    rng = random.Random(seed)
+    return [{'latitude': repr(ref_lat + rng.uniform(-spread, spread)), 'user_id': user_id,
+             'name': 'Customer {}'.format(user_id), 'longitude': repr(ref_long + rng.uniform(-spread, spread))}
+            for user_id in range(customer_count)]
+
+''' Returns events json of event_count events in the calendar json format, on random
+    dates over years years from start_year. The same seed gives the same events.
+'''
+def generate_events(event_count, years=10, start_year=2015, seed=0):
+    rng = random.Random(seed)
+    first_day = datetime.date(start_year, 1, 1).toordinal()
+    last_day = datetime.date(start_year + years, 1, 1).toordinal() - 1
+    events = []
+    for event_id in range(event_count):
+        date = datetime.date.fromordinal(rng.randint(first_day, last_day))
+        events.append({'occasion': 'Event {}'.format(event_id), 'invited_count': rng.randint(1, 500),
+                       'year': date.year, 'month': date.month, 'day': date.day})
+    return {'events': events}
@@ -0,0 +1,123 @@
+import argparse
+import gc
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from engines import BENCHMARKS
+
+try:
+    import numpy
+    NUMPY_VERSION = numpy.__version__
+except ImportError:
+    NUMPY_VERSION = None
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+''' Return timing and memory of run: best and mean wall time in seconds over repeat
+    runs, and peak memory allocated by python during one more run, traced with tracemalloc.
+'''
+def measure(run, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    # tracing slows python down, memory is measured in a separate run
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': min(timings), 'mean_seconds': sum(timings) / len(timings), 'peak_memory_bytes': peak_memory}
+
+''' Yields one result per benchmark and size: benchmark name, size, seed, repeat and
+    the measures of measure. Inputs are generated before the benchmarked function runs.
+'''
+def run_benchmarks(benchmark_names, sizes, repeat=3, seed=0):
+    environment = {'python': platform.python_version(), 'numpy': NUMPY_VERSION}
+    for benchmark_name in benchmark_names:
+        for size in sizes:
+            work_dir = tempfile.mkdtemp(prefix='benchmark_')
+            try:
+                run = BENCHMARKS[benchmark_name](size, seed, work_dir)
+                result = {'benchmark': benchmark_name, 'size': size, 'seed': seed, 'repeat': repeat}
+                result.update(measure(run, repeat))
+                result.update(environment)
+                yield result
+            finally:
+                shutil.rmtree(work_dir)
+
+''' Return results read from a json lines file
+'''
+def read_results(results_file_path):
+    with open(results_file_path) as results_file:
+        return [json.loads(line) for line in results_file if line.strip()]
+
+''' Return results slower or using more memory than the baseline result of the same
+    benchmark and size by more than tolerance (0.25 is 25%). Each regression has the
+    benchmark, size, measure, baseline and current value.
+'''
+def compare_results(results, baseline_results, tolerance=0.25):
+    baseline = dict(((result['benchmark'], result['size']), result) for result in baseline_results)
+    regressions = []
+    for result in results:
+        baseline_result = baseline.get((result['benchmark'], result['size']))
+        if baseline_result is None:
+            continue
+        for measure_name in ('seconds', 'peak_memory_bytes'):
+            if result[measure_name] > baseline_result[measure_name] * (1 + tolerance):
+                regressions.append({'benchmark': result['benchmark'], 'size': result['size'],
+                                    'measure': measure_name, 'baseline': baseline_result[measure_name],
+                                    'current': result[measure_name]})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the sample engines on generated inputs, '
+                                                 'results are written as json lines')
+    parser.add_argument("--benchmarks", nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help="benchmarks to run, defaults to all")
+    parser.add_argument("--sizes", nargs='+', type=int, default=DEFAULT_SIZES, help="input sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark and size")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the input generators")
+    parser.add_argument("--output", help="json lines output file, defaults to standard out")
+    parser.add_argument("--baseline", help="json lines results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown or memory growth against the baseline, 0.25 is 25%%")
+    args = parser.parse_args()
+
+    if args.repeat < 1:
+        print('Error: --repeat should be at least 1', file=sys.stderr)
+        sys.exit(1)
+
+    output_file = open(args.output, 'w') if args.output else sys.stdout
+    results = []
+    try:
+        for result in run_benchmarks(args.benchmarks, args.sizes, args.repeat, args.seed):
+            results.append(result)
+            output_file.write(json.dumps(result) + '\n')
+            output_file.flush()
+    finally:
+        if output_file is not sys.stdout:
+            output_file.close()
+
+    if args.baseline:
+        regressions = compare_results(results, read_results(args.baseline), args.tolerance)
+        for regression in regressions:
+            print('Regression: {benchmark} size {size} {measure} {baseline} -> {current}'.format(**regression),
+                  file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from unittest import TestCase
+from engines import ROOT_DIR, load_calendar_module
+import json
+import os
+
+
+class TestEngines(TestCase):
+
+    ''' Test every sample imports the instrumentation module of its own directory
+    '''
+    def test_sample_instrumentation(self):
+        import scheduler
+        import scheduler_instrumentation
+        import party_invitee_list
+        import party_instrumentation
+        calendar_sample = load_calendar_module()
+        import calendar_instrumentation
+
+        for sample_dir, module, instrumentation in (('class_scheduler', scheduler, scheduler_instrumentation),
+                                                    ('party_invite', party_invitee_list, party_instrumentation),
+                                                    ('calendar', calendar_sample, calendar_instrumentation)):
+            self.assertEqual(os.path.dirname(instrumentation.__file__), os.path.join(ROOT_DIR, sample_dir))
+            self.assertIs(module.INSTRUMENTATION, instrumentation.INSTRUMENTATION)
+        self.assertEqual(len(set([scheduler.INSTRUMENTATION, party_invitee_list.INSTRUMENTATION,
+                                  calendar_sample.INSTRUMENTATION])), 3)
+
+    ''' Test is_truncated_json of class_scheduler and party_invite on the same inputs: every
+        prefix of valid json is truncated, errors inside the text are not
+    '''
+    def test_is_truncated_json(self):
+        import catalog_loader
+        import party_invitee_list
+
+        valid_json = ['[{"name": "Calculus", "prerequisites": ["Algebra", "Logic"]}]',
+                      '{"latitude": "52.986375", "user_id": 12, "name": "Christina McArdle"}',
+                      '[true, false, null, -1.5e+10, NaN, -Infinity, "caf\\u00e9 \\"quoted\\" \\\\"]']
+        cases = []
+        for text in valid_json:
+            json.loads(text)
+            cases.extend((text[:end], True) for end in range(len(text)))
+        cases.extend((text, False) for text in ['[1, 2,, 3]', '{"name" "Calculus"}', '[tru x]', '{"a": 1]',
+                                                '["\\u12G4 is not an escape"]', '["\\x"]', '[1 2]'])
+
+        for text, truncated in cases:
+            try:
+                json.JSONDecoder().raw_decode(text)
+                self.fail('{!r} should not decode'.format(text))
+            except json.JSONDecodeError as e:
+                for module in (catalog_loader, party_invitee_list):
+                    self.assertEqual(module.is_truncated_json(text, e), truncated, (module.__name__, text))
@@ -0,0 +1,42 @@
+from unittest import TestCase
+from generators import generate_course_catalog, generate_customers, generate_events, REF_LAT, REF_LONG
+import datetime
+
+
+class TestGenerators(TestCase):
+
+    ''' Test generated catalogs have the asked size, depth and fan in, and are the same for a seed
+    '''
+    def test_generate_course_catalog(self):
+        courses = generate_course_catalog(500, depth=8, fan_in=3, seed=1)
+        self.assertEqual(len(courses), 500)
+        self.assertEqual(courses, generate_course_catalog(500, depth=8, fan_in=3, seed=1))
+        self.assertNotEqual(courses, generate_course_catalog(500, depth=8, fan_in=3, seed=2))
+
+        prerequisites = dict((course['name'], course['prerequisites']) for course in courses)
+        self.assertLessEqual(max(len(course_prerequisites) for course_prerequisites in prerequisites.values()), 3)
+
+        # length of the longest prerequisite chain, prerequisites have lower course ids
+        chain_lengths = {}
+        for name in sorted(prerequisites, key=lambda name: int(name.split()[1])):
+            chain_lengths[name] = 1 + max([chain_lengths[prerequisite] for prerequisite in prerequisites[name]] or [0])
+        self.assertEqual(max(chain_lengths.values()), 8)
+
+    ''' Test generated customers are around the reference point
+    '''
+    def test_generate_customers(self):
+        customers = generate_customers(1000, spread=2, seed=1)
+        self.assertEqual([customer['user_id'] for customer in customers], list(range(1000)))
+        for customer in customers:
+            self.assertLessEqual(abs(float(customer['latitude']) - REF_LAT), 2)
+            self.assertLessEqual(abs(float(customer['longitude']) - REF_LONG), 2)
+
+    ''' Test generated events have valid dates in the asked years
+    '''
+    def test_generate_events(self):
+        events = generate_events(1000, years=3, start_year=2020, seed=1)['events']
+        self.assertEqual(len(events), 1000)
+        for event in events:
+            self.assertEqual(sorted(event), ['day', 'invited_count', 'month', 'occasion', 'year'])
+            date = datetime.date(event['year'], event['month'], event['day'])
+            self.assertTrue(datetime.date(2020, 1, 1) <= date < datetime.date(2023, 1, 1))
@@ -0,0 +1,27 @@
+from unittest import TestCase
+from harness import run_benchmarks, compare_results
+from engines import BENCHMARKS
+
+
+class TestHarness(TestCase):
+
+    ''' Test every benchmark runs and reports its measures
+    '''
+    def test_run_benchmarks(self):
+        results = list(run_benchmarks(list(BENCHMARKS), [10, 50], repeat=1))
+        self.assertEqual([(result['benchmark'], result['size']) for result in results],
+                         [(benchmark_name, size) for benchmark_name in BENCHMARKS for size in [10, 50]])
+        for result in results:
+            self.assertGreater(result['seconds'], 0)
+            self.assertGreater(result['peak_memory_bytes'], 0)
+
+    ''' Test compare_results reports measures above the tolerance only
+    '''
+    def test_compare_results(self):
+        baseline = [{'benchmark': 'calendar', 'size': 10, 'seconds': 1.0, 'peak_memory_bytes': 1000}]
+        results = [{'benchmark': 'calendar', 'size': 10, 'seconds': 1.2, 'peak_memory_bytes': 2000},
+                   {'benchmark': 'calendar', 'size': 20, 'seconds': 9.0, 'peak_memory_bytes': 9000}]
+        self.assertEqual(compare_results(results, baseline, 0.25),
+                         [{'benchmark': 'calendar', 'size': 10, 'measure': 'peak_memory_bytes', 'baseline': 1000,
+                           'current': 2000}])
+        self.assertEqual(len(compare_results(results, baseline, 0.1)), 2)
@@ -1,6 +1,33 @@
 import json
 import datetime
 import argparse
+import csv
+import gc
+import hashlib
+import heapq
+import io
+import os
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import chain, compress, islice, repeat, takewhile
+from operator import add, attrgetter, is_not, itemgetter, le, methodcaller, mul, sub
+
+from calendar_instrumentation import INSTRUMENTATION, run_profiled
+
+OUTPUT_FORMATS = ('text', 'csv', 'jsonl')
+# events rendered before every write to the output
+OUTPUT_CHUNK_SIZE = 1000
+EVENT_ORDINAL = attrgetter('ordinal')
+# months between occurrences of an interval of one, None for weekly (7 days)
+FREQUENCIES = {'weekly': None, 'monthly': 1, 'yearly': 12}
+# periods of invited count rollups, weeks start on monday
+PERIODS = ('day', 'week', 'month')
+# days after the last event date recurring events are counted until by invited count
+# queries without an end date
+RECURRENCE_HORIZON_DAYS = 366
 
 ''' Reads events from json and displays the events sorted by event date
 '''
@@ -11,6 +38,7 @@ class Calendar(object):
 
     ''' Read events json file and return events json.
     '''
+    @INSTRUMENTATION.timed('read_json')
     def read_events_json_file(self):
         events_json_file = None
 
@@ -31,75 +59,802 @@ class Calendar(object):
 
     ''' Returns list of Event objects from events json
     '''
+    @INSTRUMENTATION.timed('parse_events_json')
     def parse_events_json(self):
-        events = []
+        events_json = self.read_events_json_file()
+        # the garbage collector would scan the whole events json again and again while events are created
+        gc_enabled = gc.isenabled()
+        gc.disable()
         try:
-            events_dict = self.read_events_json_file()['events']
-            for event in events_dict:
-                # Check if year, month and day are int
-                if not isinstance(event['year'], int) or not isinstance(event['month'], int) or \
-                        not isinstance(event['day'], int):
-                    raise Exception('Invalid date in json')
-                events.append(Event(name=event['occasion'],
-                                    invited_count=event['invited_count'],
-                                    date=datetime.date(year=event['year'],
-                                                       month=event['month'],
-                                                       day=event['day'])))
-        except ValueError:
-            raise Exception('Date is invalid')
-        except KeyError:
-            raise Exception('Key missing from events json')
-        except Exception:
-            raise Exception('Error parsing events json')
-
+            names, invited_counts, ordinals = parse_event_columns(events_json)
+            events = list(map(Event, names, invited_counts, map(datetime.date.fromordinal, ordinals), ordinals))
+            for index, recurrence in parse_event_recurrences(events_json):
+                events[index].recurrence = recurrence
+        finally:
+            if gc_enabled:
+                gc.enable()
+        INSTRUMENTATION.count('events', len(events))
         return events
 
     ''' Sort event list containing Event objects by date asc.
     '''
     @staticmethod
+    @INSTRUMENTATION.timed('sort')
     def sort_events_by_date(events):
-        return sorted(events, key=lambda x: x.date)
+        return sorted(events, key=EVENT_ORDINAL)
+
 
+    ''' Returns an EventStore of the events json
+    '''
+    def get_event_store(self):
+        return EventStore(self.parse_events_json())
 
-    ''' Display events sorted by event date in asc order
+    ''' Display events sorted by event date in asc order, in output_format (see print_events)
     '''
-    def display_events(self):
+    def display_events(self, output_format='text', as_of=None):
         events = self.parse_events_json()
-        if len(events) == 0:
-            print('No events to display')
+        self.print_events(self.sort_events_by_date(events), output_format, as_of=as_of)
+
+    ''' Display events between start_date and end_date (both included) in asc order
+    '''
+    def display_events_between(self, start_date, end_date, output_format='text', as_of=None):
+        self.print_events(self.get_event_store().between(start_date, end_date), output_format, as_of=as_of)
+
+    ''' Display the next count events from as_of (today by default) in asc order
+    '''
+    def display_upcoming_events(self, count, output_format='text', as_of=None):
+        self.print_events(self.get_event_store().upcoming(count, as_of), output_format, as_of=as_of)
+
+    ''' Display the total invited count of events per period (day, week or month) between
+        start_date and end_date (all dates of the events by default)
+    '''
+    def display_invited_counts(self, period='week', start_date=None, end_date=None, output_format='text'):
+        rollup = self.get_event_store().invited_count_rollup(period, start_date, end_date)
+        self.print_invited_counts(rollup, period, output_format)
+
+    ''' Display the count periods (day, week or month) with the most invited guests
+        between start_date and end_date (all dates of the events by default), busiest first
+    '''
+    def display_busiest_periods(self, count, period='week', start_date=None, end_date=None, output_format='text'):
+        busiest_periods = self.get_event_store().busiest_periods(count, period, start_date, end_date)
+        self.print_invited_counts(busiest_periods, period, output_format)
+
+    ''' Display (first day of period, invited count) rows of period to output (standard
+        out by default) in one of OUTPUT_FORMATS
+    '''
+    @staticmethod
+    def print_invited_counts(rows, period, output_format='text', output=None):
+        output = output if output is not None else sys.stdout
+        if output_format == 'csv':
+            output.write(_CsvEventRenderer().render_rows(chain([('period', 'start_date', 'invited_count')],
+                                                               ((period, start_date.isoformat(), invited_count)
+                                                                for start_date, invited_count in rows))))
+        elif output_format == 'jsonl':
+            output.write(''.join(json.dumps({'period': period, 'start_date': start_date.isoformat(),
+                                             'invited_count': invited_count}) + '\n'
+                                 for start_date, invited_count in rows))
+        else:
+            output.write(''.join('{} {} - Invited Count: {}\n'.format(period.capitalize(), start_date, invited_count)
+                                 for start_date, invited_count in rows))
+        output.flush()
+
+    ''' Display events in list order, to output (standard out by default) in one of
+        OUTPUT_FORMATS: text, csv with a header line, or one json object per line.
+        Events are rendered OUTPUT_CHUNK_SIZE at a time and every chunk is written at once.
+        Days until events are counted from as_of (today by default) for every event.
+    '''
+    @staticmethod
+    def print_events(events, output_format='text', output=None, as_of=None):
+        output = output if output is not None else sys.stdout
+        render = {'text': _render_text_events, 'csv': _CsvEventRenderer(), 'jsonl': _render_jsonl_events}[output_format]
+        if output_format == 'text' and len(events) == 0:
+            output.write('No events to display\n')
+        if output_format == 'csv':
+            output.write(render.render_rows([('name', 'invited_count', 'date', 'days_til_event')]))
+
+        as_of = as_of if as_of is not None else datetime.date.today()
+        with INSTRUMENTATION.stage('print'):
+            for start in range(0, len(events), OUTPUT_CHUNK_SIZE):
+                chunk = events[start:start + OUTPUT_CHUNK_SIZE]
+                output.write(render(chunk, get_days_until(map(EVENT_ORDINAL, chunk), as_of, len(chunk))))
+        output.flush()
+
+''' Returns the number of days from as_of to each of the ordinal days ordinals, negative
+    for days before as_of. count is the number of ordinals if ordinals is an iterator.
+'''
+def get_days_until(ordinals, as_of, count=None):
+    count = count if count is not None else len(ordinals)
+    return list(map(sub, ordinals, repeat(as_of.toordinal(), count)))
+
+''' Validates events json and returns its events as columns: names, invited counts and
+    ordinal days (array) of the event dates. Every field is taken and checked for all
+    events at once with map, and ordinal days are computed from the first ordinal day
+    of each distinct month, without creating date objects.
+'''
+def parse_event_columns(events_json):
+    try:
+        events = events_json['events']
+        names = list(map(itemgetter('occasion'), events))
+        invited_counts = list(map(itemgetter('invited_count'), events))
+        years, months, days = [list(map(itemgetter(field), events)) for field in ('year', 'month', 'day')]
+        # Check if year, month and day are int
+        if not all(map(isinstance, chain(years, months, days), repeat(int))):
+            raise Exception('Invalid date in json')
+
+        if months and (min(months) < 1 or max(months) > 12):
+            raise ValueError('month must be in 1..12')
+        month_keys = list(map(add, map(mul, years, repeat(12)), map(sub, months, repeat(1))))
+        month_days = dict((month_key, _get_month_days(month_key // 12, month_key % 12 + 1))
+                          for month_key in set(month_keys))
+        first_days = list(map(itemgetter(0), map(month_days.__getitem__, month_keys)))
+        month_lengths = map(itemgetter(1), map(month_days.__getitem__, month_keys))
+        if days and (min(days) < 1 or not all(map(le, days, month_lengths))):
+            raise ValueError('day is out of range for month')
+        ordinals = array('l', map(add, first_days, map(sub, days, repeat(1))))
+    except ValueError:
+        raise Exception('Date is invalid')
+    except KeyError:
+        raise Exception('Key missing from events json')
+    except Exception:
+        raise Exception('Error parsing events json')
+
+    return names, invited_counts, ordinals
+
+''' Returns (index, Recurrence) for every event of events json with a recurrence rule:
+    {"frequency": "yearly"|"monthly"|"weekly", "interval": int, "count": int,
+     "until": {"year": int, "month": int, "day": int}}, all keys but frequency optional.
+'''
+def parse_event_recurrences(events_json):
+    recurrences = []
+    try:
+        recurrence_jsons = list(map(methodcaller('get', 'recurrence'), events_json['events']))
+        for index in compress(range(len(recurrence_jsons)), map(is_not, recurrence_jsons, repeat(None))):
+            recurrence_json = recurrence_jsons[index]
+            until = recurrence_json.get('until')
+            if until is not None:
+                until = datetime.date(until['year'], until['month'], until['day'])
+            recurrences.append((index, Recurrence(recurrence_json['frequency'], recurrence_json.get('interval', 1),
+                                                  recurrence_json.get('count'), until)))
+    except (KeyError, TypeError, ValueError):
+        raise Exception('Invalid recurrence in events json')
+    return recurrences
+
+''' Return (ordinal day of the first day, number of days) of a month,
+    raises ValueError for invalid months
+'''
+def _get_month_days(year, month):
+    first_day = datetime.date(year, month, 1).toordinal()
+    if month == 12:
+        return first_day, 31
+    return first_day, datetime.date(year, month + 1, 1).toordinal() - first_day
+
+''' Return the text of events, days_until are the days until every event
+'''
+def _render_text_events(events, days_until):
+    chunk = []
+    for event, days_til_event in zip(events, days_until):
+        if days_til_event < 0:
+            chunk.append("Following event was {} days ago: \n\n".format(-days_til_event))
         else:
-            events = self.sort_events_by_date(events)
-            for event in events:
-                if event.days_til_event < 0:
-                    print("Following event was {} days ago: \n".format(abs(event.days_til_event)))
-                else:
-                    print("Folowing event in {} days: \n".format(event.days_til_event))
-                print("Event: {}\n".format(event.name))
-                print("Invited Count: {}\n".format(event.invited_count))
-                print("Date: {}\n".format(event.date))
-                print("-----------------------------")
+            chunk.append("Folowing event in {} days: \n\n".format(days_til_event))
+        chunk.append("Event: {}\n\nInvited Count: {}\n\nDate: {}\n\n-----------------------------\n".format(
+            event.name, event.invited_count, event.date))
+    return ''.join(chunk)
+
+''' Return one json object per line for events
+'''
+def _render_jsonl_events(events, days_until):
+    return ''.join(json.dumps({'name': event.name, 'invited_count': event.invited_count,
+                               'date': event.date.isoformat(), 'days_til_event': days_til_event}) + '\n'
+                   for event, days_til_event in zip(events, days_until))
+
+''' Renders csv lines of events into one reused buffer
+'''
+class _CsvEventRenderer(object):
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def __call__(self, events, days_until):
+        return self.render_rows((event.name, event.invited_count, event.date.isoformat(), days_til_event)
+                                for event, days_til_event in zip(events, days_until))
+
+    ''' Return csv lines of rows
+    '''
+    def render_rows(self, rows):
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._writer.writerows(rows)
+        return self._buffer.getvalue()
+
+''' Events indexed by date for range and upcoming queries.
+
+    Events are kept in a list sorted by date, with a parallel array of the ordinal
+    day of every event, events on the same day in insertion order. Queries bisect
+    the ordinal array, so they take O(log n + k) for k events returned. Adding or
+    removing an event bisects to its position and shifts the following entries,
+    without sorting the events again.
+
+    Recurring events are kept apart and expanded lazily by queries: the occurrences
+    of every recurring event from the start of the query are merged with the other
+    events through a heap, and generated only until the query has its events.
+'''
+class EventStore(object):
+
+    def __init__(self, events=()):
+        events = Calendar.sort_events_by_date(events)
+        self._recurring = [event for event in events if event.recurrence is not None]
+        if self._recurring:
+            events = [event for event in events if event.recurrence is None]
+        self._events = events
+        self._ordinals = array('l', map(EVENT_ORDINAL, events))
+        self._invited_counts = None
+
+    def __len__(self):
+        return len(self._events) + len(self._recurring)
+
+    ''' Iterate events (recurring events once, at their first date) in asc order
+    '''
+    def __iter__(self):
+        if not self._recurring:
+            return iter(self._events)
+        return heapq.merge(self._events, self._recurring, key=EVENT_ORDINAL)
+
+    ''' Add an Event, after the events already on its date
+    '''
+    def add(self, event):
+        if event.recurrence is not None:
+            self._recurring.append(event)
+            self._recurring.sort(key=EVENT_ORDINAL)
+        else:
+            ordinal = event.ordinal
+            index = bisect_right(self._ordinals, ordinal)
+            self._ordinals.insert(index, ordinal)
+            self._events.insert(index, event)
+        self._update_invited_counts(event, 1)
+
+    ''' Remove an Event added to the store, raises an exception if it is not in the store
+    '''
+    def remove(self, event):
+        if event.recurrence is not None and event in self._recurring:
+            self._recurring.remove(event)
+            self._update_invited_counts(event, -1)
+            return
+        ordinal = event.ordinal
+        for index in range(bisect_left(self._ordinals, ordinal), bisect_right(self._ordinals, ordinal)):
+            if self._events[index] is event:
+                del self._ordinals[index]
+                del self._events[index]
+                self._update_invited_counts(event, -1)
+                return
+        raise Exception('Event {} is not in the event store'.format(event.name))
+
+    ''' Iterate events on or after from_date in asc order, with an Event for every
+        occurrence of recurring events, generated as the iteration reaches it.
+        One-off events are read by index from the bisected position, events before
+        from_date are not visited.
+    '''
+    def occurrences(self, from_date):
+        start = bisect_left(self._ordinals, from_date.toordinal())
+        return heapq.merge(map(self._events.__getitem__, range(start, len(self._events))),
+                           *[event.occurrences(from_date) for event in self._recurring], key=EVENT_ORDINAL)
+
+    ''' Returns events between start_date and end_date, both included, in asc order
+    '''
+    def between(self, start_date, end_date):
+        end_ordinal = end_date.toordinal()
+        if self._recurring:
+            return list(takewhile(lambda event: event.ordinal <= end_ordinal, self.occurrences(start_date)))
+        start = bisect_left(self._ordinals, start_date.toordinal())
+        end = bisect_right(self._ordinals, end_ordinal)
+        return self._events[start:end]
+
+    ''' Returns the next count events on or after from_date (today by default), in asc order
+    '''
+    def upcoming(self, count, from_date=None):
+        from_date = from_date if from_date is not None else datetime.date.today()
+        if self._recurring:
+            return list(islice(self.occurrences(from_date), max(count, 0)))
+        start = bisect_left(self._ordinals, from_date.toordinal())
+        return self._events[start:start + max(count, 0)]
+
+    ''' Returns the total invited count of the events, with every occurrence of recurring
+        events, between start_date and end_date, both included
+    '''
+    def invited_total(self, start_date, end_date):
+        start_date, end_date = self._get_invited_count_window(start_date, end_date)
+        if start_date is None or start_date > end_date:
+            return 0
+        return self.invited_counts(start_date, end_date).total(start_date, end_date)
+
+    ''' Returns (first day of period, total invited count) of every period (day, week or
+        month) between start_date and end_date in asc order, see InvitedCountIndex.rollup.
+        Dates default to the first date of the events and to the last date of the events,
+        or RECURRENCE_HORIZON_DAYS after it if there are recurring events.
+    '''
+    def invited_count_rollup(self, period='day', start_date=None, end_date=None):
+        start_date, end_date = self._get_invited_count_window(start_date, end_date)
+        return self.invited_counts(start_date, end_date).rollup(period, start_date, end_date)
+
+    ''' Returns the count periods with the largest total invited count between start_date
+        and end_date (see invited_count_rollup), as (first day of period, total invited
+        count), largest first
+    '''
+    def busiest_periods(self, count, period='week', start_date=None, end_date=None):
+        start_date, end_date = self._get_invited_count_window(start_date, end_date)
+        return self.invited_counts(start_date, end_date).busiest(count, period, start_date, end_date)
+
+    ''' Returns the InvitedCountIndex of the invited counts of the events, with the
+        occurrences of recurring events, over all one-off event dates and at least
+        start_date to end_date (see invited_count_rollup for the default dates).
+        The index is kept and kept up to date by add and remove. It is built again when
+        a query needs dates out of it, growing by at least its number of days, or on the
+        next query after an event out of its dates was added or removed.
+    '''
+    def invited_counts(self, start_date=None, end_date=None):
+        start_date, end_date = self._get_invited_count_window(start_date, end_date)
+        invited_counts = self._invited_counts
+        if start_date is None:
+            if invited_counts is None:
+                invited_counts = self._invited_counts = InvitedCountIndex(None, None)
+            return invited_counts
+        end_date = max(start_date, end_date)
+
+        first_ordinal = start_date.toordinal()
+        last_ordinal = max(end_date.toordinal(), first_ordinal)
+        if self._events:
+            first_ordinal = min(first_ordinal, self._ordinals[0])
+            last_ordinal = max(last_ordinal, self._ordinals[-1])
+        if invited_counts is not None and invited_counts.first_day is not None:
+            index_first_ordinal = invited_counts.first_day.toordinal()
+            index_last_ordinal = invited_counts.last_day.toordinal()
+            if index_first_ordinal <= first_ordinal and last_ordinal <= index_last_ordinal:
+                return invited_counts
+            # grow by the days of the index at least, so windows moving on rebuild it rarely
+            day_count = index_last_ordinal - index_first_ordinal + 1
+            if first_ordinal < index_first_ordinal:
+                first_ordinal = max(min(first_ordinal, index_first_ordinal - day_count), 1)
+            if last_ordinal > index_last_ordinal:
+                last_ordinal = min(max(last_ordinal, index_last_ordinal + day_count), datetime.date.max.toordinal())
+            first_ordinal = min(first_ordinal, index_first_ordinal)
+            last_ordinal = max(last_ordinal, index_last_ordinal)
+
+        first_day = datetime.date.fromordinal(first_ordinal)
+        last_day = datetime.date.fromordinal(last_ordinal)
+        invited_counts = InvitedCountIndex(first_day, last_day, self._events)
+        for event in self._recurring:
+            invited_counts.add_all(self._occurrences_within(event, first_day, last_day))
+        self._invited_counts = invited_counts
+        return invited_counts
+
+    ''' Return (start_date, end_date) with the default dates of invited_count_rollup for
+        None, and cut to the first date of the events and to the last date events can
+        have, as there are no invited counts out of these dates. Returns (None, None)
+        if there are no events.
+    '''
+    def _get_invited_count_window(self, start_date, end_date):
+        first_dates = [event.date for event in self._recurring]
+        last_dates = [event.recurrence.last_date(event.date) for event in self._recurring]
+        if self._events:
+            first_dates += [self._events[0].date, self._events[-1].date]
+            last_dates.append(self._events[-1].date)
+        if not first_dates:
+            return None, None
+
+        first_date = min(first_dates)
+        last_date = max(last_dates)
+        start_date = max(start_date, first_date) if start_date is not None else first_date
+        if end_date is None:
+            # recurring events are counted until RECURRENCE_HORIZON_DAYS after the last event date
+            end_date = datetime.date.fromordinal(min(max(first_dates).toordinal() + RECURRENCE_HORIZON_DAYS,
+                                                     datetime.date.max.toordinal())) \
+                if self._recurring else max(first_dates)
+        return start_date, min(end_date, last_date)
+
+    ''' Add (sign 1) or remove (sign -1) the invited counts of event to the index if it
+        is built and has the dates of event, drop the index otherwise
+    '''
+    def _update_invited_counts(self, event, sign):
+        invited_counts = self._invited_counts
+        if invited_counts is None:
+            return
+        if not invited_counts.covers(event.date):
+            self._invited_counts = None
+            return
+        for occurrence in self._occurrences_within(event, invited_counts.first_day, invited_counts.last_day):
+            invited_counts.add(occurrence.date, sign * occurrence.invited_count)
+
+    @staticmethod
+    def _occurrences_within(event, first_day, last_day):
+        last_ordinal = last_day.toordinal()
+        return takewhile(lambda occurrence: occurrence.ordinal <= last_ordinal, event.occurrences(first_day))
+
+''' Total invited count of events per day, for range sums and rollups.
+
+    Invited counts of the days from first_day to last_day are kept in an array and in
+    a Fenwick tree (binary indexed tree) over the days, so adding to a day and the
+    total of any range of days take O(log d) for d days. Rollups per day, week or month
+    take one range total per period, and the busiest periods are the largest of them.
+    Dates out of first_day..last_day have no invited count.
+    Properties - first_day:date, last_day:date (None if no days)
+'''
+class InvitedCountIndex(object):
+
+    ''' Index of days first_day to last_day, with the invited counts of events
+    '''
+    def __init__(self, first_day, last_day, events=()):
+        self.first_day = first_day
+        self.last_day = last_day
+        self._first_ordinal = first_day.toordinal() if first_day is not None else 0
+        size = last_day.toordinal() - self._first_ordinal + 1 if first_day is not None else 0
+        self._counts = array('q', bytes(8 * size))
+        for event in events:
+            self._counts[event.ordinal - self._first_ordinal] += event.invited_count
+        # tree[i] is the total of days i - (i & -i) + 1 to i (1 based), built in O(d)
+        self._tree = array('q', [0]) + self._counts
+        for index in range(1, size + 1):
+            parent = index + (index & -index)
+            if parent <= size:
+                self._tree[parent] += self._tree[index]
+
+    def covers(self, date):
+        return self.first_day is not None and self.first_day <= date <= self.last_day
+
+    ''' Add invited_count (negative to remove it) to date, which must be covered
+    '''
+    def add(self, date, invited_count):
+        if not self.covers(date):
+            raise Exception('Date {} is not in the invited count index'.format(date))
+        index = date.toordinal() - self._first_ordinal
+        self._counts[index] += invited_count
+        index += 1
+        size = len(self._counts)
+        while index <= size:
+            self._tree[index] += invited_count
+            index += index & -index
+
+    ''' Add the invited counts of events
+    '''
+    def add_all(self, events):
+        for event in events:
+            self.add(event.date, event.invited_count)
+
+    ''' Return the total invited count of the first count days
+    '''
+    def _prefix_total(self, count):
+        total = 0
+        while count > 0:
+            total += self._tree[count]
+            count -= count & -count
+        return total
+
+    ''' Returns the total invited count of the days between start_date and end_date, both included
+    '''
+    def total(self, start_date, end_date):
+        start = max(start_date.toordinal() - self._first_ordinal, 0)
+        end = min(end_date.toordinal() - self._first_ordinal + 1, len(self._counts))
+        if start >= end:
+            return 0
+        return self._prefix_total(end) - self._prefix_total(start)
+
+    ''' Returns (first day of period, total invited count) of every period (day, week
+        or month) between start_date and end_date (the index days by default) in asc
+        order, periods cut at start_date and end_date
+    '''
+    def rollup(self, period='day', start_date=None, end_date=None):
+        if self.first_day is None:
+            return []
+        start_date = max(start_date, self.first_day) if start_date is not None else self.first_day
+        end_date = min(end_date, self.last_day) if end_date is not None else self.last_day
+        if period == 'day':
+            start = start_date.toordinal() - self._first_ordinal
+            end = end_date.toordinal() - self._first_ordinal + 1
+            return [(datetime.date.fromordinal(self._first_ordinal + index), self._counts[index])
+                    for index in range(start, end)]
+
+        rollup = []
+        period_start = _get_period_start(start_date, period)
+        while period_start is not None and period_start <= end_date:
+            next_period_start = _get_next_period_start(period_start, period)
+            period_end = end_date if next_period_start is None else \
+                min(next_period_start - datetime.timedelta(days=1), end_date)
+            rollup.append((period_start, self.total(max(period_start, start_date), period_end)))
+            period_start = next_period_start
+        return rollup
+
+    ''' Returns the count periods (day, week or month) with the largest total invited
+        count between start_date and end_date (the index days by default), as
+        (first day of period, total invited count), largest first
+    '''
+    def busiest(self, count, period='week', start_date=None, end_date=None):
+        return heapq.nlargest(count, self.rollup(period, start_date, end_date), key=itemgetter(1))
+
+''' Return the first day of the period (day, week or month) of date
+'''
+def _get_period_start(date, period):
+    if period == 'week':
+        return date - datetime.timedelta(days=date.weekday())
+    if period == 'month':
+        return date.replace(day=1)
+    return date
+
+''' Return the first day of the period (day, week or month) after the period starting
+    on period_start, None after datetime.date.max
+'''
+def _get_next_period_start(period_start, period):
+    days = {'day': 1, 'week': 7}.get(period)
+    if days is None:
+        days = _get_month_days(period_start.year, period_start.month)[1]
+    try:
+        return period_start + datetime.timedelta(days=days)
+    except OverflowError:
+        return None
+
+''' Calendar for long running processes, keeping the parsed events of the events
+    json file in memory.
+
+    Every read checks the file with os.stat, and the events are parsed again only if
+    its device, inode, size or modification time changed, or with hash_content if the
+    sha256 of its content changed too (to ignore touched but unchanged files). Checks
+    are skipped for check_interval seconds after a check. Parsed events are kept in an
+    EventStore snapshot that is replaced, never changed, when the file changes, so any
+    number of threads can read the events while one thread reloads them. Snapshots
+    returned by get_event_store must not be changed.
+    Properties - reloads:int, number of times the events were parsed.
+'''
+class CachedCalendar(Calendar):
+
+    def __init__(self, events_json_file_path, hash_content=False, check_interval=0):
+        super(CachedCalendar, self).__init__(events_json_file_path)
+        self.hash_content = hash_content
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._store = None
+        self._stat_signature = None
+        self._content_hash = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    ''' Return (device, inode, size, modification time) of the events json file
+    '''
+    def _get_stat_signature(self):
+        try:
+            stat = os.stat(self.events_json_file_path)
+        except FileNotFoundError:
+            raise Exception('{} does not exist'.format(self.events_json_file_path))
+        except OSError:
+            raise Exception('Error occured while opening file {}'.format(self.events_json_file_path))
+        return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _get_content_hash(self):
+        try:
+            with open(self.events_json_file_path, 'rb') as events_json_file:
+                return hashlib.sha256(events_json_file.read()).hexdigest()
+        except IOError:
+            raise Exception('Error occured while opening file {}'.format(self.events_json_file_path))
+
+    ''' Returns the EventStore of the events json file, parsed again if the file changed
+    '''
+    def get_event_store(self):
+        store = self._store
+        if store is not None and self._checked_at is not None and \
+                time.monotonic() - self._checked_at < self.check_interval:
+            return store
+        if store is not None and self._get_stat_signature() == self._stat_signature:
+            self._checked_at = time.monotonic()
+            return store
+
+        with self._lock:
+            # the file is checked before it is read, a change while reading is seen by the next check
+            stat_signature = self._get_stat_signature()
+            if self._store is None or stat_signature != self._stat_signature:
+                content_hash = self._get_content_hash() if self.hash_content else None
+                if self._store is None or content_hash is None or content_hash != self._content_hash:
+                    self._store = EventStore(Calendar.parse_events_json(self))
+                    self._content_hash = content_hash
+                    self.reloads += 1
+                self._stat_signature = stat_signature
+            self._checked_at = time.monotonic()
+            return self._store
+
+    ''' Returns list of Event objects of the events json file, sorted by date
+    '''
+    def parse_events_json(self):
+        return list(self.get_event_store())
+
+    ''' Returns events between start_date and end_date, both included, in asc order
+    '''
+    def events_between(self, start_date, end_date):
+        return self.get_event_store().between(start_date, end_date)
+
+    ''' Returns the next count events on or after from_date (today by default), in asc order
+    '''
+    def upcoming_events(self, count, from_date=None):
+        return self.get_event_store().upcoming(count, from_date)
 
 ''' Event object
-    Properties - name:string, invited_count:int, date:date,
-    days_til_event: int
+    Properties - name:string, invited_count:int, date:date (first date of recurring events),
+    ordinal:int (ordinal day of date), recurrence:Recurrence or None, days_til_event: int
 '''
 class Event(object):
-    def __init__(self, name, invited_count, date):
+    __slots__ = ('name', 'invited_count', '_date', 'ordinal', 'recurrence')
+
+    def __init__(self, name, invited_count, date, ordinal=None, recurrence=None):
         self.name = name
         self.invited_count = invited_count
-        self.date = date
+        self._date = date
+        self.ordinal = ordinal if ordinal is not None else date.toordinal()
+        self.recurrence = recurrence
+
+    @property
+    def date(self):
+        return self._date
+
+    @date.setter
+    def date(self, date):
+        self._date = date
+        self.ordinal = date.toordinal()
 
     @property
     def days_til_event(self):
-        delta_date = self.date - datetime.date.today()
-        return delta_date.days
+        return self.days_until(datetime.date.today())
+
+    ''' Return the number of days from as_of to the event, negative if the event is before as_of
+    '''
+    def days_until(self, as_of):
+        return self.ordinal - as_of.toordinal()
+
+    ''' Iterate the occurrences of the event on or after from_date (all by default) in
+        asc order: the event itself, or an Event for every date of its recurrence
+    '''
+    def occurrences(self, from_date=None):
+        if self.recurrence is None:
+            if from_date is None or self._date >= from_date:
+                yield self
+            return
+        for date in self.recurrence.dates(self._date, from_date):
+            yield Event(self.name, self.invited_count, date)
+
+''' Recurrence rule of an event: every interval weeks, months or years (frequency
+    weekly, monthly or yearly) from the event date, for count occurrences (the event
+    date included) and until a date, both unlimited if None. Monthly and yearly
+    occurrences keep the day of the event date, or the last day of shorter months
+    (a yearly event on February 29 is on February 28 in other years).
+'''
+class Recurrence(object):
+
+    def __init__(self, frequency, interval=1, count=None, until=None):
+        if frequency not in FREQUENCIES:
+            raise ValueError('frequency should be one of {}'.format(', '.join(FREQUENCIES)))
+        if not isinstance(interval, int) or interval < 1 or \
+                (count is not None and (not isinstance(count, int) or count < 0)):
+            raise ValueError('interval should be a positive int and count an int')
+        self.frequency = frequency
+        self.interval = interval
+        self.count = count
+        self.until = until
+
+    ''' Iterate the dates of the recurrence from start_date, on or after from_date (all
+        by default). Dates are computed from their index, the dates before from_date
+        are skipped without being generated.
+    '''
+    def dates(self, start_date, from_date=None):
+        index = self._first_index(start_date, from_date) if from_date is not None else 0
+        until = self.until if self.until is not None else datetime.date.max
+        while self.count is None or index < self.count:
+            try:
+                date = self._date(start_date, index)
+            except (OverflowError, ValueError):
+                # after datetime.date.max
+                return
+            if date > until:
+                return
+            if from_date is None or date >= from_date:
+                yield date
+            index += 1
+
+    ''' Return the last date of the recurrence from start_date, datetime.date.max if
+        it has no count and no until date. The date may have no occurrence when until
+        is before the date of the last counted occurrence.
+    '''
+    def last_date(self, start_date):
+        last_date = self.until if self.until is not None else datetime.date.max
+        if self.count is not None:
+            try:
+                last_date = min(last_date, self._date(start_date, max(self.count - 1, 0)))
+            except (OverflowError, ValueError):
+                pass
+        return max(last_date, start_date)
+
+    ''' Return the index of the first date on or after from_date, or of one or two
+        dates before it for monthly and yearly recurrences
+    '''
+    def _first_index(self, start_date, from_date):
+        if from_date <= start_date:
+            return 0
+        months = FREQUENCIES[self.frequency]
+        if months is None:
+            return -(-(from_date - start_date).days // (7 * self.interval))
+        month_count = (from_date.year - start_date.year) * 12 + from_date.month - start_date.month
+        return month_count // (months * self.interval)
+
+    ''' Return the date at index of the recurrence from start_date
+    '''
+    def _date(self, start_date, index):
+        months = FREQUENCIES[self.frequency]
+        if months is None:
+            return datetime.date.fromordinal(start_date.toordinal() + 7 * self.interval * index)
+        month_index = start_date.month - 1 + months * self.interval * index
+        year, month = start_date.year + month_index // 12, month_index % 12 + 1
+        return datetime.date(year, month, min(start_date.day, _get_month_days(year, month)[1]))
+
+''' Return the date of a YYYY-MM-DD string
+'''
+def parse_date(date_string):
+    # not strptime, which imports the standard library calendar module this module hides
+    try:
+        year, month, day = date_string.split('-')
+        return datetime.date(int(year), int(month), int(day))
+    except ValueError:
+        raise argparse.ArgumentTypeError('invalid date {}, expected YYYY-MM-DD'.format(date_string))
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("-customer_json_file", help="customer json file path")
+    parser.add_argument("-profile", nargs='?', const='', metavar="PROFILE_FILE",
+                        help="write stage timings and counters and the top functions by time to standard error, "
+                             "or dump the cProfile profile to PROFILE_FILE")
+    parser.add_argument("-start_date", help="display events from this date, YYYY-MM-DD", type=parse_date)
+    parser.add_argument("-end_date", help="display events until this date, YYYY-MM-DD", type=parse_date)
+    parser.add_argument("-upcoming", help="display the next UPCOMING events from today", type=int)
+    parser.add_argument("-format", help="output format", choices=OUTPUT_FORMATS, default='text')
+    parser.add_argument("-invited_counts", action='store_true',
+                        help="display the invited count per PERIOD, between -start_date and -end_date if set")
+    parser.add_argument("-busiest", help="display the BUSIEST periods with the most invited guests", type=int)
+    parser.add_argument("-period", help="period of -invited_counts and -busiest", choices=PERIODS, default='week')
+    parser.add_argument("-as_of", help="count days until events from this date instead of today, YYYY-MM-DD",
+                        type=parse_date)
+    parser.add_argument("-watch", help="keep running and display events again when the events file changes, "
+                                       "checking it every WATCH seconds", type=float)
     args = parser.parse_args()
 
-    Calendar(args.customer_json_file).display_events()
+    calendar = CachedCalendar(args.customer_json_file) if args.watch else Calendar(args.customer_json_file)
+    if args.busiest is not None:
+        display = lambda: calendar.display_busiest_periods(args.busiest, args.period, args.start_date, args.end_date,
+                                                           args.format)
+    elif args.invited_counts:
+        display = lambda: calendar.display_invited_counts(args.period, args.start_date, args.end_date, args.format)
+    elif args.upcoming is not None:
+        display = lambda: calendar.display_upcoming_events(args.upcoming, args.format, args.as_of)
+    elif args.start_date or args.end_date:
+        display = lambda: calendar.display_events_between(args.start_date or datetime.date.min,
+                                                          args.end_date or datetime.date.max, args.format, args.as_of)
+    else:
+        display = lambda: calendar.display_events(args.format, args.as_of)
+
+    if args.profile is None:
+        display()
+    else:
+        run_profiled(display, args.profile)
+
+    if args.watch:
+        watch_events(calendar, display, args.watch)
+
+''' Call display every time the events of calendar (a CachedCalendar) are reloaded,
+    checking the events file every interval seconds, until interrupted
+'''
+def watch_events(calendar, display, interval):
+    reloads = calendar.reloads
+    try:
+        while True:
+            time.sleep(interval)
+            calendar.get_event_store()
+            if calendar.reloads != reloads:
+                reloads = calendar.reloads
+                display()
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == "__main__":
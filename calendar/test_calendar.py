@@ -1,8 +1,16 @@
 from unittest import TestCase
-from calendar import Calendar, Event
-from datetime import date
+from calendar import Calendar, Event, EventStore, CachedCalendar, InvitedCountIndex, Recurrence, \
+    parse_event_columns, get_days_until
+from datetime import date, timedelta
+from contextlib import redirect_stdout
+from calendar_instrumentation import INSTRUMENTATION
+import csv
+import io
+import tempfile
+import threading
 import json
 import os
+import random
 
 class TestCalendar(TestCase):
 
@@ -101,3 +109,360 @@ class TestCalendar(TestCase):
         self.assertEqual(sorted_events[0].name, 'event1')
         self.assertEqual(sorted_events[0].date, date(year=2015, month=12, day=2))
 
+    ''' Test instrumentation records the stages and counters of display_events
+    '''
+    def test_instrumentation(self):
+        INSTRUMENTATION.reset()
+        INSTRUMENTATION.enable()
+        try:
+            with redirect_stdout(io.StringIO()):
+                Calendar('events.json').display_events()
+            snapshot = INSTRUMENTATION.snapshot()
+        finally:
+            INSTRUMENTATION.disable()
+            INSTRUMENTATION.reset()
+        self.assertEqual(snapshot['counters'], {'events': 4})
+        self.assertEqual(snapshot['calls'], {'read_json': 1, 'parse_events_json': 1, 'sort': 1, 'print': 1})
+
+    ''' Test EventStore range and upcoming queries, with events added and removed
+    '''
+    def test_event_store(self):
+        first_day = date(2016, 1, 1)
+        events = [Event(name='event{}'.format(index), invited_count=index,
+                        date=first_day + timedelta(days=(index * 37) % 100)) for index in range(200)]
+        store = EventStore(events[:150])
+        for event in events[150:]:
+            store.add(event)
+        for event in events[:50]:
+            store.remove(event)
+        remaining = events[50:]
+        self.assertEqual(len(store), 150)
+        self.assertRaises(Exception, lambda: store.remove(events[0]))
+
+        # events on the same date stay in insertion order, as with a stable sort
+        self.assertEqual(list(store), Calendar.sort_events_by_date(remaining))
+        start_date, end_date = date(2016, 2, 1), date(2016, 2, 20)
+        self.assertEqual(store.between(start_date, end_date),
+                         [event for event in list(store) if start_date <= event.date <= end_date])
+        self.assertEqual(store.between(end_date, start_date), [])
+        self.assertEqual(store.upcoming(5, start_date),
+                         [event for event in list(store) if event.date >= start_date][:5])
+        self.assertEqual(store.upcoming(5, date(2017, 1, 1)), [])
+        self.assertEqual(store.upcoming(5, date(2000, 1, 1)), list(store)[:5])
+
+    ''' Test display_events_between displays the events between two dates
+    '''
+    def test_display_events_between(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            Calendar('events.json').display_events_between(date(2016, 1, 1), date(2016, 2, 14))
+        self.assertEqual([line for line in output.getvalue().splitlines() if line.startswith('Event:')],
+                         ['Event: New year party', 'Event: Birthday party'])
+
+    ''' Write events json to events_json_file_path with the modification time mtime_ns
+    '''
+    def write_events_json(self, events_json_file_path, events_json, mtime_ns):
+        with open(events_json_file_path, 'w') as events_json_file:
+            json.dump(events_json, events_json_file)
+        os.utime(events_json_file_path, ns=(mtime_ns, mtime_ns))
+
+    ''' Test CachedCalendar parses the events json again only when the file changed
+    '''
+    def test_cached_calendar(self):
+        events_json_file_path = os.path.join(tempfile.mkdtemp(), 'events.json')
+        try:
+            events_json = self.mock_events_json()
+            self.write_events_json(events_json_file_path, events_json, 10 ** 18)
+            calendar = CachedCalendar(events_json_file_path)
+            self.assertEqual([event.name for event in calendar.parse_events_json()], ['Birthday party'])
+            store = calendar.get_event_store()
+            self.assertIs(calendar.get_event_store(), store)
+            self.assertEqual(calendar.reloads, 1)
+
+            events_json['events'].append({"occasion": "New year party", "invited_count": 55,
+                                          "year": 2016, "month": 1, "day": 1})
+            self.write_events_json(events_json_file_path, events_json, 2 * 10 ** 18)
+            self.assertEqual([event.name for event in calendar.upcoming_events(5, date(2015, 1, 1))],
+                             ['New year party', 'Birthday party'])
+            self.assertEqual(calendar.reloads, 2)
+            self.assertEqual(len(store), 1)
+
+            # touched but unchanged file is not parsed again with hash_content
+            calendar = CachedCalendar(events_json_file_path, hash_content=True)
+            calendar.get_event_store()
+            self.write_events_json(events_json_file_path, events_json, 3 * 10 ** 18)
+            self.assertEqual(len(calendar.events_between(date(2016, 1, 1), date(2016, 12, 31))), 2)
+            self.assertEqual(calendar.reloads, 1)
+
+            os.remove(events_json_file_path)
+            self.assertRaises(Exception, calendar.get_event_store)
+        finally:
+            if os.path.exists(events_json_file_path):
+                os.remove(events_json_file_path)
+            os.rmdir(os.path.dirname(events_json_file_path))
+
+    ''' Test threads reading a CachedCalendar share one snapshot
+    '''
+    def test_cached_calendar_threads(self):
+        calendar = CachedCalendar('events.json')
+        stores = []
+        threads = [threading.Thread(target=lambda: stores.append(calendar.get_event_store())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(calendar.reloads, 1)
+        self.assertTrue(all(store is stores[0] for store in stores))
+
+    ''' Test print_events text output is the same as printing every line, and csv and
+        json lines outputs have every event
+    '''
+    def test_print_events(self):
+        events = [Event(name='event, {}'.format(index), invited_count=index,
+                        date=date.today() + timedelta(days=index - 1500)) for index in range(2500)]
+        expected = io.StringIO()
+        with redirect_stdout(expected):
+            for event in events:
+                if event.days_til_event < 0:
+                    print("Following event was {} days ago: \n".format(abs(event.days_til_event)))
+                else:
+                    print("Folowing event in {} days: \n".format(event.days_til_event))
+                print("Event: {}\n".format(event.name))
+                print("Invited Count: {}\n".format(event.invited_count))
+                print("Date: {}\n".format(event.date))
+                print("-----------------------------")
+        output = io.StringIO()
+        Calendar.print_events(events, 'text', output)
+        self.assertEqual(output.getvalue(), expected.getvalue())
+
+        output = io.StringIO()
+        Calendar.print_events(events, 'csv', output)
+        rows = list(csv.reader(io.StringIO(output.getvalue())))
+        self.assertEqual(rows[0], ['name', 'invited_count', 'date', 'days_til_event'])
+        self.assertEqual(rows[1:], [[event.name, str(event.invited_count), str(event.date), str(event.days_til_event)]
+                                    for event in events])
+
+        output = io.StringIO()
+        Calendar.print_events(events, 'jsonl', output)
+        self.assertEqual([json.loads(line) for line in output.getvalue().splitlines()],
+                         [{'name': event.name, 'invited_count': event.invited_count, 'date': str(event.date),
+                           'days_til_event': event.days_til_event} for event in events])
+
+        output = io.StringIO()
+        Calendar.print_events([], 'text', output)
+        self.assertEqual(output.getvalue(), 'No events to display\n')
+
+    ''' Test parse_event_columns gives the ordinal days of every date, including the
+        last days of months and leap days, and raises exceptions for invalid events
+    '''
+    def test_parse_event_columns(self):
+        dates = [date(2015, 12, 31), date(2016, 1, 1), date(2016, 2, 29), date(2016, 12, 31),
+                 date(2017, 2, 28), date(1, 1, 1), date(9999, 12, 31)]
+        events_json = {'events': [{'occasion': 'Event {}'.format(index), 'invited_count': index,
+                                   'year': event_date.year, 'month': event_date.month, 'day': event_date.day}
+                                  for index, event_date in enumerate(dates)]}
+        names, invited_counts, ordinals = parse_event_columns(events_json)
+        self.assertEqual(names, ['Event {}'.format(index) for index in range(len(dates))])
+        self.assertEqual(invited_counts, list(range(len(dates))))
+        self.assertEqual(list(ordinals), [event_date.toordinal() for event_date in dates])
+        names, invited_counts, ordinals = parse_event_columns({'events': []})
+        self.assertEqual((names, invited_counts, len(ordinals)), ([], [], 0))
+
+        for year, month, day in ((2016, 4, 31), (2017, 2, 29), (2016, 13, 1), (2016, 0, 1), (2016, 1, 0)):
+            events_json = {'events': [{'occasion': 'Event', 'invited_count': 1, 'year': year, 'month': month,
+                                       'day': day}]}
+            with self.assertRaisesRegex(Exception, 'Date is invalid'):
+                parse_event_columns(events_json)
+        with self.assertRaisesRegex(Exception, 'Key missing'):
+            parse_event_columns(self.malformed_events_json())
+        with self.assertRaisesRegex(Exception, 'Error parsing'):
+            parse_event_columns({'events': [{'occasion': 'Event', 'invited_count': 1, 'year': '2016', 'month': 1,
+                                             'day': 1}]})
+
+    ''' Test days until events are counted from as_of
+    '''
+    def test_days_until(self):
+        event = Event(name='Event', invited_count=1, date=date(2016, 2, 14))
+        self.assertEqual(event.ordinal, date(2016, 2, 14).toordinal())
+        self.assertEqual(event.days_until(date(2016, 2, 4)), 10)
+        self.assertEqual(event.days_until(date(2016, 2, 24)), -10)
+        event.date = date(2016, 3, 14)
+        self.assertEqual(event.ordinal, date(2016, 3, 14).toordinal())
+        self.assertEqual(get_days_until([event.ordinal, date(2016, 1, 1).toordinal()], date(2016, 3, 4)), [10, -63])
+
+        output = io.StringIO()
+        Calendar.print_events([event], 'jsonl', output, as_of=date(2016, 3, 1))
+        self.assertEqual(json.loads(output.getvalue())['days_til_event'], 13)
+
+    ''' Test recurrence dates of every frequency, with interval, count and until, and that
+        dates from a date are the same as the dates on or after it
+    '''
+    def test_recurrence_dates(self):
+        self.assertEqual(list(Recurrence('weekly', 2, count=3).dates(date(2016, 1, 4))),
+                         [date(2016, 1, 4), date(2016, 1, 18), date(2016, 2, 1)])
+        self.assertEqual(list(Recurrence('monthly', count=4).dates(date(2016, 1, 31))),
+                         [date(2016, 1, 31), date(2016, 2, 29), date(2016, 3, 31), date(2016, 4, 30)])
+        self.assertEqual(list(Recurrence('yearly', until=date(2019, 3, 1)).dates(date(2016, 2, 29))),
+                         [date(2016, 2, 29), date(2017, 2, 28), date(2018, 2, 28), date(2019, 2, 28)])
+        self.assertEqual(list(Recurrence('monthly', 5).dates(date(9999, 1, 15))), [date(9999, 1, 15), date(9999, 6, 15),
+                                                                                  date(9999, 11, 15)])
+        self.assertRaises(ValueError, lambda: Recurrence('daily'))
+        self.assertRaises(ValueError, lambda: Recurrence('weekly', 0))
+
+        start_date = date(2016, 1, 31)
+        for recurrence in (Recurrence('weekly', 3, count=40), Recurrence('monthly', 5, until=date(2030, 1, 1)),
+                           Recurrence('yearly', 2, count=10)):
+            all_dates = list(recurrence.dates(start_date))
+            for from_date in (date(2015, 1, 1), date(2016, 1, 31), date(2016, 2, 1), date(2019, 7, 31), date(2040, 1, 1)):
+                self.assertEqual(list(recurrence.dates(start_date, from_date)),
+                                 [occurrence for occurrence in all_dates if occurrence >= from_date])
+
+    ''' Test event store queries merge the occurrences of recurring events, which have
+        no end, with the other events
+    '''
+    def test_event_store_recurring_events(self):
+        weekly = Event(name='Weekly', invited_count=5, date=date(2016, 1, 1), recurrence=Recurrence('weekly'))
+        yearly = Event(name='Yearly', invited_count=9, date=date(2010, 1, 10), recurrence=Recurrence('yearly'))
+        one_off = Event(name='One off', invited_count=1, date=date(2016, 1, 9))
+        store = EventStore([one_off, weekly])
+        store.add(yearly)
+        self.assertEqual(len(store), 3)
+        self.assertEqual(list(store), [yearly, weekly, one_off])
+
+        events = store.between(date(2016, 1, 2), date(2016, 1, 16))
+        self.assertEqual([(event.name, event.date) for event in events],
+                         [('Weekly', date(2016, 1, 8)), ('One off', date(2016, 1, 9)), ('Yearly', date(2016, 1, 10)),
+                          ('Weekly', date(2016, 1, 15))])
+        events = store.upcoming(3, date(2030, 1, 1))
+        self.assertEqual([(event.name, event.date) for event in events],
+                         [('Weekly', date(2030, 1, 4)), ('Yearly', date(2030, 1, 10)), ('Weekly', date(2030, 1, 11))])
+
+        store.remove(weekly)
+        self.assertEqual([event.date for event in store.upcoming(2, date(2016, 1, 2))], [date(2016, 1, 9), date(2016, 1, 10)])
+
+    ''' Test queries with a recurring event in a large store read the one-off events from
+        the query date on only
+    '''
+    def test_event_store_recurring_large_store(self):
+        first_ordinal = date(2000, 1, 1).toordinal()
+        events = [Event(name='Event {}'.format(index), invited_count=1,
+                        date=date.fromordinal(first_ordinal + index // 10)) for index in range(200000)]
+        weekly = Event(name='Weekly', invited_count=5, date=date(2000, 1, 3), recurrence=Recurrence('weekly'))
+        store = EventStore(events + [weekly])
+
+        read_indices = []
+        class EventList(list):
+            def __getitem__(self, index):
+                read_indices.append(index)
+                return list.__getitem__(self, index)
+            def __iter__(self):
+                raise AssertionError('one-off events iterated from the first event')
+        store._events = EventList(store._events)
+
+        last_date = events[-1].date
+        self.assertEqual([event.name for event in store.between(last_date - timedelta(days=1), last_date)],
+                         [event.name for event in events[-20:]])
+        self.assertEqual(min(read_indices), len(events) - 20)
+        self.assertEqual([event.name for event in store.upcoming(3, last_date)], ['Event 199990', 'Event 199991',
+                                                                                 'Event 199992'])
+
+    ''' Test recurrence rules are read from events json
+    '''
+    def test_parse_recurring_events(self):
+        events_json = self.mock_events_json()
+        events_json['events'][0]['recurrence'] = {'frequency': 'monthly', 'interval': 6, 'count': 3,
+                                                  'until': {'year': 2020, 'month': 1, 'day': 1}}
+        orig_method = Calendar.read_events_json_file
+        try:
+            Calendar.read_events_json_file = lambda calendar: events_json
+            events = Calendar('events.json').get_event_store().between(date.min, date.max)
+            self.assertEqual([event.date for event in events], [date(2016, 2, 14), date(2016, 8, 14), date(2017, 2, 14)])
+
+            events_json['events'][0]['recurrence'] = {'frequency': 'daily'}
+            self.assertRaises(Exception, lambda: Calendar('events.json').parse_events_json())
+        finally:
+            Calendar.read_events_json_file = orig_method
+
+    ''' Test invited count totals, rollups and busiest periods are the sums of the events
+        in their dates, after events are added and removed
+    '''
+    def test_invited_count_index(self):
+        rng = random.Random(0)
+        first_day = date(2016, 1, 1)
+        events = [Event(name='Event {}'.format(index), invited_count=rng.randint(1, 100),
+                        date=first_day + timedelta(days=rng.randint(0, 400))) for index in range(300)]
+        index = InvitedCountIndex(first_day, date(2017, 2, 4), events[:200])
+        index.add_all(events[200:])
+        for event in events[:50]:
+            index.add(event.date, -event.invited_count)
+        events = events[50:]
+
+        def expected_total(start_date, end_date):
+            return sum(event.invited_count for event in events if start_date <= event.date <= end_date)
+
+        for _ in range(50):
+            start_date = first_day + timedelta(days=rng.randint(-10, 410))
+            end_date = start_date + timedelta(days=rng.randint(-1, 60))
+            self.assertEqual(index.total(start_date, end_date), expected_total(start_date, end_date))
+        self.assertEqual(index.total(date.min, date.max), expected_total(date.min, date.max))
+
+        weeks = index.rollup('week', date(2016, 3, 1), date(2016, 4, 30))
+        self.assertEqual(weeks[0][0], date(2016, 2, 29))
+        self.assertEqual(weeks[-1][0], date(2016, 4, 25))
+        self.assertEqual(sum(total for _, total in weeks), expected_total(date(2016, 3, 1), date(2016, 4, 30)))
+        months = index.rollup('month')
+        self.assertEqual([month_start for month_start, _ in months][:3], [date(2016, 1, 1), date(2016, 2, 1),
+                                                                          date(2016, 3, 1)])
+        self.assertEqual(months[1][1], expected_total(date(2016, 2, 1), date(2016, 2, 29)))
+        days = index.rollup('day')
+        self.assertEqual(len(days), 401)
+        self.assertEqual([total for _, total in index.busiest(5, 'day')],
+                         sorted((total for _, total in days), reverse=True)[:5])
+        self.assertEqual(index.busiest(1, 'month')[0], max(months, key=lambda month: month[1]))
+        self.assertRaises(Exception, lambda: index.add(date(2015, 12, 31), 1))
+        self.assertEqual(InvitedCountIndex(None, None).rollup('week'), [])
+
+    ''' Test invited count queries of an event store follow added and removed events,
+        with the occurrences of recurring events
+    '''
+    def test_event_store_invited_counts(self):
+        one_off = Event(name='One off', invited_count=10, date=date(2016, 1, 1))
+        weekly = Event(name='Weekly', invited_count=2, date=date(2016, 1, 4), recurrence=Recurrence('weekly', count=4))
+        store = EventStore([one_off, weekly, Event(name='Last', invited_count=1, date=date(2016, 1, 31))])
+        self.assertEqual(store.invited_total(date.min, date.max), 10 + 4 * 2 + 1)
+
+        added = Event(name='Added', invited_count=5, date=date(2016, 1, 20))
+        store.add(added)
+        self.assertEqual(store.invited_total(date(2016, 1, 20), date(2016, 1, 20)), 5)
+        store.remove(weekly)
+        self.assertEqual(store.invited_total(date.min, date.max), 10 + 5 + 1)
+        store.add(Event(name='Later', invited_count=7, date=date(2016, 3, 1)))
+        self.assertEqual(store.invited_counts().last_day, date(2016, 3, 1))
+        self.assertEqual(store.invited_total(date.min, date.max), 10 + 5 + 1 + 7)
+
+        output = io.StringIO()
+        Calendar.print_invited_counts(store.busiest_periods(2, 'month'), 'month', 'csv', output)
+        self.assertEqual(output.getvalue().splitlines(), ['period,start_date,invited_count', 'month,2016-01-01,16',
+                                                          'month,2016-03-01,7'])
+
+    ''' Test invited counts of recurring events running past the last one-off event are
+        the invited counts of the events of the store in any window
+    '''
+    def test_event_store_invited_counts_recurring(self):
+        weekly = Event(name='Weekly', invited_count=10, date=date(2026, 1, 5), recurrence=Recurrence('weekly'))
+        store = EventStore([weekly, Event(name='One off', invited_count=3, date=date(2026, 1, 6))])
+        for start_date, end_date in ((date(2026, 1, 1), date(2026, 12, 31)), (date(2030, 3, 1), date(2030, 5, 1)),
+                                     (date(2025, 1, 1), date(2026, 2, 1))):
+            events = store.between(start_date, end_date)
+            self.assertEqual(store.invited_total(start_date, end_date), sum(event.invited_count for event in events))
+        self.assertEqual(store.invited_total(date(2026, 1, 1), date(2026, 12, 31)), 52 * 10 + 3)
+
+        busiest = store.busiest_periods(3, 'week', date(2026, 1, 1), date(2026, 12, 31))
+        self.assertEqual(busiest, [(date(2026, 1, 5), 13), (date(2026, 1, 12), 10), (date(2026, 1, 19), 10)])
+        rollup = store.invited_count_rollup('month', date(2026, 1, 1), date(2026, 12, 31))
+        self.assertEqual(len(rollup), 12)
+        self.assertEqual(sum(total for _, total in rollup), 52 * 10 + 3)
+        # without an end date, recurring events are counted until RECURRENCE_HORIZON_DAYS after the last event date
+        rollup = store.invited_count_rollup('day')
+        self.assertEqual(rollup[-1][0], date(2026, 1, 6) + timedelta(days=366))
+        self.assertEqual(sum(total for _, total in rollup), 53 * 10 + 3)
@@ -0,0 +1,51 @@
+from unittest import TestCase
+from calendar_instrumentation import Instrumentation, INSTRUMENTATION, run_profiled
+from calendar import Calendar
+from contextlib import redirect_stdout
+import io
+
+
+class TestInstrumentation(TestCase):
+
+    ''' Test stage timings add up over calls and reset clears them
+    '''
+    def test_instrumentation(self):
+        instrumentation = Instrumentation()
+        with instrumentation.stage('sort'):
+            pass
+        self.assertEqual(instrumentation.snapshot()['calls'], {})
+
+        instrumentation.enable()
+        for _ in range(3):
+            with instrumentation.stage('sort'):
+                instrumentation.count('events', 2)
+        snapshot = instrumentation.snapshot()
+        self.assertEqual(snapshot['calls'], {'sort': 3})
+        self.assertEqual(snapshot['counters'], {'events': 6})
+        self.assertGreaterEqual(snapshot['timings']['sort'], 0)
+
+        instrumentation.reset()
+        self.assertEqual(instrumentation.snapshot(), {'timings': {}, 'calls': {}, 'counters': {}})
+        instrumentation.disable()
+        self.assertFalse(instrumentation.enabled)
+
+    ''' Test run_profiled records the calendar stages and counters, and prints the top functions
+        without a profile file
+    '''
+    def test_run_profiled(self):
+        snapshots = []
+        INSTRUMENTATION.reset()
+        INSTRUMENTATION.add_hook(snapshots.append)
+        try:
+            output = io.StringIO()
+            with redirect_stdout(io.StringIO()) as events_output:
+                run_profiled(lambda: Calendar('events.json').display_events(), output=output)
+        finally:
+            INSTRUMENTATION.remove_hook(snapshots.append)
+            INSTRUMENTATION.reset()
+
+        self.assertFalse(INSTRUMENTATION.enabled)
+        self.assertGreater(len(events_output.getvalue()), 0)
+        self.assertEqual(snapshots[0]['calls'], {'read_json': 1, 'parse_events_json': 1, 'sort': 1, 'print': 1})
+        self.assertEqual(snapshots[0]['counters'], {'events': 4})
+        self.assertIn('cumulative', output.getvalue())
@@ -0,0 +1,107 @@
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from scheduler import Scheduler, order_course_ids, iter_course_id_levels
+
+CATALOG_EXTENSIONS = ('.json', '.ndjson', '.jsonl')
+
+''' Return catalog file paths from input paths and an optional manifest file.
+    An input path is a catalog file, a directory of catalog files or a glob pattern.
+    The manifest lists one catalog file path per line.
+'''
+def find_catalogs(input_paths, manifest_path=None):
+    catalog_paths = []
+    for input_path in input_paths:
+        if os.path.isdir(input_path):
+            catalog_paths.extend(sorted(os.path.join(input_path, file_name) for file_name in os.listdir(input_path)
+                                        if file_name.endswith(CATALOG_EXTENSIONS)))
+        elif any(character in input_path for character in '*?['):
+            catalog_paths.extend(sorted(glob.glob(input_path)))
+        else:
+            catalog_paths.append(input_path)
+
+    if manifest_path is not None:
+        with open(manifest_path) as manifest_file:
+            catalog_paths.extend(line.strip() for line in manifest_file if line.strip())
+    return catalog_paths
+
+''' Schedule one catalog file and return the result: catalog path and either the ordered
+    course names (or course names by dependency level if levels is True), or the error.
+'''
+def schedule_catalog(catalog_path, levels=False):
+    try:
+        graph = Scheduler(catalog_path).read_course_graph()
+        if levels:
+            return {'catalog': catalog_path,
+                    'levels': [[graph.course(course_id).name for course_id in level]
+                               for level in iter_course_id_levels(graph)]}
+        return {'catalog': catalog_path,
+                'courses': [graph.course(course_id).name for course_id in order_course_ids(graph, graph.roots)]}
+    except Exception as e:
+        return {'catalog': catalog_path, 'error': str(e), 'error_type': type(e).__name__}
+
+def _schedule_catalogs(catalog_paths, levels):
+    return [schedule_catalog(catalog_path, levels) for catalog_path in catalog_paths]
+
+''' Schedule catalog files across a pool of worker processes, chunk_size catalogs per task.
+    Yields results in input order, or in completion order if in_order is False.
+    A failed catalog is reported in its result and does not stop the batch.
+'''
+def schedule_batch(catalog_paths, workers=None, chunk_size=1, in_order=True, levels=False):
+    chunks = [catalog_paths[index:index + chunk_size] for index in range(0, len(catalog_paths), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_schedule_catalogs, chunk, levels): chunk for chunk in chunks}
+        for future in (futures if in_order else as_completed(futures)):
+            try:
+                results = future.result()
+            except Exception as e:
+                # the worker process failed, report every catalog of the chunk
+                results = [{'catalog': catalog_path, 'error': str(e), 'error_type': type(e).__name__}
+                           for catalog_path in futures[future]]
+            for result in results:
+                yield result
+
+def main():
+    parser = argparse.ArgumentParser(description='Schedule many course catalogs in parallel, '
+                                                 'results are written as json lines')
+    parser.add_argument("catalogs", nargs='*', help="catalog files, directories of catalog files or glob patterns")
+    parser.add_argument("--manifest", help="file listing one catalog file path per line")
+    parser.add_argument("--workers", type=int, help="number of worker processes, defaults to the number of CPUs")
+    parser.add_argument("--chunk-size", type=int, default=1, help="number of catalogs per worker task")
+    parser.add_argument("--order", choices=['input', 'completion'], default='input',
+                        help="write results in input order or as soon as they are completed")
+    parser.add_argument("--layers", action="store_true", help="schedule courses grouped by dependency level")
+    parser.add_argument("--output", help="json lines output file, defaults to standard out")
+    args = parser.parse_args()
+
+    catalog_paths = find_catalogs(args.catalogs, args.manifest)
+    if not catalog_paths:
+        print('Error: No catalogs found', file=sys.stderr)
+        sys.exit(1)
+    if args.chunk_size < 1 or (args.workers is not None and args.workers < 1):
+        print('Error: --workers and --chunk-size should be at least 1', file=sys.stderr)
+        sys.exit(1)
+
+    output_file = open(args.output, 'w') if args.output else sys.stdout
+    failed_count = 0
+    try:
+        for result in schedule_batch(catalog_paths, workers=args.workers, chunk_size=args.chunk_size,
+                                     in_order=args.order == 'input', levels=args.layers):
+            if 'error' in result:
+                failed_count += 1
+            output_file.write(json.dumps(result) + '\n')
+    finally:
+        if output_file is not sys.stdout:
+            output_file.close()
+
+    if failed_count:
+        print('Error: {} of {} catalogs failed'.format(failed_count, len(catalog_paths)), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
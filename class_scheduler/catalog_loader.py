@@ -0,0 +1,153 @@
+import json
+import re
+
+from scheduler_errors import SchemaError
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+# the start of a number or literal (true, false, null, NaN, Infinity) running to the end of the text
+PARTIAL_TOKEN = re.compile(r'[\w.+-]*\Z')
+CHUNK_SIZE = 65536
+
+''' Return True if the json decode error of text can be caused by a value continuing
+    after the end of text, False for an error inside text.
+    Same as is_truncated_json of party_invite/party_invitee_list.py, as samples do not import
+    each other; benchmarks/test_engines.py checks both on the same inputs.
+'''
+def is_truncated_json(text, error):
+    rest = text[error.pos:]
+    if error.msg.startswith('Unterminated string'):
+        return True
+    if error.msg.startswith('Invalid \\uXXXX escape'):
+        return len(rest) <= 5
+    return PARTIAL_TOKEN.match(rest) is not None
+
+''' Yields (record, line, offset) for every record of a catalog file, reading the
+    file in chunks of chunk_size characters so only one record is in memory at a time.
+    The catalog is either a json array of records, or one json record per line (NDJSON).
+'''
+def iter_catalog_records(catalog_file, chunk_size=CHUNK_SIZE):
+    reader = _CatalogReader(catalog_file, chunk_size)
+    reader.skip_whitespace()
+    first = reader.peek()
+    if first is None:
+        raise SchemaError('Could not parse input json')
+    if first == '[':
+        return reader.iter_json_array()
+    return reader.iter_ndjson()
+
+''' Buffered reader over a catalog file, keeping track of the line and character
+    offset of the current position.
+'''
+class _CatalogReader(object):
+
+    def __init__(self, catalog_file, chunk_size):
+        self._file = catalog_file
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._position = 0
+        self._eof = False
+        # characters dropped from the front of the buffer
+        self._offset = 0
+        # line number at self._buffer[self._line_position]
+        self._line = 1
+        self._line_position = 0
+
+    ''' Read the next chunk, dropping consumed characters from the buffer.
+        Returns False at the end of the file.
+    '''
+    def read_more(self):
+        if self._eof:
+            return False
+        self.location()
+        self._offset += self._position
+        self._buffer = self._buffer[self._position:]
+        self._position = 0
+        self._line_position = 0
+
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer += chunk
+        return True
+
+    ''' Return (line, offset) of the current position
+    '''
+    def location(self):
+        self._line += self._buffer.count('\n', self._line_position, self._position)
+        self._line_position = self._position
+        return self._line, self._offset + self._position
+
+    ''' Return the character at the current position, None at the end of the file
+    '''
+    def peek(self):
+        if self._position == len(self._buffer) and not self.read_more():
+            return None
+        return self._buffer[self._position]
+
+    def skip_whitespace(self):
+        while True:
+            self._position = WHITESPACE.match(self._buffer, self._position).end()
+            if self._position < len(self._buffer) or not self.read_more():
+                return
+
+    ''' Decode the json value at the current position, reading more chunks until it is complete.
+        Errors inside the buffer are raised at once, only a value running to the end of
+        the buffer reads more.
+    '''
+    def _decode(self):
+        while True:
+            try:
+                record, end = self._decoder.raw_decode(self._buffer, self._position)
+                # a value ending with the buffer may continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    self._position = end
+                    return record
+            except json.JSONDecodeError as e:
+                if self._eof or not is_truncated_json(self._buffer, e):
+                    raise SchemaError('Could not parse course: {}'.format(e.msg), *self.location())
+            self.read_more()
+
+    def iter_json_array(self):
+        self._position += 1
+        self.skip_whitespace()
+        if self.peek() == ']':
+            self._position += 1
+        else:
+            while True:
+                self.skip_whitespace()
+                line, offset = self.location()
+                yield self._decode(), line, offset
+                self.skip_whitespace()
+                delimiter = self.peek()
+                self._position += 1
+                if delimiter == ']':
+                    break
+                if delimiter != ',':
+                    raise SchemaError("Expected ',' or ']' after course", *self.location())
+
+        self.skip_whitespace()
+        if self.peek() is not None:
+            raise SchemaError('Unexpected data after json array', *self.location())
+
+    def iter_ndjson(self):
+        while True:
+            end = self._buffer.find('\n', self._position)
+            if end == -1:
+                if self.read_more():
+                    continue
+                end = len(self._buffer)
+                if self._position == end:
+                    return
+
+            line, offset = self.location()
+            text = self._buffer[self._position:end]
+            self._position = min(end + 1, len(self._buffer))
+            if text.strip() == '':
+                continue
+            try:
+                record = json.loads(text)
+            except ValueError as e:
+                raise SchemaError('Could not parse course: {}'.format(getattr(e, 'msg', e)), line, offset)
+            yield record, line, offset
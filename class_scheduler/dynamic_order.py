@@ -0,0 +1,134 @@
+''' Dynamic topological order (Pearce & Kelly, "A Dynamic Topological Sort Algorithm
+    for Directed Acyclic Graphs", 2006).
+
+    Keeps a valid order of nodes while nodes and edges are added and removed. An edge
+    x -> y means x must come before y. When a new edge breaks the current order, only
+    nodes positioned between y and x are visited and reordered.
+'''
+from scheduler_errors import CycleError
+
+''' Keeps nodes in a valid topological order under node and edge updates.
+'''
+class DynamicTopologicalOrder(object):
+
+    def __init__(self):
+        # node -> position, and position -> node (None for removed nodes)
+        self._positions = {}
+        self._nodes = []
+        self._successors = {}
+        self._predecessors = {}
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, node):
+        return node in self._positions
+
+    ''' Return nodes in a valid order
+    '''
+    def ordered(self):
+        return [node for node in self._nodes if node is not None]
+
+    ''' Return nodes that must come before node
+    '''
+    def predecessors(self, node):
+        return self._predecessors[node]
+
+    ''' Return nodes that must come after node
+    '''
+    def successors(self, node):
+        return self._successors[node]
+
+    ''' Add a node at the end of the order
+    '''
+    def add_node(self, node):
+        if node in self._positions:
+            return
+        self._positions[node] = len(self._nodes)
+        self._nodes.append(node)
+        self._successors[node] = set()
+        self._predecessors[node] = set()
+
+    ''' Remove a node and its edges
+    '''
+    def remove_node(self, node):
+        for successor in self._successors.pop(node):
+            self._predecessors[successor].discard(node)
+        for predecessor in self._predecessors.pop(node):
+            self._successors[predecessor].discard(node)
+        self._nodes[self._positions.pop(node)] = None
+        # compact positions once removed nodes make up half of the order
+        if len(self._positions) * 2 < len(self._nodes):
+            self._nodes = self.ordered()
+            for position, remaining_node in enumerate(self._nodes):
+                self._positions[remaining_node] = position
+
+    ''' Add edge x -> y, reordering nodes between y and x if needed.
+        Raises CycleError with the cycle path (y, x, ..., y) if the edge would
+        create a cycle, the order is left unchanged in that case.
+    '''
+    def add_edge(self, x, y):
+        if y in self._successors[x]:
+            return
+        if x == y:
+            raise CycleError([y, y])
+
+        lower_bound = self._positions[y]
+        upper_bound = self._positions[x]
+        if lower_bound < upper_bound:
+            forward_nodes = self._forward_nodes(y, x, upper_bound)
+            backward_nodes = self._backward_nodes(x, lower_bound)
+            self._reorder(backward_nodes, forward_nodes)
+
+        self._successors[x].add(y)
+        self._predecessors[y].add(x)
+
+    ''' Remove edge x -> y, the current order stays valid.
+    '''
+    def remove_edge(self, x, y):
+        self._successors[x].remove(y)
+        self._predecessors[y].remove(x)
+
+    ''' Return nodes reachable from y positioned before upper_bound.
+        Raises CycleError with the cycle path if x is reachable from y.
+    '''
+    def _forward_nodes(self, y, x, upper_bound):
+        parents = {y: None}
+        stack = [y]
+        while stack:
+            node = stack.pop()
+            for successor in self._successors[node]:
+                if successor == x:
+                    # x follows y, so the new edge x -> y closes a cycle
+                    path = [x, node]
+                    while parents[path[-1]] is not None:
+                        path.append(parents[path[-1]])
+                    raise CycleError([y] + path)
+                if successor not in parents and self._positions[successor] < upper_bound:
+                    parents[successor] = node
+                    stack.append(successor)
+        return list(parents)
+
+    ''' Return nodes that reach x positioned after lower_bound.
+    '''
+    def _backward_nodes(self, x, lower_bound):
+        visited = {x}
+        stack = [x]
+        while stack:
+            node = stack.pop()
+            for predecessor in self._predecessors[node]:
+                if predecessor not in visited and self._positions[predecessor] > lower_bound:
+                    visited.add(predecessor)
+                    stack.append(predecessor)
+        return list(visited)
+
+    ''' Move backward_nodes before forward_nodes, reusing their positions.
+    '''
+    def _reorder(self, backward_nodes, forward_nodes):
+        positions = self._positions
+        backward_nodes.sort(key=positions.__getitem__)
+        forward_nodes.sort(key=positions.__getitem__)
+        nodes = backward_nodes + forward_nodes
+        for position, node in zip(sorted(positions[node] for node in nodes), nodes):
+            positions[node] = position
+            self._nodes[position] = node
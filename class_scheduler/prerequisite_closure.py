@@ -0,0 +1,105 @@
+''' Transitive closure of course prerequisites, for "everything needed before a course"
+    and "everything a course unlocks" queries.
+
+    Courses are numbered by their position in a valid order, so every prerequisite of
+    a course has a lower position. The prerequisites of each course, direct and
+    indirect, are kept as one python int used as a bitset of positions, built in one
+    pass in order: the bitset of a course is the union of the bitsets of its direct
+    prerequisites and their own bits. Unlocked courses are built the same way in
+    reverse order, on first use. Queries are a few bitset operations, and reading the
+    courses of a bitset costs one scan of its bits, in a valid order.
+'''
+from array import array
+
+''' Return the positions of the set bits of bits, in asc order
+'''
+def _bit_positions(bits):
+    # binary digits, lowest bit first
+    digits = bin(bits)[:1:-1]
+    positions = []
+    position = digits.find('1')
+    while position != -1:
+        positions.append(position)
+        position = digits.find('1', position + 1)
+    return positions
+
+''' Prerequisite closure of a CourseGraph.
+    ordered_ids are all course ids of the graph in a valid order (see order_course_ids),
+    the closure is computed for the graph as it is and is not updated with it.
+    Course ids in and out are course ids of the graph, lists of course ids are in a
+    valid order.
+'''
+class PrerequisiteClosure(object):
+
+    def __init__(self, graph, ordered_ids):
+        self._graph = graph
+        self._ordered_ids = ordered_ids
+        self._positions = array('i', [0]) * len(graph)
+        for position, course_id in enumerate(ordered_ids):
+            self._positions[course_id] = position
+
+        positions = self._positions
+        self._prerequisites = []
+        for course_id in ordered_ids:
+            bits = 0
+            for pc_id in graph.prerequisite_ids(course_id):
+                pc_position = positions[pc_id]
+                bits |= self._prerequisites[pc_position] | (1 << pc_position)
+            self._prerequisites.append(bits)
+        # built by unlocked_ids on first use
+        self._unlocked = None
+
+    def __len__(self):
+        return len(self._ordered_ids)
+
+    ''' Return the Course object of a course id
+    '''
+    def course(self, course_id):
+        return self._graph.course(course_id)
+
+    ''' Return the course ids of the bits of a bitset, in a valid order
+    '''
+    def _course_ids(self, bits):
+        ordered_ids = self._ordered_ids
+        return [ordered_ids[position] for position in _bit_positions(bits)]
+
+    ''' Return all prerequisite course ids of course_id, direct and indirect
+    '''
+    def prerequisite_ids(self, course_id):
+        return self._course_ids(self._prerequisites[self._positions[course_id]])
+
+    ''' Return all course ids that have course_id as a direct or indirect prerequisite
+    '''
+    def unlocked_ids(self, course_id):
+        if self._unlocked is None:
+            dependent_offsets, dependent_targets = self._graph.dependents()
+            positions = self._positions
+            unlocked = [0] * len(self._ordered_ids)
+            for position in range(len(self._ordered_ids) - 1, -1, -1):
+                course_id_at = self._ordered_ids[position]
+                bits = 0
+                for dependent_id in dependent_targets[dependent_offsets[course_id_at]:
+                                                      dependent_offsets[course_id_at + 1]]:
+                    dependent_position = positions[dependent_id]
+                    bits |= unlocked[dependent_position] | (1 << dependent_position)
+                unlocked[position] = bits
+            self._unlocked = unlocked
+        return self._course_ids(self._unlocked[self._positions[course_id]])
+
+    ''' Return True if prerequisite_id is a direct or indirect prerequisite of course_id
+    '''
+    def is_prerequisite(self, course_id, prerequisite_id):
+        return bool(self._prerequisites[self._positions[course_id]] >> self._positions[prerequisite_id] & 1)
+
+    ''' Return the course ids to take, in a valid order, to be able to take course_id
+        and take it, when completed_ids are completed. Prerequisites of completed
+        courses count as completed too.
+    '''
+    def order_to_reach(self, course_id, completed_ids=()):
+        positions = self._positions
+        completed = 0
+        for completed_id in completed_ids:
+            position = positions[completed_id]
+            completed |= self._prerequisites[position] | (1 << position)
+        position = positions[course_id]
+        return self._course_ids((self._prerequisites[position] | (1 << position)) & ~completed)
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+
+# header of cache files: magic, size of the utf-8 json list of course names
+HEADER = struct.Struct('<4sI')
+MAGIC = b'SCH2'
+# size of the blocks catalog files are hashed in
+HASH_BLOCK_SIZE = 1 << 20
+
+''' Return a copy of an int array in little-endian byte order
+'''
+def _little_endian(int_array):
+    if sys.byteorder == 'little':
+        return int_array
+    int_array = array(int_array.typecode, int_array)
+    int_array.byteswap()
+    return int_array
+
+''' Return the cache key of a CourseGraph ordered from start_ids: sha256 of the course
+    names, prerequisite arrays and start course ids. Equal catalogs get the same key
+    regardless of whitespace or key order in the input json.
+'''
+def course_graph_key(graph, start_ids):
+    digest = hashlib.sha256()
+    digest.update(json.dumps(graph.names).encode('utf-8'))
+    for int_array in (graph.offsets, graph.targets, array('i', start_ids)):
+        digest.update(struct.pack('<I', len(int_array)))
+        digest.update(_little_endian(int_array).tobytes())
+    return digest.hexdigest()
+
+''' Return the cache key of the ordering of a catalog file: sha256 of the bytes of the
+    file. Computed without parsing the file, so a cached ordering is found without
+    building or validating the course graph. Any change of the file is a miss, the
+    Scheduler then looks the ordering up by course_graph_key of the parsed graph.
+    Raises IOError if the file can not be read.
+'''
+def catalog_file_key(catalog_file_path):
+    digest = hashlib.sha256(b'catalog file\0')
+    with open(catalog_file_path, 'rb') as catalog_file:
+        for block in iter(lambda: catalog_file.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+''' Cache of computed course orderings, as lists of course names, keyed by
+    course_graph_key or catalog_file_key. Orderings are kept in a bounded in-memory LRU,
+    and in cache_dir if set, one file per catalog. Thread-safe.
+    Properties - hits, disk_hits (included in hits), misses, evictions: int
+'''
+class ScheduleCache(object):
+
+    def __init__(self, max_entries=128, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir is not None and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    def __len__(self):
+        return len(self._entries)
+
+    ''' Return the cached ordering of key, or None
+    '''
+    def get(self, key):
+        with self._lock:
+            ordered_names = self._entries.get(key)
+            if ordered_names is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return ordered_names
+
+        ordered_names = self._read_file(key) if self.cache_dir is not None else None
+        with self._lock:
+            if ordered_names is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._add_entry(key, ordered_names)
+        return ordered_names
+
+    ''' Cache the ordering of key, a list of course names
+    '''
+    def put(self, key, ordered_names):
+        ordered_names = tuple(ordered_names)
+        with self._lock:
+            self._add_entry(key, ordered_names)
+        if self.cache_dir is not None:
+            self._write_file(key, ordered_names)
+
+    ''' Return hit and miss counters
+    '''
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'entries': len(self._entries)}
+
+    ''' Drop in-memory entries, files in cache_dir are kept
+    '''
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _add_entry(self, key, ordered_names):
+        self._entries[key] = ordered_names
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _file_path(self, key):
+        return os.path.join(self.cache_dir, key + '.order')
+
+    ''' Read an ordering from cache_dir, missing or corrupt files are a miss
+    '''
+    def _read_file(self, key):
+        try:
+            with open(self._file_path(key), 'rb') as cache_file:
+                data = cache_file.read()
+        except IOError:
+            return None
+        if len(data) < HEADER.size:
+            return None
+        magic, size = HEADER.unpack_from(data)
+        if magic != MAGIC or len(data) != HEADER.size + size:
+            return None
+        try:
+            return tuple(json.loads(data[HEADER.size:].decode('utf-8')))
+        except ValueError:
+            return None
+
+    ''' Write an ordering to cache_dir, through a temporary file so readers never see partial files
+    '''
+    def _write_file(self, key, ordered_names):
+        data = json.dumps(ordered_names).encode('utf-8')
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as cache_file:
+                cache_file.write(HEADER.pack(MAGIC, len(data)))
+                cache_file.write(data)
+            os.replace(temp_path, self._file_path(key))
+        except BaseException:
+            os.remove(temp_path)
+            raise
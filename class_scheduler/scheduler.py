@@ -1,53 +1,576 @@
 import json
 import sys
 import argparse
+from array import array
+
+from catalog_loader import CHUNK_SIZE, iter_catalog_records
+from dynamic_order import DynamicTopologicalOrder
+from scheduler_instrumentation import INSTRUMENTATION, run_profiled
+from prerequisite_closure import PrerequisiteClosure
+from schedule_cache import ScheduleCache, course_graph_key, catalog_file_key
+from scheduler_errors import SchedulerError, SchemaError, UnknownPrerequisiteError, CycleError, \
+    CatalogValidationError
 
 ''' Course object
     Properties:
     name: str
     prerequisite_courses: list of Course objects
+
+    A Course either holds its own prerequisite courses, or is a read-only view
+    on a course of a CourseGraph.
 '''
 class Course(object):
-    def __init__(self, name):
+    __slots__ = ('name', '_graph', '_course_id', '_prerequisite_courses', '_prerequisite_course_set')
+
+    def __init__(self, name, graph=None, course_id=None):
         self.name = name.title()
-        self.prerequisite_courses = []
+        self._graph = graph
+        self._course_id = course_id
+        self._prerequisite_courses = [] if graph is None else None
+        self._prerequisite_course_set = set() if graph is None else None
+
+    @property
+    def prerequisite_courses(self):
+        if self._graph is None:
+            return self._prerequisite_courses
+        return [self._graph.course(pc_id) for pc_id in self._graph.prerequisite_ids(self._course_id)]
 
     def add_prerequisite_courses(self, prerequisite_course):
         # check if prerequisite_course is Course object
         if not type(prerequisite_course) == Course:
-            print('Error: Prerequisite_course should be of type Course', file=sys.stderr)
-            sys.exit(1)
+            raise TypeError('Prerequisite_course should be of type Course')
+        # courses of a graph are read-only
+        elif self._graph is not None:
+            raise SchedulerError('Course {} belongs to a course graph and can not be modified'.format(self.name))
         # avoid duplicates
-        elif prerequisite_course in self.prerequisite_courses:
+        elif prerequisite_course in self._prerequisite_course_set:
             return
 
         else:
-            self.prerequisite_courses.append(prerequisite_course)
+            self._prerequisite_course_set.add(prerequisite_course)
+            self._prerequisite_courses.append(prerequisite_course)
+
+    def remove_prerequisite_courses(self, prerequisite_course):
+        if self._graph is not None:
+            raise SchedulerError('Course {} belongs to a course graph and can not be modified'.format(self.name))
+        elif prerequisite_course in self._prerequisite_course_set:
+            self._prerequisite_course_set.remove(prerequisite_course)
+            self._prerequisite_courses.remove(prerequisite_course)
+
+''' Compact course graph.
+    Course names are interned to integer ids and prerequisite courses are stored in
+    CSR form: prerequisite course ids of course i are targets[offsets[i]:offsets[i + 1]].
+    Properties:
+    names: list of course names indexed by course id
+    course_ids: dict of course name to course id
+    offsets: array of int, number of courses + 1 entries
+    targets: array of int, prerequisite course ids
+    roots: array of int, course ids in input order
+'''
+class CourseGraph(object):
+    __slots__ = ('names', 'course_ids', 'offsets', 'targets', 'roots', '_courses', '_dependents')
+
+    def __init__(self, names, course_ids, offsets, targets, roots, courses=None):
+        self.names = names
+        self.course_ids = course_ids
+        self.offsets = offsets
+        self.targets = targets
+        self.roots = roots
+        # Course views, created on first access
+        self._courses = courses if courses is not None else [None] * len(names)
+        # reversed CSR arrays, created on first access
+        self._dependents = None
+
+    def __len__(self):
+        return len(self.names)
+
+    ''' Return prerequisite course ids of a course
+    '''
+    def prerequisite_ids(self, course_id):
+        return self.targets[self.offsets[course_id]:self.offsets[course_id + 1]]
+
+    ''' Return the Course object for a course id
+    '''
+    def course(self, course_id):
+        course = self._courses[course_id]
+        if course is None:
+            course = Course(self.names[course_id], graph=self, course_id=course_id)
+            self._courses[course_id] = course
+        return course
+
+    ''' Return (offsets, targets) of the reversed graph: dependent course ids of
+        course i are targets[offsets[i]:offsets[i + 1]].
+    '''
+    def dependents(self):
+        if self._dependents is None:
+            course_count = len(self.names)
+            offsets = array('i', [0]) * (course_count + 1)
+            for pc_id in self.targets:
+                offsets[pc_id + 1] += 1
+            for course_id in range(course_count):
+                offsets[course_id + 1] += offsets[course_id]
+            positions = offsets[:-1]
+            targets = array('i', [0]) * len(self.targets)
+            for course_id in range(course_count):
+                for pc_id in self.prerequisite_ids(course_id):
+                    targets[positions[pc_id]] = course_id
+                    positions[pc_id] += 1
+            self._dependents = (offsets, targets)
+        return self._dependents
+
+    ''' Return Course objects in input order
+    '''
+    def courses(self):
+        return [self.course(course_id) for course_id in self.roots]
+
+    ''' Return a CourseGraph over Course objects reachable from course_list, and the
+        course ids of course_list. Courses that are views on a single graph reuse it.
+    '''
+    @classmethod
+    def from_courses(cls, course_list):
+        graph = course_list[0]._graph if course_list else None
+        if graph is not None and all(course._graph is graph for course in course_list):
+            return graph, array('i', [course._course_id for course in course_list])
+
+        # assign ids in discovery order, so prerequisites of course i are known once i is reached
+        courses = []
+        course_ids = {}
+        for course in course_list:
+            if course not in course_ids:
+                course_ids[course] = len(courses)
+                courses.append(course)
+        offsets = array('i', [0])
+        targets = array('i')
+        course_id = 0
+        while course_id < len(courses):
+            for pc in courses[course_id].prerequisite_courses:
+                pc_id = course_ids.get(pc)
+                if pc_id is None:
+                    pc_id = course_ids[pc] = len(courses)
+                    courses.append(pc)
+                targets.append(pc_id)
+            offsets.append(len(targets))
+            course_id += 1
+
+        start_ids = array('i', [course_ids[course] for course in course_list])
+        graph = cls(names=[course.name for course in courses], course_ids={}, offsets=offsets, targets=targets,
+                    roots=start_ids, courses=courses)
+        return graph, start_ids
+
+''' Builds a CourseGraph in a single pass over course records.
+    Prerequisite courses may be referenced before they are added, they are kept in
+    a pending table until added and validated once all courses are added.
+'''
+class CourseGraphBuilder(object):
+
+    def __init__(self):
+        self.names = []
+        self.course_ids = {}
+        self.roots = array('i')
+        # 1 for every course id that was added as a course
+        self._offered = bytearray()
+        # course id of referenced prerequisite courses not added yet -> location of first reference
+        self._pending = {}
+        self._edge_sources = array('i')
+        self._edge_targets = array('i')
+
+    def _get_course_id(self, name):
+        course_id = self.course_ids.get(name)
+        if course_id is None:
+            course_id = self.course_ids[name] = len(self.names)
+            self.names.append(name)
+            self._offered.append(0)
+        return course_id
+
+    ''' Add a course and its prerequisite course names. location is the (line, offset)
+        of the course in the input, it is added to errors and kept for prerequisite
+        courses not added yet. Raises SchemaError or CycleError if the course is not
+        valid, the course is not added in that case.
+    '''
+    def add_course(self, name, prerequisites, location=(None, None)):
+        if not isinstance(name, str):
+            raise SchemaError('Course name {} should be a string'.format(name), *location)
+        if name == '':
+            raise SchemaError('Empty string found in course name', *location)
+        if not isinstance(prerequisites, list):
+            raise SchemaError('Prerequisites of course {} should be a list'.format(name), *location)
+        for prerequisite_course in prerequisites:
+            if not isinstance(prerequisite_course, str):
+                raise SchemaError('Prerequisite course {} should be a string'.format(prerequisite_course), *location)
+            if prerequisite_course == '':
+                raise SchemaError("Empty string found in prerequisite_course 'name'", *location)
+            # check for self-dependency
+            if prerequisite_course == name:
+                raise CycleError([name.title(), name.title()], *location)
+
+        course_id = self._get_course_id(name)
+        self._offered[course_id] = 1
+        self._pending.pop(course_id, None)
+        self.roots.append(course_id)
+        for prerequisite_course in prerequisites:
+            pc_id = self._get_course_id(prerequisite_course)
+            if not self._offered[pc_id] and pc_id not in self._pending:
+                self._pending[pc_id] = location
+            self._edge_sources.append(course_id)
+            self._edge_targets.append(pc_id)
+
+    ''' Validate prerequisite courses and return the CourseGraph.
+        Raises UnknownPrerequisiteError if a prerequisite course is not offered. If errors
+        is a list, an error is added to it for every prerequisite course not offered
+        instead, and prerequisites that are not offered are left out of the graph.
+    '''
+    def build(self, errors=None):
+        # check if all prerequisite courses are being offered
+        for pc_id, location in self._pending.items():
+            error = UnknownPrerequisiteError(self.names[pc_id], *location)
+            if errors is None:
+                raise error
+            errors.append(error)
+
+        # counting sort of edges by course id, keeping the input order of prerequisites
+        course_count = len(self.names)
+        positions = array('i', [0]) * (course_count + 1)
+        for course_id in self._edge_sources:
+            positions[course_id + 1] += 1
+        for course_id in range(course_count):
+            positions[course_id + 1] += positions[course_id]
+        sorted_targets = array('i', [0]) * len(self._edge_targets)
+        for course_id, pc_id in zip(self._edge_sources, self._edge_targets):
+            sorted_targets[positions[course_id]] = pc_id
+            positions[course_id] += 1
+
+        # drop duplicate prerequisites of a course
+        offsets = array('i', [0])
+        targets = array('i')
+        last_seen = array('i', [-1]) * course_count
+        start = 0
+        for course_id in range(course_count):
+            end = positions[course_id]
+            for index in range(start, end):
+                pc_id = sorted_targets[index]
+                if last_seen[pc_id] != course_id and self._offered[pc_id]:
+                    last_seen[pc_id] = course_id
+                    targets.append(pc_id)
+            offsets.append(len(targets))
+            start = end
+
+        return CourseGraph(names=self.names, course_ids=self.course_ids, offsets=offsets, targets=targets,
+                           roots=self.roots)
+
+''' Return course ids of a CourseGraph in a valid order, traversing the prerequisite
+    courses of start_ids in depth-first manner with an explicit stack. Every course and
+    prerequisite is visited once. Raises CycleError on circular dependencies, or if
+    errors is a list, adds a CycleError to it for every prerequisite closing a cycle
+    and leaves that prerequisite out.
+'''
+def order_course_ids(graph, start_ids, errors=None):
+    offsets = graph.offsets
+    targets = graph.targets
+    # 0: not visited, 1: on the current path, 2: ordered
+    state = bytearray(len(graph))
+    ordered_ids = array('i')
+
+    for start_id in start_ids:
+        if state[start_id]:
+            continue
+        state[start_id] = 1
+        # current path, and position of the next prerequisite to visit for each course on it
+        path = [start_id]
+        positions = [offsets[start_id]]
+        while path:
+            course_id = path[-1]
+            position = positions[-1]
+            end = offsets[course_id + 1]
+            while position < end and state[targets[position]] == 2:
+                position += 1
+
+            # all prerequisite courses are ordered, course can be taken now
+            if position == end:
+                path.pop()
+                positions.pop()
+                state[course_id] = 2
+                ordered_ids.append(course_id)
+                continue
+
+            pc_id = targets[position]
+            positions[-1] = position + 1
+            if state[pc_id] == 1:
+                cycle = path[path.index(pc_id):] + [pc_id]
+                error = CycleError([graph.names[cycle_id].title() for cycle_id in cycle])
+                if errors is None:
+                    raise error
+                errors.append(error)
+                continue
+            state[pc_id] = 1
+            path.append(pc_id)
+            positions.append(offsets[pc_id])
+
+    return ordered_ids
+
+''' Return a bytearray with 1 for every course id of a CourseGraph that is in start_ids
+    or a prerequisite course, direct or not, of one of them
+'''
+def get_reachable_course_ids(graph, start_ids):
+    offsets = graph.offsets
+    targets = graph.targets
+    reachable = bytearray(len(graph))
+    stack = list(start_ids)
+    for course_id in stack:
+        reachable[course_id] = 1
+    while stack:
+        course_id = stack.pop()
+        for pc_id in targets[offsets[course_id]:offsets[course_id + 1]]:
+            if not reachable[pc_id]:
+                reachable[pc_id] = 1
+                stack.append(pc_id)
+    return reachable
+
+''' Yields course ids of a CourseGraph grouped by dependency level: level 1 holds courses
+    without prerequisites, and every following level holds courses whose prerequisite
+    courses are all in earlier levels. Each level is yielded as soon as it is complete.
+    If start_ids is given, only start_ids and their prerequisite courses are in the
+    levels, otherwise all courses of the graph are.
+    Every course and prerequisite is visited once. Raises CycleError on circular
+    dependencies, after the levels that could be completed.
+'''
+def iter_course_id_levels(graph, start_ids=None):
+    offsets = graph.offsets
+    dependent_offsets, dependent_targets = graph.dependents()
+    if start_ids is None:
+        reachable = bytearray(b'\x01') * len(graph)
+    else:
+        reachable = get_reachable_course_ids(graph, start_ids)
+    # number of prerequisite courses of each course not in a yielded level yet
+    remaining = array('i', [offsets[course_id + 1] - offsets[course_id] for course_id in range(len(graph))])
+    level = array('i', [course_id for course_id, count in enumerate(remaining) if count == 0 and reachable[course_id]])
+    level_course_count = 0
+
+    while level:
+        yield level
+        level_course_count += len(level)
+        next_level = array('i')
+        for pc_id in level:
+            for course_id in dependent_targets[dependent_offsets[pc_id]:dependent_offsets[pc_id + 1]]:
+                remaining[course_id] -= 1
+                if remaining[course_id] == 0 and reachable[course_id]:
+                    next_level.append(course_id)
+        level = next_level
+
+    if level_course_count < sum(reachable):
+        # courses left over are on or behind a cycle, traverse them to report the cycle path
+        order_course_ids(graph, [course_id for course_id, count in enumerate(remaining)
+                                 if count and reachable[course_id]])
 
 ''' Reads list of courses and their prerequisite courses from and json file
     and prints a valid ordering of classes.
+
+    A Scheduler can also be kept alive and updated with add_course, add_prerequisite,
+    remove_prerequisite and remove_course, ordered() returns a valid ordering that is
+    kept up to date incrementally.
+
+    If a ScheduleCache is given, orderings are looked up in the cache before they are computed.
+    The ordering of the json file is looked up by the content of the file, before it is parsed.
+
+    get_prerequisites, get_unlocked_courses and get_order_to_reach answer queries on the
+    added courses from a PrerequisiteClosure, built on the first query and built again
+    on the first query after the courses changed.
 '''
 class Scheduler():
 
-    def __init__(self, courses_json_file_path):
+    def __init__(self, courses_json_file_path=None, cache=None):
         self.courses_json_file_path = courses_json_file_path
+        self.cache = cache
         # stores ordered list of courses
         self.ordered_course_list = []
-        # keeping track of start node while traversing to detect circular dependencies.
-        self._current_start_course = None
+        # set of ordered Course objects for constant time lookups
+        self._ordered_course_set = set()
+        # Course objects by course name, and their order, for incremental updates
+        self._courses = {}
+        self._course_order = DynamicTopologicalOrder()
+        # incremented by every change of the courses, the closure is built for one version
+        self._version = 0
+        self._closure = None
+        self._closure_version = None
+
+    ''' Add courses from input json file, in a valid order so that
+        no reordering is needed while they are added.
+    '''
+    def load(self):
+        graph = self.get_course_graph(self.read_customer_json_file())
+        for course_id in order_course_ids(graph, graph.roots):
+            self.add_course(graph.names[course_id],
+                            [graph.names[pc_id] for pc_id in graph.prerequisite_ids(course_id)])
+        return self
+
+    ''' Add a course with prerequisite courses that were already added.
+        Raises SchedulerError if the course exists, UnknownPrerequisiteError if a
+        prerequisite course is not offered.
+    '''
+    def add_course(self, name, prerequisites=()):
+        if not isinstance(name, str) or name == '':
+            raise SchemaError('Course name should be a non-empty string')
+        if name in self._courses:
+            raise SchedulerError('Course {} already exists'.format(name.title()))
+        for prerequisite_course in prerequisites:
+            if prerequisite_course == name:
+                raise CycleError([name.title(), name.title()])
+            if prerequisite_course not in self._courses:
+                raise UnknownPrerequisiteError(prerequisite_course)
+
+        # a new course has no dependent courses, so its prerequisites can not create a cycle
+        course = self._courses[name] = Course(name)
+        self._course_order.add_node(name)
+        for prerequisite_course in prerequisites:
+            self._course_order.add_edge(prerequisite_course, name)
+            course.add_prerequisite_courses(self._courses[prerequisite_course])
+        self._version += 1
+
+    ''' Remove a course that is not a prerequisite of other courses.
+    '''
+    def remove_course(self, name):
+        self._get_course(name)
+        dependent_courses = self._course_order.successors(name)
+        if dependent_courses:
+            raise SchedulerError('Course {} is a prerequisite course of {}'.format(
+                name.title(), ', '.join(sorted(course.title() for course in dependent_courses))))
+        self._course_order.remove_node(name)
+        del self._courses[name]
+        self._version += 1
+
+    ''' Add prerequisite_course to course, updating the order of the affected courses only.
+        Raises CycleError and leaves the schedule unchanged if this creates a circular dependency.
+    '''
+    def add_prerequisite(self, course, prerequisite_course):
+        course_obj = self._get_course(course)
+        prerequisite_course_obj = self._get_course(prerequisite_course)
+        try:
+            self._course_order.add_edge(prerequisite_course, course)
+        except CycleError as e:
+            raise CycleError([name.title() for name in e.cycle])
+        course_obj.add_prerequisite_courses(prerequisite_course_obj)
+        self._version += 1
+
+    ''' Remove prerequisite_course from course, the current order stays valid.
+    '''
+    def remove_prerequisite(self, course, prerequisite_course):
+        course_obj = self._get_course(course)
+        prerequisite_course_obj = self._get_course(prerequisite_course)
+        if prerequisite_course not in self._course_order.predecessors(course):
+            raise SchedulerError('Course {} is not a prerequisite course of {}'.format(
+                prerequisite_course_obj.name, course_obj.name))
+        self._course_order.remove_edge(prerequisite_course, course)
+        course_obj.remove_prerequisite_courses(prerequisite_course_obj)
+        self._version += 1
+
+    ''' Return Course objects added with add_course in a valid order
+    '''
+    def ordered(self):
+        return [self._courses[name] for name in self._course_order.ordered()]
+
+    ''' Return all prerequisite courses of a course, direct and indirect, in a valid order
+    '''
+    def get_prerequisites(self, name):
+        self._get_course(name)
+        closure, course_ids = self.prerequisite_closure()
+        return [closure.course(course_id) for course_id in closure.prerequisite_ids(course_ids[name])]
+
+    ''' Return all courses that have a course as a direct or indirect prerequisite, in a valid order
+    '''
+    def get_unlocked_courses(self, name):
+        self._get_course(name)
+        closure, course_ids = self.prerequisite_closure()
+        return [closure.course(course_id) for course_id in closure.unlocked_ids(course_ids[name])]
+
+    ''' Return the courses to take, in a valid order, to take a course when completed
+        courses (and so their prerequisites) are completed. The course is the last one.
+    '''
+    def get_order_to_reach(self, name, completed=()):
+        for course_name in [name] + list(completed):
+            self._get_course(course_name)
+        closure, course_ids = self.prerequisite_closure()
+        return [closure.course(course_id) for course_id in
+                closure.order_to_reach(course_ids[name], [course_ids[course_name] for course_name in completed])]
+
+    ''' Return the PrerequisiteClosure of the added courses and a dict of course name to
+        course id in it. It is kept until the courses change.
+    '''
+    def prerequisite_closure(self):
+        if self._closure is None or self._closure_version != self._version:
+            names = self._course_order.ordered()
+            # courses are in a valid order, from_courses numbers them in that order
+            graph, course_ids = CourseGraph.from_courses([self._courses[name] for name in names])
+            self._closure = (PrerequisiteClosure(graph, course_ids), dict(zip(names, course_ids)))
+            self._closure_version = self._version
+        return self._closure
+
+    def _get_course(self, name):
+        try:
+            return self._courses[name]
+        except KeyError:
+            raise SchedulerError('Course {} not in courses offered list'.format(name))
 
     ''' Creates list of Course objects from input json file
-        and prints a valid ordering of classes.
+        and prints a valid ordering of classes, or the classes grouped
+        by dependency level if levels is True. See read_course_graph for collect_errors.
+    '''
+    def execute(self, levels=False, collect_errors=False):
+        if levels:
+            course_list = self.read_course_graph(collect_errors=collect_errors).courses()
+            self.print_course_levels(self.get_course_levels(course_list))
+        else:
+            self.print_course_names(self.get_ordered_course_names(collect_errors))
+
+    ''' Return the names of the courses of the json file in a valid order. With a cache,
+        the ordering is looked up by catalog_file_key first, so a hit skips parsing,
+        building and validating the course graph. On a miss it is looked up by
+        course_graph_key of the parsed graph, so a catalog that only changed in
+        formatting, whitespace or key order is still a hit.
+        See read_course_graph for collect_errors.
     '''
-    def execute(self):
-        courses_dict = self.read_customer_json_file()
-        course_list = self.get_course_list(courses_dict)
-        ordered_course_list = self.get_ordered_courses(course_list)
-        self.print_ordered_courses(ordered_course_list)
+    @INSTRUMENTATION.timed('order_courses')
+    def get_ordered_course_names(self, collect_errors=False):
+        key = None
+        if self.cache is not None:
+            try:
+                key = catalog_file_key(self.courses_json_file_path)
+            except IOError:
+                raise SchedulerError('Could not open file {}'.format(self.courses_json_file_path))
+            ordered_names = self.cache.get(key)
+            if ordered_names is not None:
+                return list(ordered_names)
 
+        graph = self.read_course_graph(collect_errors=collect_errors)
+        ordered_names = [graph.names[course_id] for course_id in self._get_ordered_ids(graph, graph.roots)]
+        if key is not None:
+            self.cache.put(key, ordered_names)
+        return ordered_names
+
+
+    ''' Prints the courses of one query on the courses of the json file: all prerequisite
+        courses of prerequisites_of, all courses unlocked by unlocks, or the courses to
+        take to reach order_to when completed courses are completed, in a valid order.
+    '''
+    def execute_closure_query(self, prerequisites_of=None, unlocks=None, order_to=None, completed=()):
+        graph = self.read_course_graph()
+        closure = PrerequisiteClosure(graph, order_course_ids(graph, range(len(graph))))
+
+        def get_course_id(name):
+            try:
+                return graph.course_ids[name]
+            except KeyError:
+                raise SchedulerError('Course {} not in courses offered list'.format(name))
+
+        if prerequisites_of is not None:
+            course_ids = closure.prerequisite_ids(get_course_id(prerequisites_of))
+        elif unlocks is not None:
+            course_ids = closure.unlocked_ids(get_course_id(unlocks))
+        else:
+            course_ids = closure.order_to_reach(get_course_id(order_to), [get_course_id(name) for name in completed])
+        self.print_ordered_courses([graph.course(course_id) for course_id in course_ids])
 
     ''' Read courses json file and return courses dict.
     '''
+    @INSTRUMENTATION.timed('read_json')
     def read_customer_json_file(self):
         courses_json_file = None
         courses_dict = {}
@@ -56,117 +579,226 @@ class Scheduler():
             courses_json_file = open(self.courses_json_file_path)
             courses_dict = json.load(courses_json_file)
         except IOError:
-            print('Error: Could not open file {}'.format(self.courses_json_file_path), file=sys.stderr)
-            sys.exit(1)
-        except Exception:
-            print('Error: Could not parse input json', file=sys.stderr)
-            sys.exit(1)
+            raise SchedulerError('Could not open file {}'.format(self.courses_json_file_path))
+        except ValueError:
+            raise SchemaError('Could not parse input json')
         finally:
             if courses_json_file:
                 courses_json_file.close()
 
         return courses_dict
 
+    ''' Read courses json file record by record and return a validated CourseGraph.
+        The file is either a json array of courses or one json course per line.
+        Raises a SchedulerError with the line and offset of the first bad course, or
+        if collect_errors is True, validates the whole catalog including circular
+        dependencies and raises CatalogValidationError with every error found.
+    '''
+    @INSTRUMENTATION.timed('read_course_graph')
+    def read_course_graph(self, chunk_size=CHUNK_SIZE, collect_errors=False):
+        try:
+            with open(self.courses_json_file_path) as courses_json_file:
+                return self._build_course_graph(iter_catalog_records(courses_json_file, chunk_size), collect_errors)
+        except IOError:
+            raise SchedulerError('Could not open file {}'.format(self.courses_json_file_path))
+
     ''' Returns a list of Course objects offered
     '''
+    @INSTRUMENTATION.timed('get_course_list')
     def get_course_list(self, courses_dict):
-        course_list = []
-        course_obj_map = {}
+        return self.get_course_graph(courses_dict).courses()
 
-        # create map of course obj offered
-        for course in courses_dict:
-            try:
-                if course == '':
-                    print('Error: Empty string found in course name', file=sys.stderr)
-                    sys.exit(1)
-                course_obj_map[course['name']] = Course(name=course['name'])
-            except KeyError:
-                print("Error: Missing key 'name' in input json", file=sys.stderr)
-                sys.exit(1)
+    ''' Returns a validated CourseGraph of courses offered, built in a single pass.
+        See read_course_graph for collect_errors.
+    '''
+    def get_course_graph(self, courses_dict, collect_errors=False):
+        return self._build_course_graph(((course, None, None) for course in courses_dict), collect_errors)
 
-        # read prerequisite courses for every course from courses_json,
-        # validate prerequisite courses in json,
-        # add prerequisities for each course and add course obj to course_list
-        for course in courses_dict:
-            try:
-                course_obj = course_obj_map[course['name']]
-                for prerequisite_course in course['prerequisites']:
-                    if self.validate_prerequisite_course(course_obj, course_obj_map, prerequisite_course):
-                        course_obj.add_prerequisite_courses(course_obj_map[prerequisite_course])
-            except KeyError:
-                print("Error: Missing key 'prerequisites' in input json", file=sys.stderr)
-                sys.exit(1)
-            course_list.append(course_obj)
+    @staticmethod
+    def _build_course_graph(course_records, collect_errors):
+        builder = CourseGraphBuilder()
+        errors = [] if collect_errors else None
+        try:
+            for course, line, offset in course_records:
+                try:
+                    if course == '':
+                        raise SchemaError('Empty string found in course name', line, offset)
+                    builder.add_course(course['name'], course['prerequisites'], location=(line, offset))
+                except KeyError as e:
+                    error = SchemaError("Missing key '{}' in input json".format(e.args[0]), line, offset)
+                except TypeError:
+                    error = SchemaError('Courses in input json should be objects', line, offset)
+                except SchedulerError as e:
+                    error = e
+                else:
+                    continue
+                if errors is None:
+                    raise error
+                errors.append(error)
+        except SchemaError as e:
+            # input that can not be parsed ends validation
+            if errors is None:
+                raise
+            errors.append(e)
+            raise CatalogValidationError(errors)
 
-        return course_list
+        graph = builder.build(errors)
+        INSTRUMENTATION.count('courses', len(graph))
+        INSTRUMENTATION.count('prerequisite_edges', len(graph.targets))
+        if collect_errors:
+            order_course_ids(graph, graph.roots, errors)
+            if errors:
+                raise CatalogValidationError(errors)
+        return graph
 
-    ''' Validate prerequisite_course for a course object
+    ''' Validate prerequisite_course for a course object. all_courses_map is a dict of
+        course name to Course object. Raises SchemaError for an empty name,
+        UnknownPrerequisiteError if prerequisite_course is not offered and CycleError if
+        course depends on itself or is a prerequisite of prerequisite_course.
+        Catalogs are validated by CourseGraphBuilder, this checks one prerequisite course.
     '''
     @classmethod
     def validate_prerequisite_course(cls, course, all_courses_map, prerequisite_course):
-            if prerequisite_course == '':
-               print("Error: Empty string found in prerequisite_course 'name'", file=sys.stderr)
-               sys.exit(1)
-            # check if the prerequisite course is being offered
-            if prerequisite_course not in all_courses_map.keys():
-                print('Error: Prerequisite course {} not in courses offered list'.format(prerequisite_course),
-                      file=sys.stderr)
-                sys.exit(1)
-            # check for self-dependency
-            if prerequisite_course == course.name:
-                print('Error: Course {} has itself as a prerequisite course'.format(course.name), file=sys.stderr)
-                sys.exit(1)
-            # check for circular dependency
-            if course in all_courses_map[prerequisite_course].prerequisite_courses:
-                print('Error: Circular dependency - {} & {} are prerequisite_courses for each other'.format(
-                        course.name, prerequisite_course), file=sys.stderr)
-                sys.exit(1)
-            return True
+        if prerequisite_course == '':
+            raise SchemaError("Empty string found in prerequisite_course 'name'")
+        # check if the prerequisite course is being offered
+        if prerequisite_course not in all_courses_map:
+            raise UnknownPrerequisiteError(prerequisite_course)
+        # check for self-dependency
+        if prerequisite_course == course.name:
+            raise CycleError([course.name, course.name])
+        # check for circular dependency
+        if course in all_courses_map[prerequisite_course].prerequisite_courses:
+            raise CycleError([course.name, prerequisite_course, course.name])
+        return True
 
     ''' Return a list of ordered course from all courses list
     '''
+    @INSTRUMENTATION.timed('order_courses')
     def get_ordered_courses(self, course_list):
-         # clearing ordered courses list
-        self.ordered_course_list = []
-        self._current_start_course = None
-
-        for course in course_list:
-            self._current_start_course = course
-            self.traverse_course_dependencies(course)
+        graph, start_ids = CourseGraph.from_courses(course_list)
+        self.ordered_course_list = [graph.course(course_id) for course_id in self._get_ordered_ids(graph, start_ids)]
+        self._ordered_course_set = set(self.ordered_course_list)
         return self.ordered_course_list
 
+    ''' Return ordered course ids of graph, from the cache if possible. Cached orderings are
+        course names, mapped back to course ids by graph.names (graphs built from Course
+        objects have no course_ids), orderings of graphs with repeated names are not cached.
+    '''
+    def _get_ordered_ids(self, graph, start_ids):
+        course_ids = dict((name, course_id) for course_id, name in enumerate(graph.names))
+        if self.cache is None or len(course_ids) != len(graph.names):
+            return order_course_ids(graph, start_ids)
+        key = course_graph_key(graph, start_ids)
+        ordered_names = self.cache.get(key)
+        if ordered_names is not None:
+            return [course_ids[name] for name in ordered_names]
+        ordered_ids = order_course_ids(graph, start_ids)
+        self.cache.put(key, [graph.names[course_id] for course_id in ordered_ids])
+        return ordered_ids
+
     ''' Traverses course dependencies in depth-first manner and adds Course objects to
         ordered_course_list
     '''
+    @INSTRUMENTATION.timed('traverse_course_dependencies')
     def traverse_course_dependencies(self, course):
-        if course in self.ordered_course_list:
+        if course in self._ordered_course_set:
             return
-        for pc in course.prerequisite_courses:
-            if pc not in self.ordered_course_list:
-                if pc == self._current_start_course:
-                    print("Error:Circular dependency found for {}".format(self._current_start_course.name),
-                          file=sys.stderr)
-                    sys.exit(1)
-                else:
-                    self.traverse_course_dependencies(pc)
-        self.ordered_course_list.append(course)
+        graph, start_ids = CourseGraph.from_courses([course])
+        for course_id in order_course_ids(graph, start_ids):
+            pc = graph.course(course_id)
+            if pc not in self._ordered_course_set:
+                self._ordered_course_set.add(pc)
+                self.ordered_course_list.append(pc)
+
+    ''' Yields lists of Course objects of course_list and their prerequisite courses,
+        grouped by dependency level, courses in a level can be taken together once all
+        earlier levels are taken.
+    '''
+    def get_course_levels(self, course_list):
+        graph, start_ids = CourseGraph.from_courses(course_list)
+        for level in iter_course_id_levels(graph, start_ids):
+            yield [graph.course(course_id) for course_id in level]
 
     ''' Display ordered list of courses.
     '''
     @classmethod
+    @INSTRUMENTATION.timed('print')
     def print_ordered_courses(cls, ordered_course_list):
         for course in ordered_course_list:
             print(course.name)
 
+    ''' Display an ordered list of course names, as course names are displayed.
+    '''
+    @classmethod
+    @INSTRUMENTATION.timed('print')
+    def print_course_names(cls, ordered_course_names):
+        for name in ordered_course_names:
+            print(name.title())
+
+    ''' Display courses level by level as levels are computed, followed by the
+        critical path length (number of levels). Returns the critical path length.
+    '''
+    @classmethod
+    @INSTRUMENTATION.timed('print')
+    def print_course_levels(cls, course_levels):
+        level_count = 0
+        for level in course_levels:
+            level_count += 1
+            print('Level {}:'.format(level_count))
+            for course in level:
+                print(course.name)
+            print('')
+        print('Critical path length: {}'.format(level_count))
+        return level_count
+
+
+''' Print errors and exit with the exit code of the error
+'''
+def exit_with_error(error):
+    for e in getattr(error, 'errors', [error]):
+        print('Error: {}'.format(e), file=sys.stderr)
+    sys.exit(error.exit_code)
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("courses_json_file", help="customer json file path")
+    parser.add_argument("--layers", action="store_true",
+                        help="print courses grouped by dependency level, courses in a level can be taken together")
+    parser.add_argument("--all-errors", action="store_true",
+                        help="validate the whole catalog and report every error found")
+    parser.add_argument("--cache-dir", help="directory to cache computed orderings in")
+    parser.add_argument("--prerequisites-of", metavar="COURSE",
+                        help="print all prerequisite courses of COURSE, direct and indirect, in a valid order")
+    parser.add_argument("--unlocks", metavar="COURSE",
+                        help="print all courses that need COURSE, directly or indirectly, in a valid order")
+    parser.add_argument("--order-to", metavar="COURSE",
+                        help="print the courses to take to take COURSE, in a valid order, see --completed")
+    parser.add_argument("--completed", action="append", default=[], metavar="COURSE",
+                        help="a course already completed, left out of --order-to with its prerequisites, "
+                             "repeat for every completed course")
+    parser.add_argument("--profile", action="store_true",
+                        help="write stage timings and counters and the top functions by time to standard error")
+    parser.add_argument("--profile-file", metavar="PROFILE_FILE",
+                        help="profile as --profile, dumping the cProfile profile to PROFILE_FILE instead of "
+                             "writing the top functions")
     args = parser.parse_args()
 
-    Scheduler(args.courses_json_file).execute()
-
+    cache = ScheduleCache(cache_dir=args.cache_dir) if args.cache_dir else None
+    scheduler = Scheduler(args.courses_json_file, cache=cache)
+    if args.prerequisites_of or args.unlocks or args.order_to:
+        execute = lambda: scheduler.execute_closure_query(args.prerequisites_of, args.unlocks, args.order_to,
+                                                          args.completed)
+    else:
+        execute = lambda: scheduler.execute(levels=args.layers, collect_errors=args.all_errors)
+    try:
+        if args.profile or args.profile_file:
+            run_profiled(execute, args.profile_file)
+        else:
+            execute()
+    except SchedulerError as e:
+        exit_with_error(e)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,52 @@
+''' Exceptions raised by the scheduler. Every exception carries the exit code used by
+    the command line interface, and the line and offset of the bad course in the input
+    when it is known.
+'''
+
+''' Base class of scheduler errors
+'''
+class SchedulerError(ValueError):
+    exit_code = 1
+
+    def __init__(self, message, line=None, offset=None):
+        if line is not None:
+            message = '{} (line {}, offset {})'.format(message, line, offset)
+        super(SchedulerError, self).__init__(message)
+        self.line = line
+        self.offset = offset
+
+''' Raised for input that is not a valid course catalog
+'''
+class SchemaError(SchedulerError):
+    exit_code = 3
+
+''' Raised when a prerequisite course is not in the courses offered list
+'''
+class UnknownPrerequisiteError(SchedulerError):
+    exit_code = 4
+
+    def __init__(self, prerequisite_course, line=None, offset=None):
+        super(UnknownPrerequisiteError, self).__init__(
+            'Prerequisite course {} not in courses offered list'.format(prerequisite_course), line, offset)
+        self.prerequisite_course = prerequisite_course
+
+''' Raised for circular dependencies. cycle is the list of courses on the cycle,
+    each course has the next one as a prerequisite and the first and last course are the same.
+'''
+class CycleError(SchedulerError):
+    exit_code = 5
+
+    def __init__(self, cycle, line=None, offset=None):
+        super(CycleError, self).__init__(
+            'Circular dependency found - {}'.format(' -> '.join(map(str, cycle))), line, offset)
+        self.cycle = cycle
+
+''' Raised when validating a catalog with all errors collected, errors is the list
+    of SchedulerError found in input order.
+'''
+class CatalogValidationError(SchedulerError):
+    exit_code = 6
+
+    def __init__(self, errors):
+        super(CatalogValidationError, self).__init__('Found {} errors in course catalog'.format(len(errors)))
+        self.errors = errors
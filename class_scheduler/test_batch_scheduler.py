@@ -0,0 +1,56 @@
+from unittest import TestCase
+from batch_scheduler import find_catalogs, schedule_catalog, schedule_batch
+import json
+import os
+import shutil
+import tempfile
+
+
+class TestBatchScheduler(TestCase):
+
+    def setUp(self):
+        self.catalog_dir = tempfile.mkdtemp()
+        for name, courses in [('a.json', [{"name": "Calculus", "prerequisites": []}]),
+                              ('b.json', [{"name": "Calculus", "prerequisites": ["Calculus"]}]),
+                              ('c.json', [{"name": "Relativity", "prerequisites": ["Calculus"]},
+                                          {"name": "Calculus", "prerequisites": []}])]:
+            with open(os.path.join(self.catalog_dir, name), 'w') as catalog_file:
+                json.dump(courses, catalog_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.catalog_dir)
+
+    ''' Test catalogs are found from directories, glob patterns and manifests
+    '''
+    def test_find_catalogs(self):
+        catalog_paths = find_catalogs([self.catalog_dir])
+        self.assertEqual([os.path.basename(path) for path in catalog_paths], ['a.json', 'b.json', 'c.json'])
+        self.assertEqual(find_catalogs([os.path.join(self.catalog_dir, '[ab].json')]), catalog_paths[:2])
+
+        manifest_path = os.path.join(self.catalog_dir, 'manifest.txt')
+        with open(manifest_path, 'w') as manifest_file:
+            manifest_file.write(catalog_paths[2] + '\n\n')
+        self.assertEqual(find_catalogs([], manifest_path), catalog_paths[2:])
+
+    ''' Test failures are reported in the result
+    '''
+    def test_schedule_catalog(self):
+        result = schedule_catalog(os.path.join(self.catalog_dir, 'c.json'))
+        self.assertEqual(result['courses'], ['Calculus', 'Relativity'])
+        result = schedule_catalog(os.path.join(self.catalog_dir, 'c.json'), levels=True)
+        self.assertEqual(result['levels'], [['Calculus'], ['Relativity']])
+        result = schedule_catalog(os.path.join(self.catalog_dir, 'b.json'))
+        self.assertEqual(result['error_type'], 'CycleError')
+        result = schedule_catalog(os.path.join(self.catalog_dir, 'missing.json'))
+        self.assertEqual(result['error_type'], 'SchedulerError')
+
+    ''' Test batch results in input and completion order
+    '''
+    def test_schedule_batch(self):
+        catalog_paths = find_catalogs([self.catalog_dir]) * 3
+        results = list(schedule_batch(catalog_paths, workers=2, chunk_size=2))
+        self.assertEqual([result['catalog'] for result in results], catalog_paths)
+        self.assertEqual(sum(1 for result in results if 'error' in result), 3)
+
+        results = list(schedule_batch(catalog_paths, workers=2, chunk_size=4, in_order=False))
+        self.assertEqual(sorted(result['catalog'] for result in results), sorted(catalog_paths))
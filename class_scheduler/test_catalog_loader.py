@@ -0,0 +1,77 @@
+from unittest import TestCase
+from catalog_loader import iter_catalog_records
+from scheduler_errors import SchemaError
+import io
+import json
+
+
+class TestCatalogLoader(TestCase):
+
+    def mock_courses(self):
+        return [{"name": "Calculus", "prerequisites": []},
+                {"name": "Relativity", "prerequisites": ["Calculus", "Intro to Physics"]},
+                {"name": "Intro to Physics", "prerequisites": []}]
+
+    ''' Test json array records are read across chunk boundaries
+    '''
+    def test_iter_json_array(self):
+        text = json.dumps(self.mock_courses(), indent=4)
+        for chunk_size in [1, 2, 7, 64, 65536]:
+            records = list(iter_catalog_records(io.StringIO(text), chunk_size))
+            self.assertEqual([record for record, _, _ in records], self.mock_courses())
+            self.assertEqual([line for _, line, _ in records], [2, 6, 13])
+            self.assertEqual(text[records[1][2]], '{')
+
+        self.assertEqual(list(iter_catalog_records(io.StringIO(' [ ] '))), [])
+
+    ''' Test one json record per line is read
+    '''
+    def test_iter_ndjson(self):
+        text = '\n'.join(json.dumps(course) for course in self.mock_courses()) + '\n\n'
+        for chunk_size in [1, 5, 65536]:
+            records = list(iter_catalog_records(io.StringIO(text), chunk_size))
+            self.assertEqual([record for record, _, _ in records], self.mock_courses())
+            self.assertEqual([line for _, line, _ in records], [1, 2, 3])
+
+    ''' Test line and offset of bad records are reported
+    '''
+    def test_iter_catalog_records_error(self):
+        with self.assertRaises(SchemaError) as context:
+            list(iter_catalog_records(io.StringIO('[{"name": "Calculus"},\n {"name": }]'), 4))
+        self.assertEqual((context.exception.line, context.exception.offset), (2, 24))
+
+        with self.assertRaises(SchemaError) as context:
+            list(iter_catalog_records(io.StringIO('[{"name": "Calculus"} {"name": "Algebra"}]')))
+        self.assertEqual(context.exception.line, 1)
+
+        with self.assertRaises(SchemaError) as context:
+            list(iter_catalog_records(io.StringIO('{"name": "Calculus"}\n{"name"\n')))
+        self.assertEqual((context.exception.line, context.exception.offset), (2, 21))
+
+    ''' Test values split at any point by chunks are decoded, and errors inside the
+        buffer are raised without reading the rest of the file
+    '''
+    def test_iter_catalog_records_chunks(self):
+        courses = [{"name": "Calculus \u00e9", "credits": -12.5e3, "core": True, "elective": False, "notes": None,
+                    "prerequisites": []}]
+        text = json.dumps(courses)
+        for chunk_size in range(1, 12):
+            self.assertEqual([record for record, _, _ in iter_catalog_records(io.StringIO(text), chunk_size)], courses)
+
+        class CatalogFile(io.StringIO):
+            reads = 0
+            def read(self, size=-1):
+                CatalogFile.reads += 1
+                return super(CatalogFile, self).read(size)
+
+        catalog_file = CatalogFile('[{"name": x},' + ' ' * 100000 + ']')
+        self.assertRaises(SchemaError, lambda: list(iter_catalog_records(catalog_file, 64)))
+        self.assertEqual(CatalogFile.reads, 1)
+
+    ''' Test an empty catalog is rejected
+    '''
+    def test_iter_catalog_records_empty(self):
+        for text in ['', ' \n ']:
+            with self.assertRaises(SchemaError) as context:
+                iter_catalog_records(io.StringIO(text))
+            self.assertEqual(str(context.exception), 'Could not parse input json')
@@ -0,0 +1,67 @@
+from unittest import TestCase
+from dynamic_order import DynamicTopologicalOrder
+from scheduler_errors import CycleError
+import random
+
+
+class TestDynamicTopologicalOrder(TestCase):
+
+    def assert_valid_order(self, order, edges):
+        positions = {node: position for position, node in enumerate(order.ordered())}
+        for x, y in edges:
+            self.assertLess(positions[x], positions[y])
+
+    ''' Test edges that break the current order move the affected nodes only
+    '''
+    def test_add_edge_reorders(self):
+        order = DynamicTopologicalOrder()
+        for node in 'abcde':
+            order.add_node(node)
+        order.add_edge('a', 'b')
+        order.add_edge('e', 'c')
+        # only c and e swap positions, d is not affected
+        self.assertEqual(order.ordered(), ['a', 'b', 'e', 'd', 'c'])
+        order.add_edge('c', 'b')
+        self.assert_valid_order(order, [('a', 'b'), ('e', 'c'), ('c', 'b')])
+
+    ''' Test add_edge raises CycleError and leaves the order unchanged
+    '''
+    def test_add_edge_cycle(self):
+        order = DynamicTopologicalOrder()
+        for node in 'abc':
+            order.add_node(node)
+        order.add_edge('a', 'b')
+        order.add_edge('b', 'c')
+        with self.assertRaises(CycleError) as context:
+            order.add_edge('c', 'a')
+        self.assertEqual(context.exception.cycle, ['a', 'c', 'b', 'a'])
+        self.assertEqual(order.ordered(), ['a', 'b', 'c'])
+        self.assertNotIn('a', order.successors('c'))
+        self.assertRaises(CycleError, lambda:order.add_edge('a', 'a'))
+
+    ''' Test random updates against the edge set
+    '''
+    def test_random_updates(self):
+        rng = random.Random(7)
+        order = DynamicTopologicalOrder()
+        edges = set()
+        for node in range(60):
+            order.add_node(node)
+        for _ in range(2000):
+            x, y = rng.randrange(60), rng.randrange(60)
+            if (x, y) in edges and rng.random() < 0.5:
+                order.remove_edge(x, y)
+                edges.remove((x, y))
+                continue
+            try:
+                order.add_edge(x, y)
+                edges.add((x, y))
+            except CycleError:
+                pass
+            self.assert_valid_order(order, edges)
+
+        for node in range(0, 60, 2):
+            order.remove_node(node)
+        edges = set((x, y) for x, y in edges if x % 2 and y % 2)
+        self.assertEqual(len(order), 30)
+        self.assert_valid_order(order, edges)
@@ -0,0 +1,104 @@
+from unittest import TestCase
+from prerequisite_closure import PrerequisiteClosure
+from scheduler import Scheduler, order_course_ids, main
+from contextlib import redirect_stdout
+from unittest import mock
+import io
+from scheduler_errors import SchedulerError
+import random
+
+
+class TestPrerequisiteClosure(TestCase):
+
+    ''' Return a random course catalog without circular dependencies
+    '''
+    def random_catalog(self, course_count, seed):
+        rng = random.Random(seed)
+        names = ['Course {}'.format(course_id) for course_id in range(course_count)]
+        catalog = [{'name': name, 'prerequisites': rng.sample(names[:course_id], min(course_id, rng.randint(0, 3)))}
+                   for course_id, name in enumerate(names)]
+        rng.shuffle(catalog)
+        return catalog
+
+    def reachable(self, course_id, next_ids):
+        reached = set()
+        stack = [course_id]
+        while stack:
+            for next_id in next_ids(stack.pop()):
+                if next_id not in reached:
+                    reached.add(next_id)
+                    stack.append(next_id)
+        return reached
+
+    ''' Test prerequisites and unlocked courses of every course are the courses reachable
+        through prerequisites and dependents, in a valid order
+    '''
+    def test_prerequisite_and_unlocked_ids(self):
+        graph = Scheduler().get_course_graph(self.random_catalog(200, 0))
+        closure = PrerequisiteClosure(graph, order_course_ids(graph, range(len(graph))))
+        positions = dict((course_id, position) for position, course_id in
+                         enumerate(order_course_ids(graph, range(len(graph)))))
+        dependent_offsets, dependent_targets = graph.dependents()
+        for course_id in range(len(graph)):
+            prerequisite_ids = closure.prerequisite_ids(course_id)
+            self.assertEqual(set(prerequisite_ids), self.reachable(course_id, graph.prerequisite_ids))
+            self.assertEqual(prerequisite_ids, sorted(prerequisite_ids, key=positions.get))
+            unlocked_ids = closure.unlocked_ids(course_id)
+            self.assertEqual(set(unlocked_ids), self.reachable(
+                course_id, lambda pc_id: dependent_targets[dependent_offsets[pc_id]:dependent_offsets[pc_id + 1]]))
+            for prerequisite_id in prerequisite_ids[:5]:
+                self.assertTrue(closure.is_prerequisite(course_id, prerequisite_id))
+            self.assertFalse(closure.is_prerequisite(course_id, course_id))
+
+    ''' Test order_to_reach leaves out completed courses and their prerequisites, and
+        ends with the course
+    '''
+    def test_order_to_reach(self):
+        graph = Scheduler().get_course_graph(self.random_catalog(100, 1))
+        closure = PrerequisiteClosure(graph, order_course_ids(graph, range(len(graph))))
+        rng = random.Random(1)
+        for course_id in range(len(graph)):
+            completed_ids = rng.sample(range(len(graph)), 10)
+            done = set(completed_ids)
+            for completed_id in completed_ids:
+                done.update(closure.prerequisite_ids(completed_id))
+            order = closure.order_to_reach(course_id, completed_ids)
+            if course_id not in done:
+                self.assertEqual(order[-1], course_id)
+            self.assertEqual(set(order), (set(closure.prerequisite_ids(course_id)) | {course_id}) - done)
+            taken = set(done)
+            for order_id in order:
+                self.assertTrue(set(graph.prerequisite_ids(order_id)) <= taken)
+                taken.add(order_id)
+
+    ''' Test Scheduler queries follow incremental updates of the courses
+    '''
+    def test_scheduler_queries(self):
+        scheduler = Scheduler()
+        scheduler.add_course('Calculus')
+        scheduler.add_course('Scientific Thinking')
+        scheduler.add_course('Differential Equations', ['Calculus'])
+        scheduler.add_course('Relativity', ['Differential Equations'])
+        names = lambda courses: [course.name for course in courses]
+        self.assertEqual(names(scheduler.get_prerequisites('Relativity')), ['Calculus', 'Differential Equations'])
+        self.assertEqual(names(scheduler.get_unlocked_courses('Calculus')), ['Differential Equations', 'Relativity'])
+        self.assertEqual(names(scheduler.get_order_to_reach('Relativity', ['Calculus'])),
+                         ['Differential Equations', 'Relativity'])
+
+        scheduler.add_prerequisite('Calculus', 'Scientific Thinking')
+        self.assertEqual(names(scheduler.get_prerequisites('Relativity')),
+                         ['Scientific Thinking', 'Calculus', 'Differential Equations'])
+        scheduler.remove_prerequisite('Relativity', 'Differential Equations')
+        self.assertEqual(scheduler.get_prerequisites('Relativity'), [])
+        scheduler.remove_course('Relativity')
+        self.assertEqual(names(scheduler.get_unlocked_courses('Calculus')), ['Differential Equations'])
+        self.assertRaises(SchedulerError, lambda: scheduler.get_prerequisites('Relativity'))
+
+    ''' Test --completed is repeated for every completed course and can come before the catalog
+    '''
+    def test_main_completed(self):
+        output = io.StringIO()
+        with mock.patch('sys.argv', ['scheduler.py', '--order-to', 'Relativity', '--completed', 'Calculus',
+                                     '--completed', 'Intro to Physics', 'physics.json']), redirect_stdout(output):
+            main()
+        self.assertEqual(output.getvalue().splitlines(), ['Differential Equations', 'Relativity'])
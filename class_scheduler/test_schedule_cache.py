@@ -0,0 +1,116 @@
+from unittest import TestCase
+from schedule_cache import ScheduleCache, course_graph_key, catalog_file_key
+from scheduler import Scheduler, Course
+import json
+import os
+import shutil
+import tempfile
+
+
+class TestScheduleCache(TestCase):
+
+    def mock_courses(self):
+        return [{"name": "Relativity", "prerequisites": ["Calculus"]},
+                {"name": "Calculus", "prerequisites": []}]
+
+    ''' Test equal catalogs get the same key and different catalogs a different key
+    '''
+    def test_course_graph_key(self):
+        graph = Scheduler().get_course_graph(self.mock_courses())
+        same_graph = Scheduler().get_course_graph(self.mock_courses())
+        other_graph = Scheduler().get_course_graph(list(reversed(self.mock_courses())))
+        self.assertEqual(course_graph_key(graph, graph.roots), course_graph_key(same_graph, same_graph.roots))
+        self.assertNotEqual(course_graph_key(graph, graph.roots), course_graph_key(other_graph, other_graph.roots))
+
+    ''' Test LRU eviction and counters
+    '''
+    def test_memory_cache(self):
+        cache = ScheduleCache(max_entries=2)
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', ['Calculus', 'Relativity'])
+        cache.put('b', ['Calculus'])
+        self.assertEqual(list(cache.get('a')), ['Calculus', 'Relativity'])
+        cache.put('c', ['Algebra'])
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats(), {'hits': 1, 'disk_hits': 0, 'misses': 2, 'evictions': 1, 'entries': 2})
+
+    ''' Test orderings are read back from cache_dir
+    '''
+    def test_disk_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            ScheduleCache(cache_dir=cache_dir).put('a', ['Calculus', 'Relativity \u00e9'])
+            cache = ScheduleCache(cache_dir=cache_dir)
+            self.assertEqual(list(cache.get('a')), ['Calculus', 'Relativity \u00e9'])
+            self.assertEqual(list(cache.get('a')), ['Calculus', 'Relativity \u00e9'])
+            self.assertEqual(cache.stats()['disk_hits'], 1)
+
+            # corrupt files are a miss
+            with open(os.path.join(cache_dir, 'b.order'), 'wb') as cache_file:
+                cache_file.write(b'SCH2\x05')
+            self.assertIsNone(cache.get('b'))
+        finally:
+            shutil.rmtree(cache_dir)
+
+    ''' Test Scheduler orders from the cache
+    '''
+    def test_scheduler_cache(self):
+        cache = ScheduleCache()
+        scheduler = Scheduler(cache=cache)
+        for _ in range(2):
+            ordered_courses = scheduler.get_ordered_courses(scheduler.get_course_list(self.mock_courses()))
+            self.assertEqual([course.name for course in ordered_courses], ['Calculus', 'Relativity'])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    ''' Test the ordering of a json file is cached by its content, a hit does not read the
+        course graph, and a file only formatted differently is a hit of the course graph
+    '''
+    def test_scheduler_file_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            catalog_path = os.path.join(cache_dir, 'courses.json')
+            with open(catalog_path, 'w') as catalog_file:
+                json.dump(self.mock_courses(), catalog_file)
+            cache = ScheduleCache()
+            scheduler = Scheduler(catalog_path, cache=cache)
+            self.assertEqual(scheduler.get_ordered_course_names(), ['Calculus', 'Relativity'])
+            self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+            read_course_graph = scheduler.read_course_graph
+            def fail_read_course_graph(*args, **kwargs):
+                raise AssertionError('course graph read on a cache hit')
+            scheduler.read_course_graph = fail_read_course_graph
+            self.assertEqual(scheduler.get_ordered_course_names(), ['Calculus', 'Relativity'])
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+            # the same catalog formatted differently is a hit of the course graph
+            key = catalog_file_key(catalog_path)
+            with open(catalog_path, 'w') as catalog_file:
+                json.dump([dict(reversed(list(course.items()))) for course in self.mock_courses()], catalog_file,
+                          indent=4)
+            self.assertNotEqual(catalog_file_key(catalog_path), key)
+            self.assertRaises(AssertionError, scheduler.get_ordered_course_names)
+            scheduler.read_course_graph = read_course_graph
+            self.assertEqual(scheduler.get_ordered_course_names(), ['Calculus', 'Relativity'])
+            self.assertEqual((cache.hits, cache.misses), (2, 4))
+
+            # a different catalog is a miss
+            with open(catalog_path, 'w') as catalog_file:
+                json.dump(list(reversed(self.mock_courses())), catalog_file)
+            self.assertEqual(scheduler.get_ordered_course_names(), ['Calculus', 'Relativity'])
+            self.assertEqual((cache.hits, cache.misses), (2, 6))
+        finally:
+            shutil.rmtree(cache_dir)
+
+    ''' Test Scheduler orders standalone Course objects from the cache
+    '''
+    def test_scheduler_cache_courses(self):
+        cache = ScheduleCache()
+        scheduler = Scheduler(cache=cache)
+        algebra = Course('Algebra')
+        geometry = Course('geometry')
+        geometry.add_prerequisite_courses(algebra)
+        for _ in range(2):
+            ordered_courses = scheduler.get_ordered_courses([geometry, algebra])
+            self.assertEqual(ordered_courses, [algebra, geometry])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
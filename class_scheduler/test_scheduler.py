@@ -1,5 +1,7 @@
 from unittest import TestCase
-from scheduler import Scheduler, Course
+from scheduler import Scheduler, Course, CourseGraphBuilder
+from scheduler_errors import SchedulerError, SchemaError, UnknownPrerequisiteError, CycleError, \
+    CatalogValidationError
 import os
 import json
 
@@ -48,7 +50,7 @@ class TestScheduler(TestCase):
             "prerequisites": []
         }
          ]
-        self.assertRaises(SystemExit, lambda:Scheduler('mock_courses.json').get_course_list(mock_courses))
+        self.assertRaises(UnknownPrerequisiteError, lambda:Scheduler('mock_courses.json').get_course_list(mock_courses))
 
         # A->B, B->C, C->A.
         algebra = Course('algebra')
@@ -58,7 +60,7 @@ class TestScheduler(TestCase):
         geometry.add_prerequisite_courses(physics)
         physics.add_prerequisite_courses(algebra)
 
-        self.assertRaises(SystemExit, lambda:Scheduler('mock_courses.json').get_ordered_courses([algebra, physics,
+        self.assertRaises(CycleError, lambda:Scheduler('mock_courses.json').get_ordered_courses([algebra, physics,
                                                                                                  geometry]))
 
     def test_course_list_with_self_dependency(self):
@@ -68,7 +70,7 @@ class TestScheduler(TestCase):
             "prerequisites": ["Calculus"]
         }
          ]
-        self.assertRaises(SystemExit, lambda:Scheduler('mock_courses.json').get_course_list(mock_courses))
+        self.assertRaises(CycleError, lambda:Scheduler('mock_courses.json').get_course_list(mock_courses))
 
     def test_course_list_with_missing_prerequisite_course(self):
         mock_courses = [
@@ -77,7 +79,25 @@ class TestScheduler(TestCase):
             "prerequisites": ["Calculus"]
         }
          ]
-        self.assertRaises(SystemExit, lambda:Scheduler('mock_courses.json').get_course_list(mock_courses))
+        self.assertRaises(UnknownPrerequisiteError, lambda:Scheduler('mock_courses.json').get_course_list(mock_courses))
+
+    ''' Test validate_prerequisite_course raises scheduler errors for bad prerequisite courses
+    '''
+    def test_validate_prerequisite_course(self):
+        calculus = Course('Calculus')
+        relativity = Course('Relativity')
+        relativity.add_prerequisite_courses(calculus)
+        all_courses_map = {'Calculus': calculus, 'Relativity': relativity}
+
+        self.assertTrue(Scheduler.validate_prerequisite_course(relativity, all_courses_map, 'Calculus'))
+        self.assertRaises(SchemaError, lambda: Scheduler.validate_prerequisite_course(relativity, all_courses_map, ''))
+        self.assertRaises(UnknownPrerequisiteError,
+                          lambda: Scheduler.validate_prerequisite_course(relativity, all_courses_map, 'Algebra'))
+        self.assertRaises(CycleError,
+                          lambda: Scheduler.validate_prerequisite_course(calculus, all_courses_map, 'Calculus'))
+        with self.assertRaises(CycleError) as context:
+            Scheduler.validate_prerequisite_course(calculus, all_courses_map, 'Relativity')
+        self.assertEqual(context.exception.cycle, ['Calculus', 'Relativity', 'Calculus'])
 
     def test_get_ordered_courses(self):
         # test single dependency
@@ -112,3 +132,156 @@ class TestScheduler(TestCase):
 
         self.assertEqual(len(scheduler.ordered_course_list), 3)
         self.assertEqual(scheduler.ordered_course_list[2].name, 'Physics')
+
+    def test_get_ordered_courses_deep_chain(self):
+        # chain longer than the default recursion limit
+        courses = [Course('course {}'.format(i)) for i in range(5000)]
+        for course, prerequisite_course in zip(courses[1:], courses):
+            course.add_prerequisite_courses(prerequisite_course)
+
+        ordered_courses = Scheduler('mock_courses.json').get_ordered_courses(list(reversed(courses)))
+        self.assertEqual(ordered_courses, courses)
+
+    def test_course_with_long_circular_dependency(self):
+        # A->B, B->C, C->D, D->B. Cycle does not include the start course.
+        algebra = Course('algebra')
+        geometry = Course('geometry')
+        physics = Course('physics')
+        calculus = Course('calculus')
+        algebra.add_prerequisite_courses(geometry)
+        geometry.add_prerequisite_courses(physics)
+        physics.add_prerequisite_courses(calculus)
+        calculus.add_prerequisite_courses(geometry)
+
+        self.assertRaises(CycleError, lambda:Scheduler('mock_courses.json').get_ordered_courses([algebra]))
+
+    def test_get_ordered_courses_fixtures(self):
+        for file_name, expected in [('math.json', ['Algebra 1', 'Geometry', 'Algebra 2', 'Pre Calculus']),
+                                    ('physics.json', ['Calculus', 'Scientific Thinking', 'Differential Equations',
+                                                      'Intro To Physics', 'Relativity'])]:
+            scheduler = Scheduler(file_name)
+            course_list = scheduler.get_course_list(scheduler.read_customer_json_file())
+            ordered_courses = scheduler.get_ordered_courses(course_list)
+            self.assertEqual([course.name for course in ordered_courses], expected)
+
+    def test_course_graph_builder(self):
+        builder = CourseGraphBuilder()
+        # prerequisite courses can be referenced before they are added
+        builder.add_course('Relativity', ['Calculus', 'Intro to Physics', 'Calculus'])
+        builder.add_course('Intro to Physics', [])
+        builder.add_course('Calculus', [])
+        graph = builder.build()
+
+        self.assertEqual(len(graph), 3)
+        self.assertEqual(list(graph.offsets), [0, 2, 2, 2])
+        self.assertEqual([graph.names[pc_id] for pc_id in graph.prerequisite_ids(0)],
+                         ['Calculus', 'Intro to Physics'])
+
+        courses = graph.courses()
+        self.assertEqual([course.name for course in courses], ['Relativity', 'Intro To Physics', 'Calculus'])
+        self.assertIs(courses[0].prerequisite_courses[0], courses[2])
+        self.assertRaises(SchedulerError, lambda:courses[0].add_prerequisite_courses(Course('algebra')))
+
+    def test_course_graph_builder_missing_prerequisite_course(self):
+        builder = CourseGraphBuilder()
+        builder.add_course('Relativity', ['Calculus'])
+        self.assertRaises(UnknownPrerequisiteError, builder.build)
+        self.assertRaises(CycleError, lambda:builder.add_course('Calculus', ['Calculus']))
+
+    def test_get_course_levels(self):
+        scheduler = Scheduler('physics.json')
+        course_list = scheduler.get_course_list(scheduler.read_customer_json_file())
+        levels = [[course.name for course in level] for level in scheduler.get_course_levels(course_list)]
+        self.assertEqual(levels, [['Calculus', 'Scientific Thinking'],
+                                  ['Differential Equations', 'Intro To Physics'],
+                                  ['Relativity']])
+
+    def test_get_course_levels_subset(self):
+        # courses of a loaded graph share it, only the given courses and their prerequisites are in levels
+        scheduler = Scheduler('physics.json')
+        courses = dict((course.name, course) for course in scheduler.read_course_graph().courses())
+        levels = [[course.name for course in level]
+                  for level in scheduler.get_course_levels([courses['Differential Equations']])]
+        self.assertEqual(levels, [['Calculus'], ['Differential Equations']])
+        levels = [[course.name for course in level]
+                  for level in scheduler.get_course_levels([courses['Intro To Physics'], courses['Calculus']])]
+        self.assertEqual(levels, [['Calculus', 'Scientific Thinking'], ['Intro To Physics']])
+
+    def test_get_course_levels_with_circular_dependency(self):
+        # A->B, B->C, C->B. A is not in a level, error is raised after the first level.
+        algebra = Course('algebra')
+        geometry = Course('geometry')
+        physics = Course('physics')
+        calculus = Course('calculus')
+        algebra.add_prerequisite_courses(geometry)
+        geometry.add_prerequisite_courses(physics)
+        physics.add_prerequisite_courses(geometry)
+
+        course_levels = Scheduler('mock_courses.json').get_course_levels([calculus, algebra])
+        self.assertEqual([course.name for course in next(course_levels)], ['Calculus'])
+        self.assertRaises(CycleError, lambda:next(course_levels))
+
+    def test_incremental_updates(self):
+        scheduler = Scheduler('physics.json').load()
+        scheduler.add_course('Quantum Mechanics', ['Calculus'])
+        # Quantum Mechanics must now move before Relativity
+        scheduler.add_prerequisite('Relativity', 'Quantum Mechanics')
+        names = [course.name for course in scheduler.ordered()]
+        self.assertLess(names.index('Quantum Mechanics'), names.index('Relativity'))
+        self.assertLess(names.index('Calculus'), names.index('Quantum Mechanics'))
+
+        # circular dependency is rejected and the schedule is unchanged
+        self.assertRaises(CycleError, lambda:scheduler.add_prerequisite('Calculus', 'Relativity'))
+        self.assertEqual([course.name for course in scheduler.ordered()], names)
+
+        scheduler.remove_prerequisite('Relativity', 'Quantum Mechanics')
+        self.assertRaises(SchedulerError, lambda:scheduler.remove_course('Calculus'))
+        scheduler.remove_course('Quantum Mechanics')
+        self.assertEqual(len(scheduler.ordered()), 5)
+        self.assertRaises(UnknownPrerequisiteError, lambda:scheduler.add_course('Optics', ['Quantum Mechanics']))
+
+    def test_read_course_graph(self):
+        for chunk_size in [3, 65536]:
+            graph = Scheduler('physics.json').read_course_graph(chunk_size)
+            ordered_courses = Scheduler('physics.json').get_ordered_courses(graph.courses())
+            self.assertEqual([course.name for course in ordered_courses],
+                             ['Calculus', 'Scientific Thinking', 'Differential Equations', 'Intro To Physics',
+                              'Relativity'])
+
+    def test_read_course_graph_error(self):
+        try:
+            with open('mock_courses.json', 'w') as mock_file:
+                mock_file.write('[{"name": "Relativity", "prerequisites": ["Calculus"]},\n'
+                                ' {"name": "Algebra", "prerequisites": []}]')
+            with self.assertRaises(UnknownPrerequisiteError) as context:
+                Scheduler('mock_courses.json').read_course_graph()
+            self.assertEqual((context.exception.line, context.exception.offset), (1, 1))
+        finally:
+            os.remove('mock_courses.json')
+
+    def test_collect_all_errors(self):
+        mock_courses = [
+        {
+            "name": "Relativity",
+            "prerequisites": ["Calculus", "Intro to Physics"]
+        },
+        {
+            "prerequisites": []
+        },
+        {
+            "name": "Intro to Physics",
+            "prerequisites": ["Relativity"]
+        },
+        {
+            "name": "Optics",
+            "prerequisites": ["Optics"]
+        }
+         ]
+        self.assertRaises(SchemaError, lambda:Scheduler('mock_courses.json').get_course_graph(mock_courses))
+
+        with self.assertRaises(CatalogValidationError) as context:
+            Scheduler('mock_courses.json').get_course_graph(mock_courses, collect_errors=True)
+        errors = context.exception.errors
+        self.assertEqual([type(error) for error in errors],
+                         [SchemaError, CycleError, UnknownPrerequisiteError, CycleError])
+        self.assertEqual(errors[3].cycle, ['Relativity', 'Intro To Physics', 'Relativity'])
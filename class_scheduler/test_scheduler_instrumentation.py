@@ -0,0 +1,86 @@
+from unittest import TestCase
+from scheduler_instrumentation import Instrumentation, INSTRUMENTATION, run_profiled
+from scheduler import Scheduler, main
+from contextlib import redirect_stdout, redirect_stderr
+from unittest import mock
+import io
+import os
+import tempfile
+
+
+class TestInstrumentation(TestCase):
+
+    ''' Test stages and counters are only recorded when enabled
+    '''
+    def test_instrumentation(self):
+        instrumentation = Instrumentation()
+
+        @instrumentation.timed('double')
+        def double(value):
+            return 2 * value
+
+        self.assertEqual(double(2), 4)
+        with instrumentation.stage('stage'):
+            instrumentation.count('items', 3)
+        self.assertEqual(instrumentation.snapshot(), {'timings': {}, 'calls': {}, 'counters': {}})
+
+        instrumentation.enable()
+        self.assertEqual(double(3), 6)
+        with instrumentation.stage('stage'):
+            instrumentation.count('items', 3)
+        instrumentation.count('items')
+        snapshot = instrumentation.snapshot()
+        self.assertEqual(snapshot['calls'], {'double': 1, 'stage': 1})
+        self.assertEqual(snapshot['counters'], {'items': 4})
+        self.assertGreaterEqual(snapshot['timings']['stage'], 0)
+
+        snapshots = []
+        instrumentation.add_hook(snapshots.append)
+        instrumentation.publish()
+        self.assertEqual(snapshots, [snapshot])
+        instrumentation.reset()
+        self.assertEqual(instrumentation.snapshot(), {'timings': {}, 'calls': {}, 'counters': {}})
+
+    ''' Test run_profiled records scheduler stages and counters, and dumps the profile
+    '''
+    def test_run_profiled(self):
+        snapshots = []
+        INSTRUMENTATION.reset()
+        INSTRUMENTATION.add_hook(snapshots.append)
+        file_descriptor, profile_path = tempfile.mkstemp(suffix='.prof')
+        os.close(file_descriptor)
+        try:
+            scheduler = Scheduler('math.json')
+            output = io.StringIO()
+            ordered_courses = run_profiled(lambda: scheduler.get_ordered_courses(scheduler.read_course_graph().courses()),
+                                           profile_path, output)
+            self.assertEqual(len(ordered_courses), 4)
+            self.assertGreater(os.path.getsize(profile_path), 0)
+        finally:
+            INSTRUMENTATION.remove_hook(snapshots.append)
+            INSTRUMENTATION.reset()
+            os.remove(profile_path)
+
+        self.assertFalse(INSTRUMENTATION.enabled)
+        self.assertEqual(snapshots[0]['calls'], {'read_course_graph': 1, 'order_courses': 1})
+        self.assertEqual(snapshots[0]['counters'], {'courses': 4, 'prerequisite_edges': 3})
+        self.assertIn('read_course_graph', output.getvalue())
+
+    ''' Test --profile is a flag, so the catalog can follow it, and --profile-file dumps the profile
+    '''
+    def test_main_profile(self):
+        file_descriptor, profile_path = tempfile.mkstemp(suffix='.prof')
+        os.close(file_descriptor)
+        try:
+            for options in (['--profile'], ['--profile-file', profile_path]):
+                output = io.StringIO()
+                report = io.StringIO()
+                with mock.patch('sys.argv', ['scheduler.py'] + options + ['math.json']), \
+                        redirect_stdout(output), redirect_stderr(report):
+                    main()
+                self.assertEqual(len(output.getvalue().splitlines()), 4)
+                self.assertIn('read_course_graph', report.getvalue())
+            self.assertGreater(os.path.getsize(profile_path), 0)
+            self.assertIn('Profile written to', report.getvalue())
+        finally:
+            os.remove(profile_path)
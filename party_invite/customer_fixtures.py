@@ -0,0 +1,19 @@
+''' Random customer records shared by the tests
+'''
+import random
+
+from party_invitee_list import REF_LAT, REF_LONG
+
+''' Returns a customer record with random coordinates at most lat_spread and long_spread
+    degrees from REF_LAT & REF_LONG
+'''
+def random_customer_record(user_id, rng, lat_spread=2, long_spread=3):
+    return {"latitude": str(REF_LAT + rng.uniform(-lat_spread, lat_spread)), "user_id": user_id,
+            "name": "Customer {}".format(user_id), "longitude": str(REF_LONG + rng.uniform(-long_spread, long_spread))}
+
+''' Returns count customer records with user ids 0 to count - 1 (see random_customer_record),
+    the same records for the same seed
+'''
+def random_customer_json(count, seed, lat_spread=2, long_spread=3):
+    rng = random.Random(seed)
+    return [random_customer_record(user_id, rng, lat_spread, long_spread) for user_id in range(count)]
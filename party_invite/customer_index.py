@@ -0,0 +1,190 @@
+from math import radians, sin, cos, floor, ceil, pi
+from array import array
+
+from party_invitee_list import np, RAD_TO_KM, BOUNDARY_MARGIN_KM, get_customer_coordinates, get_invited_indices
+
+TWO_PI = 2 * pi
+# slack for float error when comparing bounds
+BOUND_EPSILON = 1e-12
+
+''' Return (min, max) of cos over [low, high]
+'''
+def _cos_range(low, high):
+    cos_low = cos(low)
+    cos_high = cos(high)
+    maximum = 1.0 if ceil(low / TWO_PI) <= floor(high / TWO_PI) else max(cos_low, cos_high)
+    minimum = -1.0 if ceil((low - pi) / TWO_PI) <= floor((high - pi) / TWO_PI) else min(cos_low, cos_high)
+    return minimum, maximum
+
+''' Return a lower bound of the haversine term of calculate_distance_in_km,
+    sin(dlat/2)^2 + cos(dlat) * cos(dlong) * sin(dlong/2)^2,
+    for dlat in [dlat_min, dlat_max] and dlong in [dlong_min, dlong_max] (radians).
+'''
+def _min_haversine_term(dlat_min, dlat_max, dlong_min, dlong_max):
+    cos_dlat_min, cos_dlat_max = _cos_range(dlat_min, dlat_max)
+    # cos(dlong) * sin(dlong/2)^2 = c * (1 - c) / 2 with c = cos(dlong), concave in c
+    cos_dlong_min, cos_dlong_max = _cos_range(dlong_min, dlong_max)
+    dlong_term_min = min(cos_dlong_min * (1 - cos_dlong_min), cos_dlong_max * (1 - cos_dlong_max)) / 2
+    dlong_term_max = min(max(0.5, cos_dlong_min), cos_dlong_max)
+    dlong_term_max = dlong_term_max * (1 - dlong_term_max) / 2
+    return (1 - cos_dlat_max) / 2 + min(cos_dlat_min * dlong_term_min, cos_dlat_min * dlong_term_max,
+                                        cos_dlat_max * dlong_term_min, cos_dlat_max * dlong_term_max)
+
+''' Return the largest haversine term of customers that can be within max_distance
+    after rounding, None if every customer can be.
+'''
+def _max_haversine_term(max_distance):
+    half_angle = (round(max_distance, 2) + 0.005 + BOUNDARY_MARGIN_KM) / RAD_TO_KM / 2
+    if half_angle >= pi / 2:
+        return None
+    return sin(half_angle) ** 2 + BOUND_EPSILON
+
+''' Spatial index over a list of Customer objects for radius queries around any point.
+
+    Customers are grouped in grid cells of cell_size degrees, ordered by latitude band
+    and by longitude within a band. A binary tree over the ordered cells keeps the
+    bounding box of every range of cells, so ranges of cells are whole or partial
+    latitude bands. A query walks down the tree from the root and leaves out every
+    range whose lower bound of the distance from the point is out of range, and only
+    customers of the cells reached are checked with the same distance computation as
+    filter_customer_by_distance, so results match it exactly. Query cost is about
+    the number of cells close to the point times the depth of the tree (log of the
+    number of occupied cells), plus the customers in those cells.
+'''
+class CustomerIndex(object):
+
+    def __init__(self, customers, cell_size=0.5):
+        self.customers = customers
+        self.cell_size = cell_size
+        self.lats, self.longs = get_customer_coordinates(customers)
+
+        if np is not None:
+            self._build_cells_numpy()
+        else:
+            self._build_cells()
+        self._build_cell_tree()
+
+    ''' Group customer indices by cell, in ascending order within a cell, and keep the
+        bounding box of every cell in radians. Cells are ordered by latitude band, then longitude.
+    '''
+    def _build_cells(self):
+        cells = {}
+        for index, (lat, long) in enumerate(zip(self.lats, self.longs)):
+            cells.setdefault((floor(lat / self.cell_size), floor(long / self.cell_size)), []).append(index)
+
+        self.cell_offsets = array('i', [0])
+        self.cell_members = array('i')
+        self.cell_bounds = ([], [], [], [])
+        for _, members in sorted(cells.items()):
+            self.cell_members.extend(members)
+            self.cell_offsets.append(len(self.cell_members))
+            cell_lats = [self.lats[index] for index in members]
+            cell_longs = [self.longs[index] for index in members]
+            for bound, value in zip(self.cell_bounds,
+                                    (min(cell_lats), max(cell_lats), min(cell_longs), max(cell_longs))):
+                bound.append(radians(value))
+
+    ''' numpy version of _build_cells, np.unique orders cells by latitude band, then longitude
+    '''
+    def _build_cells_numpy(self):
+        cell_keys = np.stack([np.floor(self.lats / self.cell_size), np.floor(self.longs / self.cell_size)], axis=1)
+        if len(cell_keys) == 0:
+            cell_ids = np.zeros(0, dtype=np.int64)
+        else:
+            cell_ids = np.unique(cell_keys, axis=0, return_inverse=True)[1].ravel()
+        self.cell_members = np.argsort(cell_ids, kind='stable')
+        self.cell_offsets = np.concatenate([[0], np.cumsum(np.bincount(cell_ids))])
+        starts = self.cell_offsets[:-1]
+        lats = np.radians(self.lats[self.cell_members])
+        longs = np.radians(self.longs[self.cell_members])
+        if len(starts) == 0:
+            self.cell_bounds = (lats, lats, longs, longs)
+        else:
+            self.cell_bounds = (np.minimum.reduceat(lats, starts), np.maximum.reduceat(lats, starts),
+                                np.minimum.reduceat(longs, starts), np.maximum.reduceat(longs, starts))
+
+    ''' Build the bounding boxes of the cell tree: node 1 is the root, nodes 2i and 2i + 1
+        are the children of node i and node leaf_start + cell is the leaf of a cell.
+        Nodes without cells have an empty box (min > max).
+    '''
+    def _build_cell_tree(self):
+        cell_count = len(self.cell_offsets) - 1
+        self._leaf_start = 1
+        while self._leaf_start < cell_count:
+            self._leaf_start *= 2
+        node_count = 2 * self._leaf_start
+        self._node_bounds = []
+        for cell_bounds, empty in zip(self.cell_bounds, (float('inf'), float('-inf'), float('inf'), float('-inf'))):
+            node_bounds = [empty] * node_count
+            node_bounds[self._leaf_start:self._leaf_start + cell_count] = \
+                cell_bounds.tolist() if np is not None else cell_bounds
+            self._node_bounds.append(node_bounds)
+
+        lat_min, lat_max, long_min, long_max = self._node_bounds
+        for node in range(self._leaf_start - 1, 0, -1):
+            left, right = 2 * node, 2 * node + 1
+            lat_min[node] = min(lat_min[left], lat_min[right])
+            lat_max[node] = max(lat_max[left], lat_max[right])
+            long_min[node] = min(long_min[left], long_min[right])
+            long_max[node] = max(long_max[left], long_max[right])
+
+    def __len__(self):
+        return len(self.customers)
+
+    ''' Returns indices of cells that can hold customers within max_distance of lat & long,
+        in ascending order
+    '''
+    def _get_candidate_cells(self, lat, long, max_distance):
+        max_term = _max_haversine_term(max_distance)
+        cell_count = len(self.cell_offsets) - 1
+        if max_term is None:
+            return list(range(cell_count))
+
+        lat_rad = radians(lat)
+        long_rad = radians(long)
+        lat_min, lat_max, long_min, long_max = self._node_bounds
+        leaf_start = self._leaf_start
+        cells = []
+        nodes = [1] if cell_count else []
+        while nodes:
+            node = nodes.pop()
+            if lat_min[node] > lat_max[node] or _min_haversine_term(lat_min[node] - lat_rad, lat_max[node] - lat_rad,
+                                                                    long_min[node] - long_rad,
+                                                                    long_max[node] - long_rad) > max_term:
+                continue
+            if node >= leaf_start:
+                cells.append(node - leaf_start)
+            else:
+                # right child first, so cells are reached in ascending order
+                nodes.append(2 * node + 1)
+                nodes.append(2 * node)
+        return cells
+
+    ''' Returns indices of customers within max_distance km of lat & long, in ascending order
+    '''
+    def query_indices(self, lat, long, max_distance):
+        cells = self._get_candidate_cells(lat, long, max_distance)
+        if np is not None:
+            if len(cells) == 0:
+                return []
+            candidates = np.sort(np.concatenate([self.cell_members[self.cell_offsets[cell]:self.cell_offsets[cell + 1]]
+                                                 for cell in cells]))
+            invited = get_invited_indices(self.lats[candidates], self.longs[candidates], max_distance, lat, long)
+            return candidates[invited].tolist()
+
+        candidates = sorted(index for cell in cells
+                            for index in self.cell_members[self.cell_offsets[cell]:self.cell_offsets[cell + 1]])
+        invited = get_invited_indices([self.lats[index] for index in candidates],
+                                      [self.longs[index] for index in candidates], max_distance, lat, long)
+        return [candidates[index] for index in invited]
+
+    ''' Returns customers within max_distance km of lat & long, in customer list order
+    '''
+    def query(self, lat, long, max_distance):
+        return [self.customers[index] for index in self.query_indices(lat, long, max_distance)]
+
+    ''' Returns a list of customers within max_distance km for every (lat, long) in points,
+        every point is one query walking down the cell tree
+    '''
+    def query_many(self, points, max_distance):
+        return [self.query(lat, long, max_distance) for lat, long in points]
@@ -0,0 +1,202 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+from party_invitee_list import np, Customer, open_customer_json_file, iter_customer_records, iter_customers,\
+    get_invited_indices, get_nearest_indices, write_invited_customers, write_nearest_customers
+
+# header of customer store files: magic, number of customers
+HEADER = struct.Struct('<8sQ')
+MAGIC = b'CUSTCOL1'
+
+''' Return a copy of an array in little-endian byte order
+'''
+def _little_endian(values):
+    if sys.byteorder == 'little':
+        return values
+    values = array(values.typecode, values)
+    values.byteswap()
+    return values
+
+''' Write customers to a customer store file at customer_store_path.
+
+    The file is a header followed by little-endian columns, each 8-byte aligned:
+    user_id int64 x count, latitude float64 x count, longitude float64 x count,
+    name offsets int64 x (count + 1) and the utf-8 names, customer i having the name
+    bytes names[offsets[i]:offsets[i + 1]]. The file is written through a temporary
+    file so readers never see partial files. Returns the number of customers.
+'''
+def write_customer_store(customers, customer_store_path):
+    user_ids = array('q')
+    lats = array('d')
+    longs = array('d')
+    name_offsets = array('q', [0])
+    names = bytearray()
+    for customer in customers:
+        user_ids.append(int(customer.user_id))
+        lats.append(customer.lat_in_float)
+        longs.append(customer.long_in_float)
+        names += customer.name.encode('utf-8')
+        name_offsets.append(len(names))
+
+    directory = os.path.dirname(os.path.abspath(customer_store_path))
+    file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as store_file:
+            store_file.write(HEADER.pack(MAGIC, len(user_ids)))
+            for column in (user_ids, lats, longs, name_offsets):
+                store_file.write(_little_endian(column).tobytes())
+            store_file.write(names)
+        os.replace(temp_path, customer_store_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return len(user_ids)
+
+''' Convert a customer json file (json array or one json customer per line) to a
+    customer store file, reading one customer at a time. Returns the number of customers.
+'''
+def convert_customer_json_file(customer_json_file_path, customer_store_path):
+    with open_customer_json_file(customer_json_file_path) as customer_json_file:
+        return write_customer_store(iter_customers(iter_customer_records(customer_json_file)), customer_store_path)
+
+''' Read-only customer store file written by write_customer_store.
+
+    The file is memory-mapped and user_ids, lats & longs are views on the mapped
+    columns (numpy arrays if numpy is installed, memoryviews otherwise), so opening
+    a store does not read or parse the customers, pages are loaded by the OS as
+    they are used. Customer objects are only created for customers asked for.
+    Columns taken from the store stay valid after close: the file stays mapped while
+    any of them is held, and is unmapped once the last one is freed.
+    Properties - user_ids, lats, longs: int64/float64 columns in store order.
+'''
+class CustomerStore(object):
+
+    def __init__(self, customer_store_path):
+        try:
+            with open(customer_store_path, 'rb') as store_file:
+                self._mmap = mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            raise Exception('{} does not exist'.format(customer_store_path))
+        except (IOError, ValueError):
+            raise Exception('Error occured while opening file {}'.format(customer_store_path))
+
+        if len(self._mmap) < HEADER.size:
+            self._mmap.close()
+            raise Exception('{} is not a customer store file'.format(customer_store_path))
+        magic, self._count = HEADER.unpack_from(self._mmap)
+        names_start = HEADER.size + (4 * self._count + 1) * 8
+        if magic != MAGIC or len(self._mmap) < names_start:
+            self._mmap.close()
+            raise Exception('{} is not a customer store file'.format(customer_store_path))
+
+        self._buffer = memoryview(self._mmap)
+        offset = HEADER.size
+        self.user_ids = self._column('q', offset, self._count)
+        self.lats = self._column('d', offset + 8 * self._count, self._count)
+        self.longs = self._column('d', offset + 16 * self._count, self._count)
+        self._name_offsets = self._column('q', offset + 24 * self._count, self._count + 1)
+        self._names = self._buffer[names_start:]
+        if len(self._names) != self._name_offsets[self._count]:
+            self.close()
+            raise Exception('{} is not a customer store file'.format(customer_store_path))
+
+    ''' Return a view on count values of typecode at offset of the mapped file
+    '''
+    def _column(self, typecode, offset, count):
+        if np is not None:
+            return np.frombuffer(self._mmap, dtype='<' + {'q': 'i8', 'd': 'f8'}[typecode], count=count, offset=offset)
+        column = self._buffer[offset:offset + 8 * count].cast(typecode)
+        # columns are little-endian, copy them on big-endian machines
+        return column if sys.byteorder == 'little' else _little_endian(array(typecode, column.tobytes()))
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    ''' Unmap the file, or if columns taken from the store are still held, leave it
+        mapped until they are freed.
+    '''
+    def close(self):
+        self.user_ids = self.lats = self.longs = self._name_offsets = self._names = None
+        if self._buffer is not None:
+            self._buffer.release()
+            self._buffer = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # columns hold exports of the map, it is closed when it is freed with the last one
+                pass
+            self._mmap = None
+
+    ''' Return the name of the customer at index
+    '''
+    def name(self, index):
+        return self._names[int(self._name_offsets[index]):int(self._name_offsets[index + 1])].tobytes().decode('utf-8')
+
+    ''' Return the Customer object at index
+    '''
+    def customer(self, index):
+        return Customer(user_id=int(self.user_ids[index]), name=self.name(index),
+                        lat=repr(float(self.lats[index])), long=repr(float(self.longs[index])))
+
+    ''' Returns indices of customers within max_allowed_distance of REF_LAT & REF_LONG,
+        computed directly over the mapped columns, or by distance_filter (a
+        ShardedDistanceFilter) if given.
+    '''
+    def invited_indices(self, max_allowed_distance, distance_filter=None):
+        if distance_filter is not None:
+            return distance_filter.invited_indices(self.lats, self.longs, max_allowed_distance)
+        return get_invited_indices(self.lats, self.longs, max_allowed_distance)
+
+    ''' Yields customers within max_allowed_distance of REF_LAT & REF_LONG, in store order
+    '''
+    def iter_invited_customers(self, max_allowed_distance, distance_filter=None):
+        for index in self.invited_indices(max_allowed_distance, distance_filter):
+            yield self.customer(index)
+
+    ''' Returns (customer, distance in km) of the count customers closest to REF_LAT & REF_LONG,
+        closest first
+    '''
+    def nearest_customers(self, count):
+        return [(self.customer(index), distance)
+                for distance, index in get_nearest_indices(self.lats, self.longs, count)]
+
+''' Writes names of customers of a customer store file within max_allowed_distance
+    of REF_LAT & REF_LONG, in the format of display_invited_customers
+'''
+def write_store_invited_customers(customer_store_path, max_allowed_distance, output=None, distance_filter=None,
+                                  output_format='text'):
+    with CustomerStore(customer_store_path) as store:
+        write_invited_customers(store.iter_invited_customers(max_allowed_distance, distance_filter), output,
+                                output_format=output_format)
+
+''' Writes names of the count customers of a customer store file closest to
+    REF_LAT & REF_LONG with their distance
+'''
+def write_store_nearest_customers(customer_store_path, count, output=None, output_format='text'):
+    with CustomerStore(customer_store_path) as store:
+        write_nearest_customers(store.nearest_customers(count), output, output_format)
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert a customer json file to a customer store file')
+    parser.add_argument("-customer_json_file", help="customer json file path")
+    parser.add_argument("-customer_store", help="customer store file path to write")
+    args = parser.parse_args()
+
+    count = convert_customer_json_file(args.customer_json_file, args.customer_store)
+    print('Wrote {} customers to {}'.format(count, args.customer_store))
+
+
+if __name__ == "__main__":
+    main()
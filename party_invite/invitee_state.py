@@ -0,0 +1,172 @@
+import csv
+import io
+import json
+import os
+import sqlite3
+import sys
+from operator import attrgetter
+from urllib.request import pathname2url
+
+from party_invitee_list import BATCH_SIZE, Customer, iter_batches, filter_customer_by_distance, _CustomerRenderer
+
+DELTA_OPERATIONS = ('add', 'update', 'delete')
+USER_ID = attrgetter('user_id')
+# sqlite uri mode of every flag
+STATE_FILE_MODES = {'r': 'ro', 'w': 'rw', 'n': 'rwc'}
+
+''' Invitee state of customers, persisted in a sqlite3 database with the user id as
+    primary key. Every customer is kept with its name, latitude, longitude and whether
+    it is invited, next to the max allowed distance customers are filtered with.
+
+    Applying a delta looks up, filters and writes the changed customers only, by
+    primary key, so its cost depends on the size of the delta, not on the number of
+    customers. The changes of a delta are written in one transaction.
+    flag is 'r' to read, 'w' to update, 'n' for a new state (replacing state_path).
+    Properties - max_allowed_distance: float
+'''
+class InviteeState(object):
+
+    def __init__(self, state_path, flag='r', max_allowed_distance=None):
+        if flag not in STATE_FILE_MODES:
+            raise Exception('Unknown invitee state flag {}'.format(flag))
+        if flag == 'n':
+            if max_allowed_distance is None:
+                raise Exception('max_allowed_distance is needed for a new invitee state')
+            if os.path.exists(state_path):
+                os.remove(state_path)
+        elif not os.path.exists(state_path):
+            raise Exception('{} does not exist'.format(state_path))
+
+        # the path is quoted, so characters such as # ? % are part of the file name
+        self._connection = sqlite3.connect('file:{}?mode={}'.format(pathname2url(os.path.abspath(state_path)),
+                                                                     STATE_FILE_MODES[flag]), uri=True)
+        try:
+            if flag == 'n':
+                with self._connection:
+                    self._connection.execute('CREATE TABLE settings (key TEXT PRIMARY KEY, value)')
+                    self._connection.execute('CREATE TABLE customers (user_id INTEGER PRIMARY KEY, name TEXT, '
+                                             'lat TEXT, long TEXT, invited INTEGER)')
+                    self._connection.execute("INSERT INTO settings VALUES ('max_allowed_distance', ?)",
+                                             (max_allowed_distance,))
+            self.max_allowed_distance, = self._connection.execute(
+                "SELECT value FROM settings WHERE key = 'max_allowed_distance'").fetchone()
+        except (sqlite3.DatabaseError, TypeError):
+            self._connection.close()
+            raise Exception('{} is not an invitee state file'.format(state_path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self):
+        self._connection.close()
+
+    ''' Add customers to the state, filtering batch_size customers at a time, and yield
+        the list of invited customers of every batch as soon as it is added
+    '''
+    def add_customers(self, customers, batch_size=BATCH_SIZE):
+        for batch in iter_batches(customers, batch_size):
+            invited_customers = filter_customer_by_distance(batch, self.max_allowed_distance)
+            invited_user_ids = set(map(USER_ID, invited_customers))
+            with self._connection:
+                self._connection.executemany('INSERT OR REPLACE INTO customers VALUES (?, ?, ?, ?, ?)',
+                                             ((customer.user_id, customer.name, customer.lat, customer.long,
+                                               customer.user_id in invited_user_ids) for customer in batch))
+            yield invited_customers
+
+    ''' Return the invited customers, sorted by user id
+    '''
+    def invited_customers(self):
+        return [Customer(user_id, name, lat, long) for user_id, name, lat, long in self._connection.execute(
+            'SELECT user_id, name, lat, long FROM customers WHERE invited ORDER BY user_id')]
+
+    ''' Return (name, lat, long, invited) of a customer, None if it is not in the state
+    '''
+    def _get_customer_row(self, user_id):
+        return self._connection.execute('SELECT name, lat, long, invited FROM customers WHERE user_id = ?',
+                                        (user_id,)).fetchone()
+
+    ''' Apply changes (see iter_delta_records) in order and return the customers the
+        delta invited and uninvited, (added, removed), sorted by user id.
+        Changes are checked before the state is written: an add of a customer in the
+        state, an update or delete of a customer not in the state, or a bad change
+        raises an exception and leaves the state unchanged.
+    '''
+    def apply_delta(self, changes):
+        # state row before the delta and Customer (None if deleted) after it, of the changed customers only
+        before = {}
+        after = {}
+        for change in changes:
+            operation = change.get('op')
+            if operation not in DELTA_OPERATIONS:
+                raise Exception('Unknown delta operation {}'.format(operation))
+            try:
+                user_id = change['user_id']
+                if user_id not in before:
+                    before[user_id] = self._get_customer_row(user_id)
+                exists = (after[user_id] if user_id in after else before[user_id]) is not None
+                if operation == 'add' and exists:
+                    raise Exception('Customer {} is already in the invitee state'.format(user_id))
+                if operation != 'add' and not exists:
+                    raise Exception('Customer {} is not in the invitee state'.format(user_id))
+                after[user_id] = None if operation == 'delete' else \
+                    Customer(user_id, change['name'], change['latitude'], change['longitude'])
+            except KeyError:
+                raise Exception('Key missing')
+
+        customers = [customer for customer in after.values() if customer is not None]
+        invited_user_ids = set(map(USER_ID, filter_customer_by_distance(customers, self.max_allowed_distance)))
+        added = []
+        removed = []
+        with self._connection:
+            for user_id, customer in after.items():
+                was_invited = before[user_id] is not None and bool(before[user_id][3])
+                is_invited = customer is not None and customer.user_id in invited_user_ids
+                if customer is None:
+                    self._connection.execute('DELETE FROM customers WHERE user_id = ?', (user_id,))
+                else:
+                    self._connection.execute('INSERT OR REPLACE INTO customers VALUES (?, ?, ?, ?, ?)',
+                                             (user_id, customer.name, customer.lat, customer.long, is_invited))
+                if is_invited and not was_invited:
+                    added.append(customer)
+                elif was_invited and not is_invited:
+                    name, lat, long, _ = before[user_id]
+                    removed.append(Customer(user_id, name, lat, long))
+        return sorted(added, key=USER_ID), sorted(removed, key=USER_ID)
+
+''' Yields the changes of a delta file, one json object per line: op (add, update or
+    delete) and user_id, with name, latitude and longitude for add and update.
+'''
+def iter_delta_records(delta_file):
+    for line_number, line in enumerate(delta_file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            raise Exception('Invalid json on line {} of the delta file'.format(line_number))
+
+''' Writes the customers added to and removed from the invitee list to output, as two
+    customer lists for text, or with a change column (added or removed) for csv and jsonl
+'''
+def write_invitee_changes(added, removed, output=None, output_format='text'):
+    output = output if output is not None else sys.stdout
+    if output_format == 'text':
+        for title, customers in (('Added invitees:', added), ('Removed invitees:', removed)):
+            renderer = _CustomerRenderer(output_format, title)
+            output.write(renderer.header() + renderer.render(customers))
+    elif output_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(('user_id', 'name', 'change'))
+        for change, customers in (('added', added), ('removed', removed)):
+            writer.writerows((customer.user_id, customer.name, change) for customer in customers)
+        output.write(buffer.getvalue())
+    else:
+        for change, customers in (('added', added), ('removed', removed)):
+            output.write(''.join(json.dumps({'user_id': customer.user_id, 'name': customer.name, 'change': change}) + '\n'
+                                 for customer in customers))
+    output.flush()
@@ -0,0 +1,149 @@
+import cProfile
+import functools
+import pstats
+import sys
+import time
+
+''' Context manager doing nothing, returned by stage() when instrumentation is disabled
+'''
+class _NullStage(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+''' Context manager adding its elapsed time to a stage of an Instrumentation
+'''
+class _Stage(object):
+
+    def __init__(self, instrumentation, name):
+        self._instrumentation = instrumentation
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._instrumentation.add_time(self._name, time.perf_counter() - self._start)
+        return False
+
+''' Stage timers and counters of a run.
+
+    Code paths time stages with "with INSTRUMENTATION.stage(name):" or the timed(name)
+    decorator and count items with count(name, value). Instrumentation is disabled by
+    default: stage() then returns a shared no-op context manager and count() returns
+    at once, so instrumented code only pays for a check of enabled. Counters are
+    counted once per batch, not per item, to keep the cost out of loops.
+    Properties - enabled: bool, timings: dict of stage: total seconds,
+    calls: dict of stage: number of times timed, counters: dict of name: int.
+'''
+class Instrumentation(object):
+
+    def __init__(self):
+        self.enabled = False
+        self.timings = {}
+        self.calls = {}
+        self.counters = {}
+        self._hooks = []
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    ''' Clear timings and counters
+    '''
+    def reset(self):
+        self.timings = {}
+        self.calls = {}
+        self.counters = {}
+
+    ''' Return a context manager timing the stage name
+    '''
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    ''' Decorator timing every call of a function as the stage name
+    '''
+    def timed(self, name):
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with _Stage(self, name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def add_time(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    ''' Add value to the counter name
+    '''
+    def count(self, name, value=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    ''' Return a copy of timings, calls and counters
+    '''
+    def snapshot(self):
+        return {'timings': dict(self.timings), 'calls': dict(self.calls), 'counters': dict(self.counters)}
+
+    ''' Register hook(snapshot) to be called by publish, for metrics collection
+    '''
+    def add_hook(self, hook):
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self._hooks.remove(hook)
+
+    ''' Call every hook with a snapshot of timings and counters
+    '''
+    def publish(self):
+        snapshot = self.snapshot()
+        for hook in self._hooks:
+            hook(snapshot)
+
+    ''' Write stage timings and counters to output
+    '''
+    def report(self, output=None):
+        output = output if output is not None else sys.stderr
+        output.write('Stage timings:\n')
+        for name, seconds in sorted(self.timings.items(), key=lambda item: -item[1]):
+            output.write('  {:<24} {:10.6f} s  {:6} calls\n'.format(name, seconds, self.calls[name]))
+        output.write('Counters:\n')
+        for name, value in sorted(self.counters.items()):
+            output.write('  {:<24} {:10}\n'.format(name, value))
+
+INSTRUMENTATION = Instrumentation()
+
+''' Run function with instrumentation enabled and under cProfile, then publish the
+    stage timings and counters to hooks and write them to stderr, followed by the
+    top functions by cumulative time, or dump the profile to profile_path (for pstats)
+    if it is set. Returns the result of function.
+'''
+def run_profiled(function, profile_path=None, output=None):
+    output = output if output is not None else sys.stderr
+    profile = cProfile.Profile()
+    INSTRUMENTATION.enable()
+    try:
+        return profile.runcall(function)
+    finally:
+        INSTRUMENTATION.disable()
+        INSTRUMENTATION.publish()
+        INSTRUMENTATION.report(output)
+        if profile_path:
+            profile.dump_stats(profile_path)
+            output.write('Profile written to {}\n'.format(profile_path))
+        else:
+            pstats.Stats(profile, stream=output).sort_stats('cumulative').print_stats(20)
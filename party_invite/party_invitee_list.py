@@ -1,13 +1,42 @@
 from math import radians, sin, cos, asin, sqrt
+from array import array
+from itertools import chain, islice, starmap
+from operator import itemgetter
+import csv
+import heapq
+import io
 import json
+import re
+import sys
 import argparse
 
+from party_instrumentation import INSTRUMENTATION, run_profiled
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 REF_LAT = 53.3381985
 REF_LONG = -6.2592576
 RAD_TO_KM = 6371
+# distances closer than this to the rounding boundary of max_allowed_distance are
+# recomputed with calculate_distance_in_km, so vectorized results match it exactly
+BOUNDARY_MARGIN_KM = 1e-6
+# characters read from customer json files at a time
+CHUNK_SIZE = 65536
+# customers filtered at a time when streaming
+BATCH_SIZE = 10000
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+# the start of a number or literal (true, false, null, NaN, Infinity) running to the end of the text
+PARTIAL_TOKEN = re.compile(r'[\w.+-]*\Z')
+# Customer arguments of a customer json record, in order
+CUSTOMER_FIELDS = itemgetter('user_id', 'name', 'latitude', 'longitude')
+OUTPUT_FORMATS = ('text', 'csv', 'jsonl')
 
 ''' Read customer json file and return customer json.
 '''
+@INSTRUMENTATION.timed('read_json')
 def read_customer_json_file(customer_json_file_path):
     customer_json_file = None
     try:
@@ -25,28 +54,146 @@ def read_customer_json_file(customer_json_file_path):
 
     return customers_json
 
-''' Returns list of Customer objects from customer json
+''' Open a customer json file for reading
+'''
+def open_customer_json_file(customer_json_file_path):
+    try:
+        return open(customer_json_file_path)
+    except FileNotFoundError:
+        raise Exception('{} does not exist'.format(customer_json_file_path))
+    except IOError:
+        raise Exception('Error occured while opening file {}'.format(customer_json_file_path))
+
+''' Yields customer records of a customer json file one at a time, reading the file
+    in chunks of chunk_size characters. The file is either a json array of customers,
+    or one json customer per line (NDJSON).
+'''
+def iter_customer_records(customer_json_file, chunk_size=CHUNK_SIZE):
+    stream = _JsonArrayStream(customer_json_file, chunk_size)
+    if stream.peek() == '[':
+        for record in stream.iter_array():
+            yield record
+        return
+
+    # one customer per line, complete the line of the buffered text from the file
+    lines = chain(io.StringIO(stream.rest() + customer_json_file.readline()), customer_json_file)
+    for line in lines:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                raise Exception('Error occured while parsing customer json file')
+
+''' Return True if the json decode error of text can be caused by a value continuing
+    after the end of text, False for an error inside text.
+    Same as is_truncated_json of class_scheduler/catalog_loader.py, as samples do not import
+    each other; benchmarks/test_engines.py checks both on the same inputs.
+'''
+def is_truncated_json(text, error):
+    rest = text[error.pos:]
+    if error.msg.startswith('Unterminated string'):
+        return True
+    if error.msg.startswith('Invalid \\uXXXX escape'):
+        return len(rest) <= 5
+    return PARTIAL_TOKEN.match(rest) is not None
+
+''' Reads a json array from a file in chunks, decoding one element at a time.
+'''
+class _JsonArrayStream(object):
+
+    def __init__(self, json_file, chunk_size):
+        self._file = json_file
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._position = 0
+        self._eof = False
+
+    ''' Read the next chunk, returns False at the end of the file
+    '''
+    def _read_more(self):
+        chunk = '' if self._eof else self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+        return True
+
+    ''' Return the next character after whitespace, None at the end of the file
+    '''
+    def peek(self):
+        while True:
+            self._position = WHITESPACE.match(self._buffer, self._position).end()
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._read_more():
+                return None
+
+    ''' Return buffered text not read yet
+    '''
+    def rest(self):
+        return self._buffer[self._position:]
+
+    def _decode(self):
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+                # a value ending with the buffer may continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    self._position = end
+                    return value
+            except json.JSONDecodeError as e:
+                # only a value running to the end of the buffer may be completed by the next chunk
+                if self._eof or not is_truncated_json(self._buffer, e):
+                    raise Exception('Error occured while parsing customer json file')
+            self._read_more()
+
+    def iter_array(self):
+        self._position += 1
+        if self.peek() == ']':
+            self._position += 1
+            return
+        while True:
+            self.peek()
+            yield self._decode()
+            delimiter = self.peek()
+            self._position += 1
+            if delimiter == ']':
+                return
+            if delimiter != ',':
+                raise Exception('Error occured while parsing customer json file')
+
+''' Returns list of Customer objects from customer json.
+    Fields of every customer are taken at once by CUSTOMER_FIELDS.
 '''
+@INSTRUMENTATION.timed('get_customer_list')
 def get_customer_list(customers_json):
-    customers = []
     try:
-        for customer in customers_json:
-            customers.append(Customer(user_id=customer['user_id'],
-                                      name=customer['name'],
-                                      lat=customer['latitude'],
-                                      long=customer['longitude']))
+        customers = list(starmap(Customer, map(CUSTOMER_FIELDS, customers_json)))
     except KeyError:
         raise Exception('Key missing')
-
+    INSTRUMENTATION.count('customers', len(customers))
     return customers
 
+''' Yields Customer objects from customer records
+'''
+def iter_customers(customer_records):
+    try:
+        for customer in starmap(Customer, map(CUSTOMER_FIELDS, customer_records)):
+            yield customer
+    except KeyError:
+        raise Exception('Key missing')
+
 ''' Return the shortest distance between two points in km.
     Ref: https://en.wikipedia.org/wiki/Great-circle_distance
 '''
 def calculate_distance_in_km(ref_lat, ref_long, lat, long):
     # convert lat, long to radians
     ref_lat_rad, ref_long_rad, lat_rad, long_rad = [radians(dec) for dec in [ref_lat, ref_long, lat, long]]
+    return _distance_in_km(ref_lat_rad, ref_long_rad, lat_rad, long_rad)
 
+def _distance_in_km(ref_lat_rad, ref_long_rad, lat_rad, long_rad):
     # great-circle distance formulae
     delta_lat = lat_rad - ref_lat_rad
     delta_long = long_rad - ref_long_rad
@@ -57,62 +204,351 @@ def calculate_distance_in_km(ref_lat, ref_long, lat, long):
 
     return distance_in_km
 
+''' Return the distances in km between a point and arrays of latitudes and longitudes,
+    computed with numpy over the whole arrays. Same formula as calculate_distance_in_km.
+'''
+def calculate_distances_in_km(ref_lat, ref_long, lats, longs):
+    ref_lat_rad = radians(ref_lat)
+    ref_long_rad = radians(ref_long)
+
+    delta_lat = np.radians(lats) - ref_lat_rad
+    delta_long = np.radians(longs) - ref_long_rad
+    with np.errstate(invalid='ignore'):
+        distance_in_radians = 2 * np.arcsin(np.sqrt(np.sin(delta_lat / 2) ** 2 + np.cos(delta_lat) *
+                                                    np.cos(delta_long) * np.sin(delta_long / 2) ** 2))
+    return RAD_TO_KM * distance_in_radians
+
+''' Returns latitudes and longitudes of customers as contiguous float64 arrays,
+    numpy arrays if numpy is installed.
+'''
+def get_customer_coordinates(customers):
+    if np is not None:
+        return (np.fromiter((customer.lat_in_float for customer in customers), dtype=np.float64, count=len(customers)),
+                np.fromiter((customer.long_in_float for customer in customers), dtype=np.float64,
+                            count=len(customers)))
+    return (array('d', (customer.lat_in_float for customer in customers)),
+            array('d', (customer.long_in_float for customer in customers)))
+
+''' Returns indices of the coordinates within max_allowed_distance of ref_lat & ref_long,
+    in ascending order. Computed over whole arrays if numpy is installed, with the same
+    result as calculate_distance_in_km for every coordinate.
+'''
+def get_invited_indices(lats, longs, max_allowed_distance, ref_lat=REF_LAT, ref_long=REF_LONG):
+    allowed_distance = round(max_allowed_distance, 2)
+    INSTRUMENTATION.count('distances_computed', len(lats))
+    if np is None:
+        ref_lat_rad = radians(ref_lat)
+        ref_long_rad = radians(ref_long)
+        return [index for index, (lat, long) in enumerate(zip(lats, longs))
+                if round(_distance_in_km(ref_lat_rad, ref_long_rad, radians(lat), radians(long)), 2) <= allowed_distance]
+
+    lats = np.asarray(lats, dtype=np.float64)
+    longs = np.asarray(longs, dtype=np.float64)
+    distances = calculate_distances_in_km(ref_lat, ref_long, lats, longs)
+    # a distance rounds to at most allowed_distance below allowed_distance + 0.005
+    boundary = allowed_distance + 0.005
+    invited = distances < boundary - BOUNDARY_MARGIN_KM
+    uninvited = distances > boundary + BOUNDARY_MARGIN_KM
+    # distances near the boundary (and invalid ones) are decided by calculate_distance_in_km
+    for index in np.flatnonzero(~(invited | uninvited)):
+        distance_in_km = calculate_distance_in_km(ref_lat, ref_long, float(lats[index]), float(longs[index]))
+        invited[index] = round(distance_in_km, 2) <= allowed_distance
+    return np.flatnonzero(invited).tolist()
+
 ''' Displays the list of customers that are inside the allowed distance.
+    coordinates are the arrays returned by get_customer_coordinates(customers),
+    they are created if not given.
 '''
-def filter_customer_by_distance(customers, max_allowed_distance):
-    invited_customers = []
-    for customer in customers:
-        distance_in_km = calculate_distance_in_km(ref_lat=REF_LAT, ref_long=REF_LONG,
-                                 lat=customer.lat_in_float, long=customer.long_in_float
-                                 )
-        # customers inside allowed_distance are invited
-        if round(distance_in_km, 2) <= round(max_allowed_distance,2):
-            invited_customers.append(customer)
+@INSTRUMENTATION.timed('filter_customer_by_distance')
+def filter_customer_by_distance(customers, max_allowed_distance, coordinates=None):
+    if np is None and coordinates is None:
+        # use radians computed when customers were created
+        INSTRUMENTATION.count('distances_computed', len(customers))
+        allowed_distance = round(max_allowed_distance, 2)
+        ref_lat_rad = radians(REF_LAT)
+        ref_long_rad = radians(REF_LONG)
+        return [customer for customer in customers
+                if round(_distance_in_km(ref_lat_rad, ref_long_rad, customer.lat_in_radians, customer.long_in_radians),
+                         2) <= allowed_distance]
+
+    lats, longs = coordinates if coordinates is not None else get_customer_coordinates(customers)
+    invited_customers = [customers[index] for index in get_invited_indices(lats, longs, max_allowed_distance)]
 
     return invited_customers
 
+''' Yields lists of batch_size items, the last one can be shorter
+'''
+def iter_batches(items, batch_size):
+    items = iter(items)
+    while True:
+        # items of streamed input are read and parsed here
+        with INSTRUMENTATION.stage('read_batch'):
+            batch = list(islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
+
+''' Yields the list of customers within max_allowed_distance of REF_LAT & REF_LONG of
+    every batch of batch_size customers, as soon as the batch is filtered, so only one
+    batch is in memory. Lists can be empty.
+    Batches are filtered by distance_filter (a ShardedDistanceFilter) if given.
+'''
+def iter_invited_customers(customers, max_allowed_distance, batch_size=BATCH_SIZE, distance_filter=None):
+    for batch in iter_batches(customers, batch_size):
+        INSTRUMENTATION.count('batches')
+        if distance_filter is not None:
+            yield distance_filter.filter_customers(batch, max_allowed_distance)
+        else:
+            yield filter_customer_by_distance(batch, max_allowed_distance)
+
+''' Renders customers, and their distance if with_distance is True, in one of
+    OUTPUT_FORMATS: text (names under title), csv with a header line, or one json
+    object per line. csv lines are rendered into one reused buffer.
+'''
+class _CustomerRenderer(object):
+
+    def __init__(self, output_format, title, with_distance=False):
+        if output_format not in OUTPUT_FORMATS:
+            raise Exception('Unknown output format {}'.format(output_format))
+        self.output_format = output_format
+        self.title = title
+        self.with_distance = with_distance
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    ''' Return the text written before customers
+    '''
+    def header(self):
+        if self.output_format == 'text':
+            return self.title + '\n'
+        if self.output_format == 'csv':
+            return self._render_csv([('user_id', 'name', 'distance_km') if self.with_distance else ('user_id', 'name')])
+        return ''
+
+    ''' Return the text of customers, distances are the distances of customers if with_distance is True
+    '''
+    def render(self, customers, distances=None):
+        if self.output_format == 'text':
+            if self.with_distance:
+                return ''.join('{} - {:.2f} km\n\n'.format(customer.name, distance)
+                               for customer, distance in zip(customers, distances))
+            return ''.join([customer.name + '\n\n' for customer in customers])
+        if self.output_format == 'csv':
+            if self.with_distance:
+                return self._render_csv((customer.user_id, customer.name, distance)
+                                        for customer, distance in zip(customers, distances))
+            return self._render_csv((customer.user_id, customer.name) for customer in customers)
+        if self.with_distance:
+            return ''.join(json.dumps({'user_id': customer.user_id, 'name': customer.name, 'distance_km': distance}) + '\n'
+                           for customer, distance in zip(customers, distances))
+        return ''.join(json.dumps({'user_id': customer.user_id, 'name': customer.name}) + '\n'
+                       for customer in customers)
+
+    def _render_csv(self, rows):
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._writer.writerows(rows)
+        return self._buffer.getvalue()
+
+''' Writes lists of invited customers to output as they come, in output_format (text is
+    the format of display_invited_customers). Every list is rendered and written at once,
+    output is flushed after every write.
+'''
+def write_invited_batches(invited_batches, output=None, output_format='text'):
+    output = output if output is not None else sys.stdout
+    renderer = _CustomerRenderer(output_format, 'Invited customer list:')
+    output.write(renderer.header())
+    output.flush()
+    for customers in invited_batches:
+        if customers:
+            output.write(renderer.render(customers))
+            output.flush()
+
+''' Writes invited customers to output in output_format (see write_invited_batches),
+    flush_size customers at a time
+'''
+def write_invited_customers(invited_customers, output=None, flush_size=BATCH_SIZE, output_format='text'):
+    invited_customers = iter(invited_customers)
+    write_invited_batches(iter(lambda: list(islice(invited_customers, flush_size)), []), output, output_format)
+
+''' Reads customer_json_file_path one customer at a time and writes the invited customers
+    of every batch as soon as it is filtered. Memory use does not depend on the file size.
+'''
+def stream_invited_customers(customer_json_file_path, max_allowed_distance, batch_size=BATCH_SIZE, output=None,
+                             distance_filter=None, output_format='text'):
+    with open_customer_json_file(customer_json_file_path) as customer_json_file:
+        customers = iter_customers(iter_customer_records(customer_json_file))
+        write_invited_batches(iter_invited_customers(customers, max_allowed_distance, batch_size, distance_filter),
+                              output, output_format)
+
+''' Returns (distance, index) of the count coordinates closest to ref_lat & ref_long,
+    closest first and in index order for equal distances. Distances are computed by
+    calculate_distance_in_km. With numpy, candidates are selected with argpartition
+    over all distances and only candidates are sorted.
+'''
+def get_nearest_indices(lats, longs, count, ref_lat=REF_LAT, ref_long=REF_LONG):
+    if count <= 0:
+        return []
+    INSTRUMENTATION.count('distances_computed', len(lats))
+    if np is None:
+        ref_lat_rad = radians(ref_lat)
+        ref_long_rad = radians(ref_long)
+        return heapq.nsmallest(count, ((_distance_in_km(ref_lat_rad, ref_long_rad, radians(lat), radians(long)), index)
+                                       for index, (lat, long) in enumerate(zip(lats, longs))))
+
+    lats = np.asarray(lats, dtype=np.float64)
+    longs = np.asarray(longs, dtype=np.float64)
+    distances = calculate_distances_in_km(ref_lat, ref_long, lats, longs)
+    if count < len(distances):
+        # every distance close to the count-th smallest is a candidate, as vectorized
+        # distances can differ slightly from calculate_distance_in_km
+        kth_distance = distances[np.argpartition(distances, count - 1)[count - 1]]
+        candidates = np.flatnonzero(distances <= kth_distance + BOUNDARY_MARGIN_KM)
+    else:
+        candidates = np.arange(len(distances))
+    return heapq.nsmallest(count, ((calculate_distance_in_km(ref_lat, ref_long, float(lats[index]),
+                                                             float(longs[index])), index)
+                                   for index in candidates.tolist()))
+
+''' Returns (customer, distance in km) of the count customers closest to REF_LAT & REF_LONG,
+    closest first and in customer order for equal distances. customers are read
+    batch_size at a time, only the count closest customers found so far are kept.
+'''
+def get_nearest_customers(customers, count, batch_size=BATCH_SIZE):
+    # (distance, position, customer) of the closest customers so far
+    nearest = []
+    position = 0
+    for batch in iter_batches(customers, batch_size):
+        lats, longs = get_customer_coordinates(batch)
+        nearest = heapq.nsmallest(count, nearest + [(distance, position + index, batch[index])
+                                                    for distance, index in get_nearest_indices(lats, longs, count)])
+        position += len(batch)
+    return [(customer, distance) for distance, position, customer in nearest]
+
+''' Writes nearest customers and their distance to output, in output_format
+    (see write_invited_customers)
+'''
+def write_nearest_customers(nearest_customers, output=None, output_format='text'):
+    output = output if output is not None else sys.stdout
+    renderer = _CustomerRenderer(output_format, 'Nearest customer list:', with_distance=True)
+    output.write(renderer.header())
+    output.write(renderer.render([customer for customer, distance in nearest_customers],
+                                 [distance for customer, distance in nearest_customers]))
+    output.flush()
+
+''' Reads customer_json_file_path one batch of customers at a time and writes the
+    count customers closest to REF_LAT & REF_LONG. Memory use does not depend on the file size.
+'''
+def stream_nearest_customers(customer_json_file_path, count, batch_size=BATCH_SIZE, output=None, output_format='text'):
+    with open_customer_json_file(customer_json_file_path) as customer_json_file:
+        customers = iter_customers(iter_customer_records(customer_json_file))
+        write_nearest_customers(get_nearest_customers(customers, count, batch_size), output, output_format)
+
 ''' Displays names of customers within max_allowed_distance of REF_LAT & REF_LONG
 '''
+@INSTRUMENTATION.timed('print')
 def display_invited_customers(invited_customers):
-    if len(invited_customers) >=0:
-        print('Invited customer list:')
-        for customer in invited_customers:
-            print(customer.name + "\n")
-    else:
-        print('Customer invitee list empty')
+    write_invited_customers(invited_customers)
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("-customer_json_file", help="customer json file path")
     parser.add_argument("-max_allowed_distance", help="max allowed distance to be invited to the party",
                         type=float)
+    parser.add_argument("-batch_size", help="number of customers filtered at a time", type=int, default=BATCH_SIZE)
+    parser.add_argument("-customer_store", help="customer store file path written by customer_store.py, "
+                                                "used instead of customer_json_file")
+    parser.add_argument("-workers", help="number of processes filtering customers, filter in this process if not set",
+                        type=int)
+    parser.add_argument("-top_k", help="write the top_k customers closest to the office with their distance, "
+                                       "instead of customers within max_allowed_distance", type=int)
+    parser.add_argument("-profile", nargs='?', const='', metavar="PROFILE_FILE",
+                        help="write stage timings and counters and the top functions by time to standard error, "
+                             "or dump the cProfile profile to PROFILE_FILE")
+    parser.add_argument("-format", help="output format", choices=OUTPUT_FORMATS, default='text')
+    parser.add_argument("-state_file", help="invitee state file, written by -init_state and updated by -apply_delta, "
+                                            "write its invited customers if neither is set")
+    parser.add_argument("-init_state", action='store_true',
+                        help="write the invitee state of customer_json_file within max_allowed_distance to state_file")
+    parser.add_argument("-apply_delta", metavar="DELTA_FILE",
+                        help="apply the customer changes of DELTA_FILE to state_file and write the invitees "
+                             "added and removed")
     args = parser.parse_args()
 
+    if args.profile is None:
+        invite_customers(args)
+    else:
+        run_profiled(lambda: invite_customers(args), args.profile)
+
+''' Writes invited or nearest customers for the parsed command line arguments of main
+'''
+def invite_customers(args):
+    # imported here as these modules import this module
+    from customer_store import write_store_invited_customers, write_store_nearest_customers
+    from sharded_filter import ShardedDistanceFilter
+    from invitee_state import InviteeState, iter_delta_records, write_invitee_changes
+
+    if args.state_file:
+        if args.init_state:
+            with open_customer_json_file(args.customer_json_file) as customer_json_file, \
+                    InviteeState(args.state_file, 'n', args.max_allowed_distance) as state:
+                customers = iter_customers(iter_customer_records(customer_json_file))
+                write_invited_batches(state.add_customers(customers, args.batch_size), output_format=args.format)
+        elif args.apply_delta:
+            with open(args.apply_delta) as delta_file, InviteeState(args.state_file, 'w') as state:
+                write_invitee_changes(*state.apply_delta(iter_delta_records(delta_file)), output_format=args.format)
+        else:
+            with InviteeState(args.state_file) as state:
+                write_invited_customers(state.invited_customers(), output_format=args.format)
+        return
+
+    if args.top_k is not None:
+        if args.customer_store:
+            write_store_nearest_customers(args.customer_store, args.top_k, output_format=args.format)
+        else:
+            stream_nearest_customers(args.customer_json_file, args.top_k, args.batch_size, output_format=args.format)
+        return
 
-    customers_json = read_customer_json_file(args.customer_json_file)
-    customers = get_customer_list(customers_json)
-    invited_customers = filter_customer_by_distance(customers, args.max_allowed_distance)
-    display_invited_customers(invited_customers)
+    distance_filter = ShardedDistanceFilter(args.workers) if args.workers else None
+    try:
+        if args.customer_store:
+            write_store_invited_customers(args.customer_store, args.max_allowed_distance,
+                                          distance_filter=distance_filter, output_format=args.format)
+        else:
+            # customers are read, filtered and written one batch at a time,
+            # customer_json_file can be a json array or one json customer per line
+            stream_invited_customers(args.customer_json_file, args.max_allowed_distance, args.batch_size,
+                                     distance_filter=distance_filter, output_format=args.format)
+    finally:
+        if distance_filter is not None:
+            distance_filter.close()
 
 
-''' Customer object
+''' Customer object. Coordinates are validated and converted once, when the customer is created.
     Properties - user_id:int, name:string, lat:string, long:string,
-    lat_in_float:float & long_in_float:float.
+    lat_in_float:float, long_in_float:float, lat_in_radians:float & long_in_radians:float.
 '''
 class Customer(object):
+    __slots__ = ('user_id', 'name', 'lat', 'long', 'lat_in_float', 'long_in_float', 'lat_in_radians',
+                 'long_in_radians')
+
     def __init__(self, user_id, name, lat, long):
+        try:
+            lat_in_float = float(lat)
+            long_in_float = float(long)
+        except (TypeError, ValueError):
+            raise Exception('Invalid coordinates {}, {} for customer {}'.format(lat, long, user_id))
+        if not (-90 <= lat_in_float <= 90 and -180 <= long_in_float <= 180):
+            raise Exception('Invalid coordinates {}, {} for customer {}'.format(lat, long, user_id))
+
         self.user_id = user_id
         self.name = name
         self.lat = lat
         self.long = long
-
-    @property
-    def lat_in_float(self):
-        return float(self.lat)
-
-    @property
-    def long_in_float(self):
-        return float(self.long)
+        self.lat_in_float = lat_in_float
+        self.long_in_float = long_in_float
+        self.lat_in_radians = radians(lat_in_float)
+        self.long_in_radians = radians(long_in_float)
 
 if __name__ == "__main__":
     main()
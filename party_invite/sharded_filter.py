@@ -0,0 +1,120 @@
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from multiprocessing.shared_memory import SharedMemory
+except ImportError:
+    # python < 3.8
+    SharedMemory = None
+
+from party_invitee_list import np, REF_LAT, REF_LONG, get_invited_indices, get_customer_coordinates
+
+# fewest customers per shard, smaller inputs are filtered in fewer shards. Small enough
+# for a streamed batch (BATCH_SIZE customers) to be split across all workers
+MIN_SHARD_SIZE = 1000
+
+''' Return float64 views of latitudes & longitudes stored one after the other in buffer
+'''
+def _coordinate_views(buffer, count):
+    if np is not None:
+        coordinates = np.ndarray((2, count), dtype=np.float64, buffer=buffer)
+        return coordinates[0], coordinates[1]
+    coordinates = buffer[:16 * count].cast('d')
+    return coordinates[:count], coordinates[count:]
+
+''' Filter one shard of the coordinates in shared memory shared_memory_name, runs in
+    a worker process. Returns indices of invited customers of the whole arrays.
+'''
+def _filter_shard(shared_memory_name, count, start, stop, max_allowed_distance, ref_lat, ref_long):
+    shared_memory = SharedMemory(name=shared_memory_name)
+    try:
+        lats, longs = _coordinate_views(shared_memory.buf, count)
+        indices = array('q', get_invited_indices(lats[start:stop], longs[start:stop], max_allowed_distance,
+                                                 ref_lat, ref_long))
+        # views must be released before the shared memory is closed
+        del lats, longs
+    finally:
+        shared_memory.close()
+    return array('q', (index + start for index in indices))
+
+''' Distance filter running shards of the customers in a pool of worker processes.
+
+    Coordinates of every call are copied once to a shared memory block that workers
+    attach to by name, so only shard bounds are sent to workers and only indices of
+    invited customers are sent back. The block is reused by later calls, and only
+    replaced by a larger one when coordinates do not fit, so filtering a stream of
+    batches creates one block. Shard results are merged in shard order, so
+    invited_indices returns the same indices as get_invited_indices.
+    Use as a context manager, or call close, to stop the workers.
+    Needs python 3.8 or later (multiprocessing.shared_memory).
+'''
+class ShardedDistanceFilter(object):
+
+    def __init__(self, workers=None, min_shard_size=MIN_SHARD_SIZE):
+        if SharedMemory is None:
+            raise Exception('Filtering with workers needs python 3.8 or later (multiprocessing.shared_memory)')
+        self.workers = workers or os.cpu_count() or 1
+        self.min_shard_size = min_shard_size
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._shared_memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown()
+        self._release_shared_memory()
+
+    def _release_shared_memory(self):
+        if self._shared_memory is not None:
+            self._shared_memory.close()
+            self._shared_memory.unlink()
+            self._shared_memory = None
+
+    ''' Return the shared memory block, replaced by a larger one if size bytes do not fit
+    '''
+    def _get_shared_memory(self, size):
+        if self._shared_memory is None or self._shared_memory.size < size:
+            self._release_shared_memory()
+            self._shared_memory = SharedMemory(create=True, size=size)
+        return self._shared_memory
+
+    ''' Return (start, stop) of the shards of count customers, one shard per worker
+    '''
+    def _get_shards(self, count):
+        shard_count = max(1, min(self.workers, count // self.min_shard_size))
+        bounds = [count * shard // shard_count for shard in range(shard_count + 1)]
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    ''' Returns indices of the coordinates within max_allowed_distance of ref_lat & ref_long,
+        in ascending order
+    '''
+    def invited_indices(self, lats, longs, max_allowed_distance, ref_lat=REF_LAT, ref_long=REF_LONG):
+        count = len(lats)
+        if count == 0:
+            return []
+
+        shared_memory = self._get_shared_memory(16 * count)
+        shared_lats, shared_longs = _coordinate_views(shared_memory.buf, count)
+        shared_lats[:] = lats if np is not None else array('d', lats)
+        shared_longs[:] = longs if np is not None else array('d', longs)
+        del shared_lats, shared_longs
+
+        futures = [self._executor.submit(_filter_shard, shared_memory.name, count, start, stop,
+                                         max_allowed_distance, ref_lat, ref_long)
+                   for start, stop in self._get_shards(count)]
+        invited_indices = []
+        for future in futures:
+            invited_indices.extend(future.result())
+        return invited_indices
+
+    ''' Returns the customers within max_allowed_distance of REF_LAT & REF_LONG,
+        same as filter_customer_by_distance
+    '''
+    def filter_customers(self, customers, max_allowed_distance, coordinates=None):
+        lats, longs = coordinates if coordinates is not None else get_customer_coordinates(customers)
+        return [customers[index] for index in self.invited_indices(lats, longs, max_allowed_distance)]
@@ -0,0 +1,70 @@
+from unittest import TestCase
+from customer_index import CustomerIndex
+from party_invitee_list import get_customer_list, get_customer_coordinates, get_invited_indices
+import party_invitee_list
+import customer_index
+from customer_fixtures import random_customer_json
+import random
+
+
+class TestCustomerIndex(TestCase):
+
+    ''' Test queries match get_invited_indices over all customers, with and without numpy
+    '''
+    def test_query(self):
+        customers = get_customer_list(random_customer_json(3000, 3, lat_spread=17, long_spread=32))
+        rng = random.Random(4)
+        points = [(53.3381985, -6.2592576)] + [(rng.uniform(35, 70), rng.uniform(-25, 40)) for _ in range(20)]
+
+        orig_np = party_invitee_list.np
+        try:
+            for np in set([orig_np, None]):
+                party_invitee_list.np = customer_index.np = np
+                lats, longs = get_customer_coordinates(customers)
+                index = CustomerIndex(customers)
+                for max_distance in [0, 50, 100, 750]:
+                    results = index.query_many(points, max_distance)
+                    for (lat, long), result in zip(points, results):
+                        expected = get_invited_indices(lats, longs, max_distance, lat, long)
+                        self.assertEqual(result, [customers[position] for position in expected])
+                self.assertEqual(len(index.query(53.3381985, -6.2592576, 30000)), len(customers))
+        finally:
+            party_invitee_list.np = customer_index.np = orig_np
+
+    ''' Test the index answers the original party invite
+    '''
+    def test_query_customers_json(self):
+        customers = get_customer_list(party_invitee_list.read_customer_json_file('customers.json'))
+        invited_customers = CustomerIndex(customers).query(53.3381985, -6.2592576, 100)
+        self.assertEqual(invited_customers, party_invitee_list.filter_customer_by_distance(customers, 100))
+        self.assertEqual(CustomerIndex([]).query(53.3381985, -6.2592576, 100), [])
+
+    ''' Test a query walks down to the cells close to the point only, with and without numpy
+    '''
+    def test_query_candidate_cells(self):
+        customers = get_customer_list(random_customer_json(20000, 5, lat_spread=17, long_spread=32))
+        orig_np = customer_index.np
+        try:
+            for np in set([orig_np, None]):
+                customer_index.np = np
+                index = CustomerIndex(customers, cell_size=0.25)
+                cell_count = len(index.cell_offsets) - 1
+                bound_calls = []
+                orig_min_haversine_term = customer_index._min_haversine_term
+
+                def min_haversine_term(*args):
+                    bound_calls.append(args)
+                    return orig_min_haversine_term(*args)
+                customer_index._min_haversine_term = min_haversine_term
+                try:
+                    cells = index._get_candidate_cells(float(customers[0].lat), float(customers[0].long), 20)
+                finally:
+                    customer_index._min_haversine_term = orig_min_haversine_term
+                self.assertGreater(cell_count, 5000)
+                self.assertTrue(0 < len(cells) <= 9)
+                self.assertEqual(list(cells), sorted(cells))
+                self.assertLess(len(bound_calls), cell_count // 20)
+                self.assertEqual(list(index._get_candidate_cells(53.3381985, -6.2592576, 30000)),
+                                 list(range(cell_count)))
+        finally:
+            customer_index.np = orig_np
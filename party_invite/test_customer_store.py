@@ -0,0 +1,106 @@
+from unittest import TestCase
+from customer_store import CustomerStore, write_customer_store, write_store_invited_customers
+from party_invitee_list import get_customer_list, filter_customer_by_distance, write_invited_customers,\
+    get_nearest_customers
+import party_invitee_list
+import customer_store
+import io
+import os
+from customer_fixtures import random_customer_json
+import random
+import tempfile
+
+
+class TestCustomerStore(TestCase):
+
+    def setUp(self):
+        file_descriptor, self.store_path = tempfile.mkstemp(suffix='.store')
+        os.close(file_descriptor)
+
+    def tearDown(self):
+        os.remove(self.store_path)
+
+    ''' Returns random customers with random user ids and non ascii names
+    '''
+    def random_customer_json(self, count):
+        rng = random.Random(6)
+        customers_json = random_customer_json(count, 6)
+        for customer_json in customers_json:
+            customer_json.update(user_id=rng.randrange(10 ** 12), name=customer_json['name'] + ' é')
+        return customers_json
+
+    ''' Test customers read from a store are the customers written, with and without numpy
+    '''
+    def test_write_customer_store(self):
+        customers = get_customer_list(self.random_customer_json(500))
+        self.assertEqual(write_customer_store(customers, self.store_path), 500)
+
+        orig_np = party_invitee_list.np
+        try:
+            for np in set([orig_np, None]):
+                party_invitee_list.np = customer_store.np = np
+                with CustomerStore(self.store_path) as store:
+                    self.assertEqual(len(store), 500)
+                    for index, customer in enumerate(customers):
+                        stored_customer = store.customer(index)
+                        self.assertEqual(stored_customer.user_id, customer.user_id)
+                        self.assertEqual(stored_customer.name, customer.name)
+                        self.assertEqual(stored_customer.lat_in_float, customer.lat_in_float)
+                        self.assertEqual(stored_customer.long_in_float, customer.long_in_float)
+        finally:
+            party_invitee_list.np = customer_store.np = orig_np
+
+    ''' Test columns taken from a store stay valid after close, with and without numpy
+    '''
+    def test_close_with_columns_held(self):
+        customers = get_customer_list(self.random_customer_json(100))
+        write_customer_store(customers, self.store_path)
+
+        orig_np = party_invitee_list.np
+        try:
+            for np in set([orig_np, None]):
+                party_invitee_list.np = customer_store.np = np
+                with CustomerStore(self.store_path) as store:
+                    lats = store.lats
+                    user_ids = store.user_ids[10:20]
+                store.close()
+                self.assertEqual(list(lats), [customer.lat_in_float for customer in customers])
+                self.assertEqual(list(user_ids), [customer.user_id for customer in customers[10:20]])
+                del lats, user_ids
+        finally:
+            party_invitee_list.np = customer_store.np = orig_np
+
+    ''' Test invited customers of a store are the same as filter_customer_by_distance
+    '''
+    def test_write_store_invited_customers(self):
+        customers = get_customer_list(self.random_customer_json(2000))
+        write_customer_store(customers, self.store_path)
+        expected = io.StringIO()
+        write_invited_customers(filter_customer_by_distance(customers, 100), expected)
+
+        output = io.StringIO()
+        write_store_invited_customers(self.store_path, 100, output)
+        self.assertEqual(output.getvalue(), expected.getvalue())
+
+        write_customer_store([], self.store_path)
+        with CustomerStore(self.store_path) as store:
+            self.assertEqual(store.invited_indices(100), [])
+
+    ''' Test CustomerStore raises an exception for missing and invalid files
+    '''
+    def test_customer_store_error(self):
+        self.assertRaises(Exception, lambda: CustomerStore(self.store_path))
+        with open(self.store_path, 'wb') as store_file:
+            store_file.write(b'not a customer store file')
+        self.assertRaises(Exception, lambda: CustomerStore(self.store_path))
+        self.assertRaises(Exception, lambda: CustomerStore(self.store_path + '.missing'))
+
+    ''' Test nearest customers of a store are the same as get_nearest_customers
+    '''
+    def test_nearest_customers(self):
+        customers = get_customer_list(self.random_customer_json(2000))
+        write_customer_store(customers, self.store_path)
+        with CustomerStore(self.store_path) as store:
+            nearest_customers = store.nearest_customers(20)
+        self.assertEqual([(customer.user_id, distance) for customer, distance in nearest_customers],
+                         [(customer.user_id, distance) for customer, distance in get_nearest_customers(customers, 20)])
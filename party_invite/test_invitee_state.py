@@ -0,0 +1,110 @@
+from unittest import TestCase
+from invitee_state import InviteeState, iter_delta_records, write_invitee_changes
+from party_invitee_list import get_customer_list, filter_customer_by_distance
+from customer_fixtures import random_customer_record
+from itertools import chain
+import io
+import os
+import random
+import shutil
+import tempfile
+
+
+class TestInviteeState(TestCase):
+
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+        self.state_path = os.path.join(self.state_dir, 'state')
+
+    def tearDown(self):
+        shutil.rmtree(self.state_dir)
+
+    ''' Test the invitees after deltas are the invitees of the changed customers filtered
+        from scratch, and every delta reports the invitees it added and removed
+    '''
+    def test_apply_delta(self):
+        rng = random.Random(3)
+        customers_json = dict((user_id, random_customer_record(user_id, rng)) for user_id in range(300))
+        with InviteeState(self.state_path, 'n', 100) as state:
+            invited = list(chain.from_iterable(state.add_customers(get_customer_list(customers_json.values()), batch_size=64)))
+        invited_user_ids = set(customer.user_id for customer in invited)
+
+        for _ in range(5):
+            changes = []
+            for user_id in rng.sample(range(400), 40):
+                if user_id in customers_json and rng.random() < 0.3:
+                    del customers_json[user_id]
+                    changes.append({'op': 'delete', 'user_id': user_id})
+                else:
+                    change = 'update' if user_id in customers_json else 'add'
+                    customers_json[user_id] = random_customer_record(user_id, rng)
+                    changes.append(dict(customers_json[user_id], op=change))
+
+            with InviteeState(self.state_path, 'w') as state:
+                added, removed = state.apply_delta(changes)
+            expected_user_ids = set(customer.user_id for customer in
+                                    filter_customer_by_distance(get_customer_list(customers_json.values()), 100))
+            self.assertEqual([customer.user_id for customer in added], sorted(expected_user_ids - invited_user_ids))
+            self.assertEqual([customer.user_id for customer in removed], sorted(invited_user_ids - expected_user_ids))
+            with InviteeState(self.state_path) as state:
+                self.assertEqual([customer.user_id for customer in state.invited_customers()], sorted(expected_user_ids))
+            invited_user_ids = expected_user_ids
+
+    ''' Test a bad delta raises an exception and leaves the state unchanged
+    '''
+    def test_apply_bad_delta(self):
+        customers_json = [{"latitude": "53.2451022", "user_id": 4, "name": "Ian Kehoe", "longitude": "-6.238335"}]
+        with InviteeState(self.state_path, 'n', 100) as state:
+            list(state.add_customers(get_customer_list(customers_json)))
+        for changes in ([{'op': 'delete', 'user_id': 4}, {'op': 'delete', 'user_id': 4}],
+                        [{'op': 'delete', 'user_id': 4}, {'op': 'add', 'user_id': 5, 'name': 'Far Away',
+                                                          'latitude': '95', 'longitude': '0'}],
+                        [{'op': 'delete', 'user_id': 4}, {'op': 'update', 'user_id': 5}],
+                        [{'op': 'delete', 'user_id': 4}, {'op': 'rename', 'user_id': 4}],
+                        [{'op': 'delete', 'user_id': 4}, {'op': 'add', 'user_id': 4}]):
+            with InviteeState(self.state_path, 'w') as state:
+                self.assertRaises(Exception, lambda: state.apply_delta(changes))
+        with InviteeState(self.state_path) as state:
+            self.assertEqual([customer.name for customer in state.invited_customers()], ['Ian Kehoe'])
+        self.assertRaises(Exception, lambda: InviteeState(self.state_path, 'n'))
+
+    ''' Test missing files and files that are not invitee state files are rejected
+    '''
+    def test_bad_state_file(self):
+        self.assertRaises(Exception, lambda: InviteeState(self.state_path))
+        self.assertFalse(os.path.exists(self.state_path))
+        with open(self.state_path, 'w') as state_file:
+            state_file.write('Invited customer list:\n')
+        for flag in ('r', 'w'):
+            self.assertRaises(Exception, lambda: InviteeState(self.state_path, flag))
+        self.assertRaises(Exception, lambda: InviteeState(self.state_path, 'x'))
+
+    ''' Test delta files are read line by line and changes are written with their change
+    '''
+    def test_delta_file_and_changes(self):
+        delta_file = io.StringIO('{"op": "delete", "user_id": 4}\n\n{"op": "delete", "user_id": 5}\n')
+        self.assertEqual([change['user_id'] for change in iter_delta_records(delta_file)], [4, 5])
+        self.assertRaises(Exception, lambda: list(iter_delta_records(io.StringIO('{"op": \n'))))
+
+        added = get_customer_list([{"latitude": "53", "user_id": 13, "name": "Olive Ahearn", "longitude": "-7"}])
+        removed = get_customer_list([{"latitude": "53.2451022", "user_id": 4, "name": "Ian Kehoe",
+                                      "longitude": "-6.238335"}])
+        output = io.StringIO()
+        write_invitee_changes(added, removed, output)
+        self.assertEqual(output.getvalue(), 'Added invitees:\nOlive Ahearn\n\nRemoved invitees:\nIan Kehoe\n\n')
+        output = io.StringIO()
+        write_invitee_changes(added, removed, output, 'csv')
+        self.assertEqual(output.getvalue().splitlines(), ['user_id,name,change', '13,Olive Ahearn,added',
+                                                          '4,Ian Kehoe,removed'])
+
+    ''' Test state files are opened by their own path when it has uri characters
+    '''
+    def test_state_path_quoting(self):
+        customers_json = [{"latitude": "53.2451022", "user_id": 4, "name": "Ian Kehoe", "longitude": "-6.238335"}]
+        for file_name in ('state#a.db', 'state?mode=ro', 'state%20a', 'state a'):
+            state_path = os.path.join(self.state_dir, file_name)
+            with InviteeState(state_path, 'n', 100) as state:
+                list(state.add_customers(get_customer_list(customers_json)))
+            with InviteeState(state_path) as state:
+                self.assertEqual([customer.name for customer in state.invited_customers()], ['Ian Kehoe'])
+        self.assertEqual(sorted(os.listdir(self.state_dir)), ['state a', 'state#a.db', 'state%20a', 'state?mode=ro'])
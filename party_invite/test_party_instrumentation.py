@@ -0,0 +1,62 @@
+from unittest import TestCase
+from party_instrumentation import Instrumentation, INSTRUMENTATION, run_profiled
+from party_invitee_list import stream_invited_customers
+import io
+import os
+import tempfile
+
+
+class TestInstrumentation(TestCase):
+
+    ''' Test stages, calls and counters are only recorded when enabled, and published to hooks
+    '''
+    def test_instrumentation(self):
+        instrumentation = Instrumentation()
+
+        @instrumentation.timed('filter')
+        def keep_even(values):
+            return [value for value in values if value % 2 == 0]
+
+        self.assertEqual(keep_even([1, 2]), [2])
+        instrumentation.count('customers', 2)
+        self.assertEqual(instrumentation.snapshot(), {'timings': {}, 'calls': {}, 'counters': {}})
+
+        instrumentation.enable()
+        self.assertEqual(keep_even([1, 2, 4]), [2, 4])
+        with instrumentation.stage('read_batch'):
+            instrumentation.count('customers', 3)
+        snapshot = instrumentation.snapshot()
+        self.assertEqual(snapshot['calls'], {'filter': 1, 'read_batch': 1})
+        self.assertEqual(snapshot['counters'], {'customers': 3})
+
+        snapshots = []
+        instrumentation.add_hook(snapshots.append)
+        instrumentation.publish()
+        instrumentation.remove_hook(snapshots.append)
+        instrumentation.publish()
+        self.assertEqual(snapshots, [snapshot])
+
+    ''' Test run_profiled records the stages and counters of the streaming pipeline, and dumps the profile
+    '''
+    def test_run_profiled(self):
+        snapshots = []
+        INSTRUMENTATION.reset()
+        INSTRUMENTATION.add_hook(snapshots.append)
+        file_descriptor, profile_path = tempfile.mkstemp(suffix='.prof')
+        os.close(file_descriptor)
+        try:
+            invited = io.StringIO()
+            output = io.StringIO()
+            run_profiled(lambda: stream_invited_customers('customers.json', 100, output=invited), profile_path, output)
+            self.assertGreater(os.path.getsize(profile_path), 0)
+        finally:
+            INSTRUMENTATION.remove_hook(snapshots.append)
+            INSTRUMENTATION.reset()
+            os.remove(profile_path)
+
+        self.assertFalse(INSTRUMENTATION.enabled)
+        self.assertEqual(invited.getvalue().count('\n\n'), 12)
+        self.assertEqual(snapshots[0]['calls'], {'read_batch': 2, 'filter_customer_by_distance': 1})
+        self.assertEqual(snapshots[0]['counters'], {'batches': 1, 'distances_computed': 32})
+        self.assertIn('filter_customer_by_distance', output.getvalue())
+        self.assertIn('Profile written to', output.getvalue())
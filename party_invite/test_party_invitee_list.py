@@ -1,7 +1,15 @@
 from unittest import TestCase
 from party_invitee_list import get_customer_list, calculate_distance_in_km,\
-    Customer, filter_customer_by_distance, read_customer_json_file
+    Customer, filter_customer_by_distance, read_customer_json_file, get_customer_coordinates, get_invited_indices,\
+    iter_customer_records, iter_customers, iter_invited_customers, write_invited_customers, write_invited_batches,\
+    display_invited_customers, get_nearest_indices, get_nearest_customers, write_nearest_customers
+import party_invitee_list
+from party_instrumentation import INSTRUMENTATION
+from customer_fixtures import random_customer_json
+from contextlib import redirect_stdout
 from datetime import date
+import csv
+import io
 import json
 import os
 
@@ -67,5 +75,188 @@ class TestPartyInviteeList(TestCase):
         invited_customers = filter_customer_by_distance(customers, 100)
         self.assertEqual(len(invited_customers), 0)
 
+    ''' Returns random customers around REF_LAT & REF_LONG, some of them
+        exactly on the 100 km boundary
+    '''
+    def random_customer_json(self, count):
+        customers_json = random_customer_json(count, 5)
+        customers_json.append({"latitude": "53.8483", "user_id": count, "name": "Boundary", "longitude": "-7"})
+        return customers_json
+
+    ''' Test get_invited_indices matches calculate_distance_in_km, with and without numpy
+    '''
+    def test_get_invited_indices(self):
+        customers = get_customer_list(self.random_customer_json(5000))
+        expected = [index for index, customer in enumerate(customers)
+                    if round(calculate_distance_in_km(53.3381985, -6.2592576, customer.lat_in_float,
+                                                      customer.long_in_float), 2) <= 100]
+        self.assertIn(len(customers) - 1, expected)
+
+        orig_np = party_invitee_list.np
+        try:
+            for np in set([orig_np, None]):
+                party_invitee_list.np = np
+                lats, longs = get_customer_coordinates(customers)
+                self.assertEqual(list(get_invited_indices(lats, longs, 100)), expected)
+                self.assertEqual(filter_customer_by_distance(customers, 100),
+                                 [customers[index] for index in expected])
+        finally:
+            party_invitee_list.np = orig_np
+
+
+    ''' Test iter_customer_records reads json arrays and NDJSON across chunk boundaries
+    '''
+    def test_iter_customer_records(self):
+        customers_json = self.mock_customer_json()
+        ndjson = '\n'.join(json.dumps(customer) for customer in customers_json) + '\n\n'
+        for text in (json.dumps(customers_json), json.dumps(customers_json, indent=2), ndjson, ' ' + ndjson):
+            for chunk_size in (1, 7, 65536):
+                self.assertEqual(list(iter_customer_records(io.StringIO(text), chunk_size)), customers_json)
+
+        self.assertEqual(list(iter_customer_records(io.StringIO('[ ]'))), [])
+        self.assertEqual(list(iter_customer_records(io.StringIO(''))), [])
+        self.assertRaises(Exception, lambda: list(iter_customer_records(io.StringIO('[{"name": 1} {}]'))))
+        self.assertRaises(Exception, lambda: list(iter_customer_records(io.StringIO('{"name": 1}\n{'))))
+
+    ''' Test values split at any point by chunks are decoded, and errors inside the
+        buffer are raised without reading the rest of the file
+    '''
+    def test_iter_customer_records_chunks(self):
+        customers_json = [{"latitude": "52.986375", "user_id": -12.5e3, "name": "Christina \u00e9 \"Tina\"",
+                           "longitude": "-6.043701", "vip": True, "plus_one": False, "notes": None}]
+        text = json.dumps(customers_json)
+        for chunk_size in range(1, 12):
+            self.assertEqual(list(iter_customer_records(io.StringIO(text), chunk_size)), customers_json)
+
+        class CustomerFile(io.StringIO):
+            reads = 0
+            def read(self, size=-1):
+                CustomerFile.reads += 1
+                return super(CustomerFile, self).read(size)
+
+        customer_file = CustomerFile('[{"name": x},' + ' ' * 100000 + ']')
+        self.assertRaises(Exception, lambda: list(iter_customer_records(customer_file, 64)))
+        self.assertEqual(CustomerFile.reads, 1)
+
+    ''' Test iter_customers raises an exception for records with missing keys
+    '''
+    def test_iter_customers_key_missing(self):
+        self.assertRaises(Exception, lambda: list(iter_customers([{"name": "Christina"}])))
+
+    ''' Test the streaming pipeline writes the same output as display_invited_customers
+    '''
+    def test_write_invited_customers(self):
+        customers_json = self.random_customer_json(1000)
+        expected = io.StringIO()
+        with redirect_stdout(expected):
+            display_invited_customers(filter_customer_by_distance(get_customer_list(customers_json), 100))
+
+        ndjson = '\n'.join(json.dumps(customer) for customer in customers_json)
+        for batch_size in (1, 64, 5000):
+            output = io.StringIO()
+            customers = iter_customers(iter_customer_records(io.StringIO(ndjson), 100))
+            write_invited_batches(iter_invited_customers(customers, 100, batch_size), output)
+            self.assertEqual(output.getvalue(), expected.getvalue())
+
+    ''' Test the invited customers of every batch are written before the next batch is read
+    '''
+    def test_write_invited_batches(self):
+        # one invited customer in every 4 customers
+        customers = get_customer_list(self.mock_customer_json() * 3)
+        read_customers = []
+        def iter_read_customers():
+            for customer in customers:
+                read_customers.append(customer)
+                yield customer
+
+        # (customers read, customers written) at every flush
+        flushes = []
+        class Output(io.StringIO):
+            def flush(self):
+                flushes.append((len(read_customers), self.getvalue().count('\n\n')))
+
+        write_invited_batches(iter_invited_customers(iter_read_customers(), 100, 4), Output())
+        self.assertEqual(flushes, [(0, 0), (4, 1), (8, 2), (12, 3)])
+
+    ''' Test Customer converts coordinates once and rejects invalid coordinates
+    '''
+    def test_customer(self):
+        customer = Customer(12, 'Christina McArdle', '52.986375', '-6.043701')
+        self.assertEqual(customer.lat, '52.986375')
+        self.assertEqual(customer.lat_in_float, 52.986375)
+        self.assertEqual(customer.long_in_float, -6.043701)
+        self.assertAlmostEqual(customer.lat_in_radians, 0.924787, 6)
+        self.assertFalse(hasattr(customer, '__dict__'))
+
+        for lat, long in [('abc', '0'), (None, '0'), ('91', '0'), ('0', '-180.5'), ('nan', '0')]:
+            self.assertRaises(Exception, lambda: Customer(1, 'Alice Cahill', lat, long))
+        self.assertRaises(Exception, lambda: get_customer_list([{"latitude": "52.9", "user_id": 12}]))
+
+    ''' Test get_nearest_indices and get_nearest_customers match sorting all distances,
+        with and without numpy
+    '''
+    def test_get_nearest_customers(self):
+        customers = get_customer_list(self.random_customer_json(3000))
+        # customers at equal distances are in customer order
+        customers += get_customer_list(self.mock_customer_json()) * 2
+        expected = sorted((calculate_distance_in_km(53.3381985, -6.2592576, customer.lat_in_float,
+                                                    customer.long_in_float), index)
+                          for index, customer in enumerate(customers))
+
+        orig_np = party_invitee_list.np
+        try:
+            for np in set([orig_np, None]):
+                party_invitee_list.np = np
+                lats, longs = get_customer_coordinates(customers)
+                for count in [0, 1, 10, len(customers) + 1]:
+                    self.assertEqual(get_nearest_indices(lats, longs, count), expected[:count])
+                    for batch_size in [1000, 5000]:
+                        self.assertEqual(get_nearest_customers(iter(customers), count, batch_size),
+                                         [(customers[index], distance) for distance, index in expected[:count]])
+        finally:
+            party_invitee_list.np = orig_np
+
+    ''' Test write_nearest_customers output
+    '''
+    def test_write_nearest_customers(self):
+        output = io.StringIO()
+        write_nearest_customers(get_nearest_customers(get_customer_list(self.mock_customer_json()), 2), output)
+        self.assertEqual(output.getvalue(), 'Nearest customer list:\nChristina McArdle - 45.88 km\n\n'
+                                            'Jack Enright - 274.35 km\n\n')
+
+    ''' Test instrumentation records stages and counters of the streaming pipeline
+    '''
+    def test_instrumentation(self):
+        ndjson = '\n'.join(json.dumps(customer) for customer in self.random_customer_json(100))
+        INSTRUMENTATION.reset()
+        INSTRUMENTATION.enable()
+        try:
+            customers = iter_customers(iter_customer_records(io.StringIO(ndjson)))
+            write_invited_batches(iter_invited_customers(customers, 100, 40), io.StringIO())
+            snapshot = INSTRUMENTATION.snapshot()
+        finally:
+            INSTRUMENTATION.disable()
+            INSTRUMENTATION.reset()
+        self.assertEqual(snapshot['counters'], {'batches': 3, 'distances_computed': 101})
+        self.assertEqual(snapshot['calls'], {'read_batch': 4, 'filter_customer_by_distance': 3})
+
+    ''' Test write_invited_customers and write_nearest_customers output formats
+    '''
+    def test_output_formats(self):
+        customers = get_customer_list(self.mock_customer_json())
+        output = io.StringIO()
+        with redirect_stdout(output):
+            display_invited_customers(customers[:2])
+        self.assertEqual(output.getvalue(), 'Invited customer list:\nChristina McArdle\n\nAlice Cahill\n\n')
 
+        output = io.StringIO()
+        write_invited_customers(iter(customers), output, 3, 'csv')
+        self.assertEqual(list(csv.reader(io.StringIO(output.getvalue()))),
+                         [['user_id', 'name']] + [[str(customer.user_id), customer.name] for customer in customers])
 
+        output = io.StringIO()
+        write_nearest_customers(get_nearest_customers(customers, 2), output, 'jsonl')
+        self.assertEqual([json.loads(line) for line in output.getvalue().splitlines()],
+                         [{'user_id': customer.user_id, 'name': customer.name, 'distance_km': distance}
+                          for customer, distance in get_nearest_customers(customers, 2)])
+        self.assertRaises(Exception, lambda: write_invited_customers(customers, io.StringIO(), output_format='xml'))
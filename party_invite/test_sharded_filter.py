@@ -0,0 +1,70 @@
+from unittest import TestCase
+from sharded_filter import ShardedDistanceFilter
+from party_invitee_list import get_customer_list, get_customer_coordinates, get_invited_indices,\
+    filter_customer_by_distance, iter_invited_customers, BATCH_SIZE
+import party_invitee_list
+import sharded_filter
+from itertools import chain
+from customer_fixtures import random_customer_json
+
+
+class TestShardedFilter(TestCase):
+
+    ''' Test sharded results are the same as get_invited_indices, with and without numpy
+    '''
+    def test_invited_indices(self):
+        customers = get_customer_list(random_customer_json(2500, 7))
+
+        orig_np = party_invitee_list.np
+        try:
+            for np in set([orig_np, None]):
+                party_invitee_list.np = sharded_filter.np = np
+                lats, longs = get_customer_coordinates(customers)
+                with ShardedDistanceFilter(workers=3, min_shard_size=100) as distance_filter:
+                    self.assertEqual(len(distance_filter._get_shards(len(customers))), 3)
+                    for max_distance in [0, 50, 100]:
+                        self.assertEqual(distance_filter.invited_indices(lats, longs, max_distance),
+                                         list(get_invited_indices(lats, longs, max_distance)))
+                    self.assertEqual(distance_filter.invited_indices(lats[:0], longs[:0], 100), [])
+        finally:
+            party_invitee_list.np = sharded_filter.np = orig_np
+
+    ''' Test the streaming pipeline gives the same customers with a ShardedDistanceFilter
+    '''
+    def test_iter_invited_customers(self):
+        customers = get_customer_list(random_customer_json(2500, 7))
+        with ShardedDistanceFilter(workers=2, min_shard_size=100) as distance_filter:
+            self.assertEqual(list(chain.from_iterable(iter_invited_customers(customers, 100, 1000, distance_filter))),
+                             filter_customer_by_distance(customers, 100))
+
+    ''' Test every batch of the streaming pipeline is split across the workers with the
+        default batch size and shard size, in one reused shared memory block
+    '''
+    def test_iter_invited_customers_shards(self):
+        customers = get_customer_list(random_customer_json(2 * BATCH_SIZE + 10, 7))
+        with ShardedDistanceFilter(workers=2) as distance_filter:
+            get_shards = distance_filter._get_shards
+            shard_counts = []
+            shared_memory_names = []
+            def record_shards(count):
+                shard_counts.append(len(get_shards(count)))
+                shared_memory_names.append(distance_filter._shared_memory.name)
+                return get_shards(count)
+            distance_filter._get_shards = record_shards
+
+            self.assertEqual(list(chain.from_iterable(iter_invited_customers(customers, 100,
+                                                                             distance_filter=distance_filter))),
+                             filter_customer_by_distance(customers, 100))
+        self.assertEqual(shard_counts, [2, 2, 1])
+        self.assertEqual(len(set(shared_memory_names)), 1)
+        self.assertIsNone(distance_filter._shared_memory)
+
+    ''' Test a clear error is raised without multiprocessing.shared_memory (python < 3.8)
+    '''
+    def test_without_shared_memory(self):
+        orig_shared_memory = sharded_filter.SharedMemory
+        try:
+            sharded_filter.SharedMemory = None
+            self.assertRaisesRegex(Exception, 'python 3.8', ShardedDistanceFilter, 2)
+        finally:
+            sharded_filter.SharedMemory = orig_shared_memory